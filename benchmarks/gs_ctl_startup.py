@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+"""
+Startup-time benchmark for the gs_ctl client.
+
+Runs `gs_ctl.py --help` repeatedly in fresh interpreters and reports the
+wall time, then checks that importing gs_ctl pulls in neither Redis nor the
+radio hardware libraries. Commands typed during countdown should start in
+tens of milliseconds.
+
+    python3 benchmarks/gs_ctl_startup.py [--runs 20]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GS_CTL = os.path.join(ROOT, "gs_ctl.py")
+HEAVY_MODULES = ["redis", "board", "digitalio", "adafruit_rfm9x", "gs_data.data", "sqlite3"]
+
+def time_command(cmd, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description="gs_ctl startup benchmark")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    baseline = time_command([sys.executable, "-c", "pass"], args.runs)
+    client = time_command([sys.executable, GS_CTL, "--help"], args.runs)
+    for name, samples in (("python -c pass", baseline), ("gs_ctl.py --help", client)):
+        print(f"{name:20} median {statistics.median(samples):7.1f} ms   "
+              f"min {min(samples):7.1f} ms   max {max(samples):7.1f} ms")
+    print(f"{'gs_ctl overhead':20} median {statistics.median(client) - statistics.median(baseline):7.1f} ms")
+
+    check = ("import sys, gs_ctl; "
+             f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    loaded = subprocess.run([sys.executable, "-c", check], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout.strip()
+    if loaded:
+        print(f"[FAIL] Importing gs_ctl loads: {loaded}")
+        sys.exit(1)
+    print("[OK] Importing gs_ctl loads no Redis or hardware modules")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import numpy as np
+
+"""Largest-Triangle-Three-Buckets downsampling for plotting long series"""
+
+def lttb(x, y, n_out):
+    """
+    Pick n_out points of (x, y) that keep the visual shape of the series.
+
+    The first and last points are always kept. The rest are split into
+    n_out - 2 equal buckets and each bucket contributes the point forming
+    the largest triangle with the previously chosen point and the average
+    of the next bucket. x must be sorted. Returns (x, y) NumPy arrays.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    size = len(x)
+    if n_out >= size or size <= 2:
+        return x, y
+    if n_out < 3:
+        return x[[0, -1]], y[[0, -1]]
+
+    # Bucket boundaries over the interior points [1, size - 1)
+    edges = np.floor(np.linspace(1, size - 1, n_out - 1)).astype(np.int64)
+    # Per-bucket means from prefix sums, so the "next bucket" average is O(1)
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    widths = edges[1:] - edges[:-1]
+    mean_x = (cx[edges[1:]] - cx[edges[:-1]]) / widths
+    mean_y = (cy[edges[1:]] - cy[edges[:-1]]) / widths
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = size - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 1 < n_out - 2:
+            next_x, next_y = mean_x[i + 1], mean_y[i + 1]
+        else:
+            next_x, next_y = x[-1], y[-1]
+        # Twice the triangle area; the constant factor doesn't change argmax
+        area = np.abs((x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return x[selected], y[selected]
@@ -0,0 +1,120 @@
+import json
+import time
+import redis
+
+"""
+Flight catalog kept in Redis next to the telemetry.
+
+gs:flights is a sorted set of flight names scored by start time (the first
+session's registration, or an earlier frame), so flights list in launch
+order without scanning keys. gs:flight:<name> is a
+hash with the flight's metadata, time bounds (host receive time, ms) and
+frame count. gs:flight:<name>:files lists every daemon session's CSV and
+flight log paths as JSON. The daemon updates the catalog incrementally:
+record_frame() only counts in memory, flush() writes the totals every few
+seconds in one pipeline.
+"""
+
+FLIGHTS_KEY = "gs:flights"
+FLIGHT_KEY = "gs:flight:{}"
+FLIGHT_FILES_KEY = "gs:flight:{}:files"
+
+class FlightCatalog():
+    def __init__(self, redis_client, flush_interval=5.0):
+        self.redis = redis_client
+        self.flush_interval = flush_interval
+        self.pending = {}       # flight -> [frames, first ms, last ms]
+        self.last_flush = 0.0
+
+    def register(self, flight, csv_path=None, log_dir=None, **metadata):
+        """
+        Add a flight (or a new daemon session of an existing one) to the catalog.
+        """
+        now_ms = int(time.time() * 1000)
+        fields = {"name": flight, "updated_ms": now_ms}
+        fields.update({k: v for k, v in metadata.items() if v is not None})
+        pipe = self.redis.pipeline()
+        pipe.zadd(FLIGHTS_KEY, {flight: now_ms}, nx=True)
+        pipe.hset(FLIGHT_KEY.format(flight), mapping=fields)
+        pipe.hsetnx(FLIGHT_KEY.format(flight), "created_ms", now_ms)
+        if csv_path or log_dir:
+            pipe.rpush(FLIGHT_FILES_KEY.format(flight),
+                       json.dumps({"started_ms": now_ms, "csv": csv_path, "log": log_dir}))
+        pipe.execute()
+
+    def record_frame(self, flight, host_time_ms):
+        entry = self.pending.get(flight)
+        if entry is None:
+            self.pending[flight] = [1, host_time_ms, host_time_ms]
+        else:
+            entry[0] += 1
+            entry[1] = min(entry[1], host_time_ms)
+            entry[2] = max(entry[2], host_time_ms)
+
+    def flush(self, force=False):
+        """
+        Write counted frames and time bounds. Counts are kept if Redis is
+        unavailable; returns False in that case.
+        """
+        if not self.pending or (not force and time.time() - self.last_flush < self.flush_interval):
+            return True
+        self.last_flush = time.time()
+        pipe = self.redis.pipeline()
+        for flight, (frames, first_ms, last_ms) in self.pending.items():
+            key = FLIGHT_KEY.format(flight)
+            pipe.hincrby(key, "frames", frames)
+            pipe.hsetnx(key, "first_ms", first_ms)
+            pipe.hset(key, mapping={"last_ms": last_ms, "updated_ms": int(time.time() * 1000)})
+            # Score by first frame, unless the flight already has an earlier one
+            pipe.zadd(FLIGHTS_KEY, {flight: first_ms}, lt=True)
+        try:
+            pipe.execute()
+        except redis.exceptions.RedisError as e:
+            print(f"[CATALOG] Failed to update flight catalog: {e}")
+            return False
+        self.pending = {}
+        return True
+
+    def set_bounds(self, flight, frames, first_ms, last_ms):
+        """
+        Overwrite a flight's counts, e.g. when rebuilding the catalog from stored series.
+        """
+        pipe = self.redis.pipeline()
+        pipe.hset(FLIGHT_KEY.format(flight), mapping={"name": flight, "frames": frames,
+                                                      "first_ms": first_ms, "last_ms": last_ms})
+        pipe.hsetnx(FLIGHT_KEY.format(flight), "created_ms", first_ms)
+        pipe.zadd(FLIGHTS_KEY, {flight: first_ms})
+        pipe.execute()
+
+    def flights(self, start_ms="-inf", end_ms="+inf"):
+        """
+        Flight names in order of start time, optionally within a time window.
+        """
+        return [self._str(name) for name in self.redis.zrangebyscore(FLIGHTS_KEY, start_ms, end_ms)]
+
+    def get(self, flight):
+        """
+        Catalog entry as a dict (with a "files" list), or None for unknown flights.
+        """
+        pipe = self.redis.pipeline()
+        pipe.hgetall(FLIGHT_KEY.format(flight))
+        pipe.lrange(FLIGHT_FILES_KEY.format(flight), 0, -1)
+        fields, files = pipe.execute()
+        if not fields:
+            return None
+        entry = {self._str(k): self._str(v) for k, v in fields.items()}
+        for name in ("frames", "first_ms", "last_ms", "created_ms", "updated_ms"):
+            if name in entry:
+                entry[name] = int(entry[name])
+        entry["files"] = [json.loads(f) for f in files]
+        return entry
+
+    def remove(self, flight):
+        pipe = self.redis.pipeline()
+        pipe.zrem(FLIGHTS_KEY, flight)
+        pipe.delete(FLIGHT_KEY.format(flight), FLIGHT_FILES_KEY.format(flight))
+        pipe.execute()
+
+    @staticmethod
+    def _str(value):
+        return value.decode() if isinstance(value, bytes) else value
@@ -1,12 +1,92 @@
+import json
+import os
 import redis
 from typing import Tuple
+from .flight_catalog import FlightCatalog
 
 """Redis Helper Class for Redis Operations"""
 
+DAY_MS = 24 * 60 * 60 * 1000
+
+class StorageProfile():
+    """
+    How a telemetry key is stored in Redis.
+
+    structure: "timeseries" (RedisTimeSeries) or "stream" (capped stream, for
+        non-numeric values). Streams ignore the chunk/compression settings.
+    retention_ms: samples older than this are dropped (0 = keep forever).
+    chunk_size: bytes per time series chunk. Bigger chunks cost less overhead
+        per sample but hold more memory in the open (uncompacted) chunk.
+    compressed: Gorilla/delta-of-delta compression; off only for debugging.
+    duplicate_policy: what to do with a second sample at the same timestamp.
+        "last" makes replayed spill batches idempotent.
+    maxlen: approximate cap on stream entries.
+    """
+    FIELDS = ("structure", "retention_ms", "chunk_size", "compressed", "duplicate_policy", "maxlen")
+    STRUCTURES = ("timeseries", "stream")
+
+    def __init__(self, structure="timeseries", retention_ms=7 * DAY_MS, chunk_size=4096,
+                 compressed=True, duplicate_policy="last", maxlen=None):
+        self.structure = structure
+        self.retention_ms = retention_ms
+        self.chunk_size = chunk_size
+        self.compressed = compressed
+        self.duplicate_policy = duplicate_policy
+        self.maxlen = maxlen
+
+    @classmethod
+    def check(cls, changes, source="storage profile"):
+        """
+        Raise ValueError for fields StorageProfile doesn't have or an unknown structure.
+        """
+        unknown = sorted(set(changes) - set(cls.FIELDS))
+        if unknown:
+            raise ValueError(f"Unknown field(s) {', '.join(unknown)} in {source}; "
+                             f"expected {', '.join(cls.FIELDS)}")
+        if "structure" in changes and changes["structure"] not in cls.STRUCTURES:
+            raise ValueError(f"Unknown structure {changes['structure']!r} in {source}; "
+                             f"expected {' or '.join(cls.STRUCTURES)}")
+
+    def replace(self, **changes):
+        self.check(changes)
+        values = dict(vars(self))
+        values.update(changes)
+        return StorageProfile(**values)
+
+    def __repr__(self):
+        return f"StorageProfile({', '.join(f'{k}={v!r}' for k, v in vars(self).items())})"
+
+# Raw sensor channels: one sample per frame, kept for a week
+SENSOR_PROFILE = StorageProfile()
+# Derived values are cheap to recompute from the flight log
+DERIVED_PROFILE = StorageProfile(retention_ms=3 * DAY_MS)
+# Strings can't go in a time series; keep the most recent entries in a stream
+TEXT_PROFILE = StorageProfile(structure="stream", retention_ms=0, chunk_size=None,
+                              compressed=False, duplicate_policy=None, maxlen=10000)
+
+# Optional JSON file overriding profiles per key, e.g.
+# {"*": {"retention_ms": 1209600000}, "accel.x": {"chunk_size": 8192}}
+PROFILES_ENV = "GS_STORAGE_PROFILES"
+
+def load_profile_overrides(path=None):
+    """
+    Read per-key profile overrides ({key or "*": {field: value}}) from a JSON file.
+    """
+    path = path or os.environ.get(PROFILES_ENV)
+    if not path:
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Failed to load storage profiles from {path}: {e}")
+        return {}
+
 class TelemetryKey():
-    def __init__(self, key, labels: dict, unit=None):
+    def __init__(self, key, labels: dict, unit=None, profile=SENSOR_PROFILE):
         self.key = key
         self.labels = labels
+        self.profile = profile
     # return the key if object is referened as a string
     def __str__(self):
         return self.key
@@ -102,7 +182,8 @@ class TelemetryKeys:
     )
     GPS_COORDS_STR = TelemetryKey(
         "gps.coords_str", 
-        {"sensor": "gps", "name": "Coordinates", "unit": "km"}
+        {"sensor": "gps", "name": "Coordinates", "unit": "km"},
+        profile=TEXT_PROFILE
     )
 
     # Timestamp
@@ -111,6 +192,33 @@ class TelemetryKeys:
         {"sensor": "system", "name": "Timestamp", "unit": "ms"}
     )
 
+    # Flight state estimator (derived, not transmitted)
+    EST_ALTITUDE = TelemetryKey(
+        "est.altitude",
+        {"sensor": "estimator", "name": "Altitude", "unit": "m"},
+        profile=DERIVED_PROFILE
+    )
+    EST_VELOCITY = TelemetryKey(
+        "est.velocity",
+        {"sensor": "estimator", "name": "Vertical Velocity", "unit": "m/s"},
+        profile=DERIVED_PROFILE
+    )
+    EST_PHASE = TelemetryKey(
+        "est.phase",
+        {"sensor": "estimator", "name": "Flight Phase", "unit": "enum"},
+        profile=DERIVED_PROFILE
+    )
+    EST_LANDING_LATITUDE = TelemetryKey(
+        "est.landing_latitude",
+        {"sensor": "estimator", "name": "Predicted Landing Latitude", "unit": "degrees"},
+        profile=DERIVED_PROFILE
+    )
+    EST_LANDING_LONGITUDE = TelemetryKey(
+        "est.landing_longitude",
+        {"sensor": "estimator", "name": "Predicted Landing Longitude", "unit": "degrees"},
+        profile=DERIVED_PROFILE
+    )
+
     # All keys
     KEYS = [
         BMP280_TEMP,
@@ -133,28 +241,102 @@ class TelemetryKeys:
         GPS_SPEED,
         GPS_ANGLE,
         GPS_COORDS_STR,
-        TIMESTAMP
+        TIMESTAMP,
+        EST_ALTITUDE,
+        EST_VELOCITY,
+        EST_PHASE,
+        EST_LANDING_LATITUDE,
+        EST_LANDING_LONGITUDE
     ]
 
 class RedisHelper():
-    def __init__(self, host='localhost', port=6379, db=0, flight_name="LC2025"):
-        self.redis = redis.Redis(host=host, port=port, db=db)
+    def __init__(self, host='localhost', port=6379, db=0, flight_name="LC2025", profiles=None,
+                 socket_timeout=None):
+        """
+        profiles: per-key overrides ({key or "*": {field: value}}), applied on
+            top of the GS_STORAGE_PROFILES file and each key's default profile.
+        socket_timeout: seconds before a connect or command gives up with a
+            TimeoutError (default: wait forever).
+        """
+        self.redis = redis.Redis(host=host, port=port, db=db, socket_timeout=socket_timeout,
+                                 socket_connect_timeout=socket_timeout)
         self.redis_ts = self.redis.ts()
         self.flight_name = flight_name
+        self.catalog = FlightCatalog(self.redis)
+        self.profile_overrides = load_profile_overrides()
+        for name, changes in (profiles or {}).items():
+            self.profile_overrides.setdefault(name, {}).update(changes)
+        # Fail here with the offending key, not halfway through init_keys()
+        for name, changes in self.profile_overrides.items():
+            StorageProfile.check(changes, f"profile override {name!r}")
 
-    def init_keys(self):
-        if self.redis.ping():
+    def profile(self, key: TelemetryKey) -> StorageProfile:
+        profile = key.profile
+        # "*" sets defaults for time series; streams only take per-key overrides
+        if profile.structure == "timeseries" and "*" in self.profile_overrides:
+            profile = profile.replace(**self.profile_overrides["*"])
+        if key.key in self.profile_overrides:
+            profile = profile.replace(**self.profile_overrides[key.key])
+        return profile
+
+    def stream_keys(self) -> dict:
+        """
+        {full key: maxlen} for keys stored as streams instead of time series.
+        """
+        return {self._key(k): self.profile(k).maxlen for k in TelemetryKeys.KEYS
+                if self.profile(k).structure == "stream"}
+
+    def series_labels(self, key: TelemetryKey, flight_name=None) -> dict:
+        """
+        Labels for a series: the key's own plus flight and channel, for TS.MRANGE filters.
+        """
+        return {**key.labels, "flight": flight_name or self.flight_name, "channel": key.key}
+
+    def init_keys(self, set_current=True):
+        """
+        Create (or update) this flight's series. set_current=False leaves
+        current_flight alone, e.g. when rebuilding an old flight.
+        """
+        try:
+            self._init_keys(set_current)
+        except redis.exceptions.RedisError as e:
+            # Connection refused, timeouts and server refusals alike; the
+            # daemon retries from its reconnect hook
+            print(f"Failed to connect to Redis: {e}")
+
+    def _init_keys(self, set_current):
+        connected = self.redis.ping()
+        if connected:
             print("Connected to Redis")
             for k in TelemetryKeys.KEYS:
                 key = f"{self.flight_name}.{k.key}"  # Prefix keys with flight name
+                profile = self.profile(k)
+                if profile.structure != "timeseries":
+                    continue  # Streams are created by the first XADD
                 if not self.redis.exists(key):
                     self.redis_ts.create(
                     key,
-                    retention_msecs=604800000,
-                    labels=k.labels
-                    )  # 7 days retention
+                    retention_msecs=profile.retention_ms,
+                    uncompressed=not profile.compressed,
+                    labels=self.series_labels(k),
+                    chunk_size=profile.chunk_size,
+                    duplicate_policy=profile.duplicate_policy
+                    )
                     print(f"Created timeseries for {key}")
-            self.redis.set("current_flight", self.flight_name)
+                else:
+                    # Apply profile and label changes to series from earlier runs (encoding can't change)
+                    try:
+                        self.redis_ts.alter(
+                            key,
+                            labels=self.series_labels(k),
+                            retention_msecs=profile.retention_ms,
+                            chunk_size=profile.chunk_size,
+                            duplicate_policy=profile.duplicate_policy
+                        )
+                    except redis.exceptions.ResponseError as e:
+                        print(f"Failed to apply storage profile to {key}: {e}")
+            if set_current:
+                self.redis.set("current_flight", self.flight_name)
         else:
             print("Failed to connect to Redis")
     
@@ -190,8 +372,44 @@ class RedisHelper():
             print(f"Error appending to timeseries with timestamp: {e}")
             return None
     
+    def add_event(self, fields: dict, maxlen=10000):
+        """
+        Append a flight event (phase change, apogee, ...) to the <flight>.events stream.
+        """
+        try:
+            return self.redis.xadd(self._key("events"), fields, maxlen=maxlen, approximate=True)
+        except redis.exceptions.ResponseError as e:
+            print(f"Error appending event: {e}")
+            return None
+
+    def get_events(self, count=None):
+        try:
+            return self.redis.xrange(self._key("events"), count=count)
+        except redis.exceptions.ResponseError as e:
+            print(f"Error fetching events: {e}")
+            return None
+
+    def add_quarantine(self, fields: dict, maxlen=10000):
+        """
+        Append a rejected frame (reason, detail, raw hex, ...) to the <flight>.quarantine stream.
+        """
+        return self.redis.xadd(self._key("quarantine"), fields, maxlen=maxlen, approximate=True)
+
+    def get_quarantine(self, count=None):
+        try:
+            return self.redis.xrevrange(self._key("quarantine"), count=count)
+        except redis.exceptions.ResponseError as e:
+            print(f"Error fetching quarantine: {e}")
+            return None
+
     def ts_get_last(self, key):
         try:
+            if isinstance(key, TelemetryKey) and self.profile(key).structure == "stream":
+                entries = self.redis.xrevrange(self._key(key), count=1)
+                if not entries:
+                    return None
+                fields = entries[0][1]
+                return int(fields[b"ts"]), fields[b"value"].decode()
             return self.redis_ts.get(self._key(key))
         except redis.exceptions.ResponseError as e:
             print(f"Error fetching last value from timeseries: {e}")
@@ -214,9 +432,212 @@ class RedisHelper():
             print(f"Error fetching timeseries data: {e}")
             return None
     
+    def ts_get_range_downsampled(self, key, start_time="-", end_time="+", max_points=1000):
+        """
+        At most max_points samples that look like the full range when plotted.
+
+        Redis first reduces the range to per-bucket min and max (TS.RANGE
+        AGGREGATION, about 2 * max_points buckets, so spikes survive), then
+        LTTB picks max_points of those. Transfer size depends on max_points,
+        not on how long the range is. "-"/"+" resolve to the series bounds.
+        Stream keys (capped, so small) are read whole and only thinned with
+        LTTB; entries that aren't numbers are skipped.
+        """
+        from .downsample import lttb
+        full_key = self._key(key)
+        structure = self.profile(key).structure if isinstance(key, TelemetryKey) else "timeseries"
+        try:
+            if structure == "stream":
+                points = self._stream_points(full_key, start_time, end_time)
+            else:
+                if start_time == "-" or end_time == "+":
+                    info = self.redis_ts.info(full_key)
+                    if not info.total_samples:
+                        return []
+                    start_time = info.first_timestamp if start_time == "-" else start_time
+                    end_time = info.last_timestamp if end_time == "+" else end_time
+                span = end_time - start_time
+                if span <= 2 * max_points:
+                    # At most one sample per millisecond; nothing to aggregate
+                    points = self.redis_ts.range(full_key, start_time, end_time)
+                else:
+                    bucket = -(-span // (2 * max_points))
+                    pipe = self.redis.pipeline(transaction=False)
+                    pipe.ts().range(full_key, start_time, end_time, aggregation_type="min", bucket_size_msec=bucket)
+                    pipe.ts().range(full_key, start_time, end_time, aggregation_type="max", bucket_size_msec=bucket)
+                    lows, highs = pipe.execute()
+                    points = []
+                    for (t, low), (_, high) in zip(lows, highs):
+                        points.append((t, low))
+                        if high != low:
+                            # Exact times inside a bucket are gone; put the max mid-bucket
+                            points.append((t + bucket // 2, high))
+        except redis.exceptions.RedisError as e:
+            print(f"Error fetching downsampled timeseries data: {e}")
+            return None
+        if len(points) <= max_points:
+            return [(int(t), float(v)) for t, v in points]
+        x, y = lttb([p[0] for p in points], [float(p[1]) for p in points], max_points)
+        return list(zip(x.astype(int).tolist(), y.tolist()))
+
+    def _stream_points(self, full_key, start_time="-", end_time="+"):
+        """
+        Numeric (ts, value) entries of a capped stream key within [start_time, end_time].
+        """
+        points = []
+        for _, fields in self.redis.xrange(full_key):
+            t = int(fields[b"ts"])
+            if (start_time != "-" and t < start_time) or (end_time != "+" and t > end_time):
+                continue
+            try:
+                points.append((t, float(fields[b"value"])))
+            except ValueError:
+                pass  # Text entries can't be plotted
+        points.sort()
+        return points
+
     def ts_get_all(self, key):
         try:
             return self.redis_ts.range(self._key(key), "-", "+")
         except redis.exceptions.ResponseError as e:
             print(f"Error fetching all timeseries data: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def ts_mrange(self, key, flights=None, start_time="-", end_time="+",
+                  aggregation=None, bucket_ms=0, relative=False):
+        """
+        One channel across several flights (default: every flight) in a single
+        TS.MRANGE, as {flight: [(timestamp, value), ...]}. With relative=True
+        timestamps are ms since each flight's first returned sample, so flights
+        line up for comparison. aggregation is a TS.RANGE aggregator ("avg", "max", ...).
+        """
+        channel = str(key)
+        filters = [f"channel={channel}"]
+        if flights:
+            filters.append(f"flight=({','.join(flights)})")
+        kwargs = {}
+        if aggregation:
+            kwargs = {"aggregation_type": aggregation, "bucket_size_msec": bucket_ms}
+        try:
+            results = self.redis_ts.mrange(start_time, end_time, filters, **kwargs)
+        except redis.exceptions.ResponseError as e:
+            print(f"Error fetching {channel} across flights: {e}")
+            return None
+        out = {}
+        for entry in results:
+            # RESP2 reply: [{key: [labels, samples]}, ...]
+            for full_key, (_, samples) in entry.items():
+                full_key = full_key.decode() if isinstance(full_key, bytes) else full_key
+                flight = full_key[:-len(channel) - 1]
+                samples = [(int(t), float(v)) for t, v in samples]
+                if relative and samples:
+                    origin = samples[0][0]
+                    samples = [(t - origin, v) for t, v in samples]
+                out[flight] = samples
+        return out
+
+    def ts_mget(self, key, flights=None):
+        """
+        Latest sample of one channel for each flight, as {flight: (timestamp, value)}.
+        """
+        channel = str(key)
+        filters = [f"channel={channel}"]
+        if flights:
+            filters.append(f"flight=({','.join(flights)})")
+        try:
+            results = self.redis_ts.mget(filters)
+        except redis.exceptions.ResponseError as e:
+            print(f"Error fetching latest {channel} across flights: {e}")
+            return None
+        out = {}
+        for entry in results:
+            for full_key, (_, timestamp, value) in entry.items():
+                full_key = full_key.decode() if isinstance(full_key, bytes) else full_key
+                if timestamp is not None:
+                    out[full_key[:-len(channel) - 1]] = (int(timestamp), float(value))
+        return out
+
+    def label_flight(self, flight_name):
+        """
+        Add flight/channel labels to an existing flight's series (created before
+        labels were added). Returns the number of series updated.
+        """
+        updated = 0
+        for k in TelemetryKeys.KEYS:
+            key = f"{flight_name}.{k.key}"
+            if self.profile(k).structure != "timeseries" or not self.redis.exists(key):
+                continue
+            try:
+                self.redis_ts.alter(key, labels=self.series_labels(k, flight_name))
+                updated += 1
+            except redis.exceptions.ResponseError as e:
+                print(f"Error labelling {key}: {e}")
+        return updated
+
+    def rebuild_catalog(self):
+        """
+        Catalog and label every flight found by a key scan, with bounds and
+        frame counts from its timestamp series. For databases from before the
+        catalog existed; returns the flight names processed.
+        """
+        flights = self.scan_flights()
+        for flight in flights:
+            self.label_flight(flight)
+            try:
+                info = self.redis_ts.info(f"{flight}.{TelemetryKeys.TIMESTAMP.key}")
+            except redis.exceptions.ResponseError as e:
+                print(f"Error reading {flight}: {e}")
+                continue
+            self.catalog.set_bounds(flight, info.total_samples, info.first_timestamp, info.last_timestamp)
+        return flights
+
+    def memory_report(self, flight_name=None):
+        """
+        Memory per stored key of a flight, as a list of dicts with key, type,
+        bytes, samples and first/last timestamps (ms, time series only).
+        """
+        flight_name = flight_name or self.flight_name
+        keys = [(k.key, self.profile(k).structure) for k in TelemetryKeys.KEYS]
+        keys += [("events", "stream"), ("quarantine", "stream")]
+        report = []
+        for name, structure in keys:
+            key = f"{flight_name}.{name}"
+            try:
+                size = self.redis.memory_usage(key, samples=0)
+                if size is None:
+                    continue  # Key doesn't exist
+                entry = {"key": name, "type": structure, "bytes": size,
+                         "samples": 0, "first": None, "last": None}
+                if structure == "timeseries":
+                    info = self.redis_ts.info(key)
+                    # TS.INFO counts chunk memory precisely; MEMORY USAGE may not see inside the module
+                    entry["bytes"] = max(size, getattr(info, "memory_usage", 0) or 0)
+                    entry["samples"] = getattr(info, "total_samples", 0) or 0
+                    entry["first"] = getattr(info, "first_timestamp", None)
+                    entry["last"] = getattr(info, "last_timestamp", None)
+                    entry["chunks"] = getattr(info, "chunk_count", None)
+                else:
+                    entry["samples"] = self.redis.xlen(key)
+                report.append(entry)
+            except redis.exceptions.ResponseError as e:
+                print(f"Error reading memory usage of {key}: {e}")
+        return report
+
+    def flights(self):
+        """
+        Flight names from the catalog, in launch order. Falls back to a key
+        scan for databases that predate the catalog.
+        """
+        return self.catalog.flights() or self.scan_flights()
+
+    def scan_flights(self):
+        """
+        Flight names that have data in Redis, found from their timestamp series.
+        Slow on big databases; only for rebuilding the catalog.
+        """
+        suffix = f".{TelemetryKeys.TIMESTAMP.key}"
+        names = set()
+        for key in self.redis.scan_iter(match=f"*{suffix}", count=1000):
+            key = key.decode() if isinstance(key, bytes) else key
+            names.add(key[:-len(suffix)])
+        return sorted(names)
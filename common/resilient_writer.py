@@ -0,0 +1,274 @@
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+import redis
+
+"""Non-blocking time series writer that spills to disk while Redis is slow or down"""
+
+DEFAULT_SPILL_PATH = "/home/rpi/Data/spill.db"
+SPILL_STATUS_KEY = "gs:spill"
+
+class SpillQueue():
+    """
+    Bounded on-disk FIFO of frames. Each frame is (timestamp ms, {full key: value}).
+    When full, the oldest frames are dropped so the newest data survives.
+    """
+    def __init__(self, path=DEFAULT_SPILL_PATH, max_frames=200000):
+        self.max_frames = max_frames
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS spill (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                        "ts INTEGER, samples TEXT)")
+        self.db.commit()
+        self.depth = self.db.execute("SELECT COUNT(*) FROM spill").fetchone()[0]
+        self.dropped = 0
+
+    def push(self, frames):
+        with self.lock:
+            self.db.executemany("INSERT INTO spill (ts, samples) VALUES (?, ?)",
+                                [(ts, json.dumps(samples)) for ts, samples in frames])
+            self.depth += len(frames)
+            overflow = self.depth - self.max_frames
+            if overflow > 0:
+                self.db.execute("DELETE FROM spill WHERE id IN "
+                                "(SELECT id FROM spill ORDER BY id LIMIT ?)", (overflow,))
+                self.depth -= overflow
+                self.dropped += overflow
+            self.db.commit()
+
+    def peek(self, n):
+        """
+        Oldest n frames as [(id, ts, samples)].
+        """
+        with self.lock:
+            rows = self.db.execute("SELECT id, ts, samples FROM spill ORDER BY id LIMIT ?", (n,)).fetchall()
+        return [(row_id, ts, json.loads(samples)) for row_id, ts, samples in rows]
+
+    def remove_through(self, row_id):
+        with self.lock:
+            removed = self.db.execute("DELETE FROM spill WHERE id <= ?", (row_id,)).rowcount
+            self.depth -= removed
+            self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+class ResilientWriter():
+    """
+    Writes telemetry frames to RedisTimeSeries from a background thread.
+
+    write() only enqueues, so radio receive never waits on Redis or the disk.
+    The writer thread sends frames with TS.MADD at their original timestamps.
+    If Redis raises an error or a write takes longer than `slow_threshold`
+    seconds, frames go to the SpillQueue instead. Reconnects are retried with
+    exponential backoff. Once Redis answers again the spill is backfilled in
+    batches of `batch_size` before live writes resume. Spill depth and
+    replay rate are published to the gs:spill hash.
+
+    While the writer thread is stuck on a slow call and the queue is full,
+    write() parks frames in an in-memory overflow buffer that the thread moves
+    to the spill; past `max_overflow` frames the oldest are dropped and counted.
+
+    Keys in `streams` ({full key: maxlen}) hold non-numeric values and are
+    written with XADD to a capped stream instead of TS.MADD.
+    """
+    def __init__(self, host="localhost", port=6379, db=0, spill_path=DEFAULT_SPILL_PATH,
+                 max_spill_frames=200000, max_pending=1000, max_overflow=50000, batch_size=500,
+                 slow_threshold=0.5, max_backoff=30.0, on_reconnect=None, streams=None):
+        self.redis = redis.Redis(host=host, port=port, db=db,
+                                 socket_timeout=2.0, socket_connect_timeout=2.0)
+        self.spill_path = spill_path
+        self.max_spill_frames = max_spill_frames
+        self.batch_size = batch_size
+        self.slow_threshold = slow_threshold
+        self.max_backoff = max_backoff
+        self.on_reconnect = on_reconnect
+        self.streams = streams or {}
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.overflow = deque(maxlen=max_overflow)
+        self.overflow_dropped = 0
+        self.spill = None
+        self.thread = None
+        self.running = False
+        self.healthy = True
+        self.backoff = 1.0
+        self.next_retry = 0.0
+        self.written = 0
+        self.replayed = 0
+        self.replay_rate = 0.0
+        self.sample_errors = 0
+        self.last_status = 0.0
+
+    def start(self):
+        """
+        Open the spill file and start the writer thread. Call from the process
+        that writes (threads don't survive a fork).
+        """
+        self.spill = SpillQueue(self.spill_path, self.max_spill_frames)
+        if self.spill.depth:
+            print(f"[WRITER] {self.spill.depth} spilled frames waiting for backfill")
+            self.healthy = False
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def write(self, timestamp, samples):
+        """
+        Queue one frame. `samples` maps full Redis keys to values (numeric, or
+        strings for stream keys).
+        """
+        try:
+            self.pending.put_nowait((timestamp, samples))
+        except queue.Full:
+            # Writer thread is stuck behind Redis; it spills these once it's back
+            if len(self.overflow) == self.overflow.maxlen:
+                self.overflow_dropped += 1
+            self.overflow.append((timestamp, samples))
+
+    def run(self):
+        while self.running:
+            self.spill_overflow()
+            frames = self.drain()
+            if frames:
+                if self.healthy and self.spill.depth == 0:
+                    if not self.send(frames):
+                        self.spill.push(frames)
+                else:
+                    self.spill.push(frames)
+            if self.spill.depth and time.time() >= self.next_retry:
+                self.backfill()
+            if time.time() - self.last_status >= 2.0:
+                self.publish_status()
+
+    def spill_overflow(self):
+        frames = []
+        while self.overflow:
+            frames.append(self.overflow.popleft())
+        if frames:
+            self.spill.push(frames)
+
+    def drain(self):
+        try:
+            frames = [self.pending.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        while len(frames) < self.batch_size:
+            try:
+                frames.append(self.pending.get_nowait())
+            except queue.Empty:
+                break
+        return frames
+
+    def send(self, frames):
+        """
+        TS.MADD a batch of frames. Returns False (and schedules a retry) on failure.
+        """
+        ktv = [(key, ts, value) for ts, samples in frames for key, value in samples.items()
+               if key not in self.streams]
+        start = time.time()
+        try:
+            results = self.redis.ts().madd(ktv) if ktv else []
+            if self.streams:
+                results += self.send_streams(frames)
+        except redis.exceptions.RedisError as e:
+            # Connection loss, but also server-side refusals (OOM, READONLY, MISCONF)
+            self.mark_unhealthy(f"{e}")
+            return False
+        elapsed = time.time() - start
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            self.sample_errors += len(errors)
+            print(f"[WRITER] {len(errors)} samples rejected, e.g. {errors[0]}")
+        self.written += len(frames)
+        if elapsed > self.slow_threshold:
+            # Data made it, but the next frames go to disk until Redis recovers
+            self.mark_unhealthy(f"slow write ({elapsed:.2f}s)")
+        return True
+
+    def send_streams(self, frames):
+        pipe = self.redis.pipeline(transaction=False)
+        for ts, samples in frames:
+            for key, maxlen in self.streams.items():
+                if key in samples:
+                    pipe.xadd(key, {"ts": ts, "value": samples[key]}, maxlen=maxlen, approximate=True)
+        return pipe.execute(raise_on_error=False)
+
+    def mark_unhealthy(self, reason):
+        if self.healthy:
+            print(f"[WRITER] Redis unavailable ({reason}), spilling to {self.spill_path}")
+        self.healthy = False
+        self.next_retry = time.time() + self.backoff
+        self.backoff = min(self.backoff * 2, self.max_backoff)
+
+    def backfill(self):
+        try:
+            self.redis.ping()
+        except redis.exceptions.RedisError as e:
+            self.mark_unhealthy(f"{e}")
+            return
+        if not self.healthy and self.on_reconnect is not None:
+            try:
+                self.on_reconnect()
+            except Exception as e:
+                print(f"[WRITER] Reconnect hook failed: {e}")
+        start = time.time()
+        replayed = 0
+        # Bounded slice so new frames keep getting picked up from memory
+        while self.spill.depth and time.time() - start < 1.0:
+            rows = self.spill.peek(self.batch_size)
+            if not self.send([(ts, samples) for _, ts, samples in rows]):
+                break
+            self.spill.remove_through(rows[-1][0])
+            replayed += len(rows)
+        elapsed = max(time.time() - start, 1e-6)
+        if replayed:
+            self.replayed += replayed
+            self.replay_rate = replayed / elapsed
+        if self.spill.depth == 0 and not self.healthy:
+            print(f"[WRITER] Backfill complete, {self.replayed} frames replayed")
+            self.healthy = True
+            self.backoff = 1.0
+
+    def stats(self):
+        return {
+            "healthy": int(self.healthy),
+            "spill_depth": self.spill.depth if self.spill else 0,
+            "spill_dropped": self.spill.dropped if self.spill else 0,
+            "pending": self.pending.qsize(),
+            "overflow_dropped": self.overflow_dropped,
+            "written": self.written,
+            "replayed": self.replayed,
+            "replay_rate": round(self.replay_rate, 1),
+            "sample_errors": self.sample_errors,
+        }
+
+    def publish_status(self):
+        self.last_status = time.time()
+        if not self.healthy and time.time() < self.next_retry:
+            return  # Known down; don't wait out a socket timeout between retries
+        try:
+            self.redis.hset(SPILL_STATUS_KEY, mapping=self.stats())
+        except redis.exceptions.RedisError:
+            pass
+
+    def stop(self):
+        """
+        Stop the thread and spill anything still queued in memory.
+        """
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+        frames = []
+        while not self.pending.empty():
+            frames.append(self.pending.get_nowait())
+        if frames and self.spill is not None:
+            self.spill.push(frames)
+        if self.spill is not None:
+            self.spill_overflow()
+            self.spill.close()
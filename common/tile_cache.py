@@ -0,0 +1,304 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+"""MBTiles backed map tile cache with LRU eviction and a local tile server"""
+
+DEFAULT_TILE_URL = "https://mt1.google.com/vt/lyrs=r&x={x}&y={y}&z={z}"
+DEFAULT_CACHE_PATH = "/home/rpi/Data/tiles.mbtiles"
+DEFAULT_BUDGET_BYTES = 2 * 1024 ** 3   # 2 GiB
+USER_AGENT = "USST-GroundStation/1.0"
+ACCESS_FLUSH_INTERVAL = 30.0           # seconds between LRU access time writes
+CONTENT_TYPES = {"png": "image/png", "jpg": "image/jpeg", "jpeg": "image/jpeg", "webp": "image/webp"}
+
+def default_cache_path():
+    """
+    DEFAULT_CACHE_PATH on the Pi, the user's cache directory anywhere else.
+    """
+    if os.path.isdir(os.path.dirname(DEFAULT_CACHE_PATH)):
+        return DEFAULT_CACHE_PATH
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "groundstation", "tiles.mbtiles")
+
+def tile_format(data):
+    """
+    Image format from a tile's magic bytes, or None if unrecognized.
+    """
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    if data[:3] == b"\xff\xd8\xff":
+        return "jpg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+def lat_lon_to_tile(lat, lon, zoom):
+    """
+    Web Mercator (XYZ) tile containing lat/lon at zoom.
+    """
+    n = 2 ** zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+def tiles_in_bbox(lat1, lon1, lat2, lon2, min_zoom, max_zoom):
+    for z in range(min_zoom, max_zoom + 1):
+        x1, y1 = lat_lon_to_tile(max(lat1, lat2), min(lon1, lon2), z)
+        x2, y2 = lat_lon_to_tile(min(lat1, lat2), max(lon1, lon2), z)
+        for x in range(x1, x2 + 1):
+            for y in range(y1, y2 + 1):
+                yield z, x, y
+
+
+class TileCache():
+    """
+    Tile store in the MBTiles layout (TMS row order) so archives can be
+    shared with other tools. Access times live in a side table and drive LRU
+    eviction whenever the stored tiles exceed `budget_bytes`. Reads only
+    note the access time in memory; the times are written in batches every
+    ACCESS_FLUSH_INTERVAL seconds, before eviction and on close.
+
+    Imported archives and upstream downloads may use different image
+    formats, so each tile is served with the type its own bytes carry; the
+    metadata format is only the fallback.
+    """
+    def __init__(self, path=None, budget_bytes=DEFAULT_BUDGET_BYTES,
+                 tile_url=DEFAULT_TILE_URL):
+        path = path or default_cache_path()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.budget_bytes = budget_bytes
+        self.tile_url = tile_url
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS tiles (
+                zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB,
+                PRIMARY KEY (zoom_level, tile_column, tile_row));
+            CREATE TABLE IF NOT EXISTS tile_access (
+                zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER,
+                last_access REAL, size INTEGER,
+                PRIMARY KEY (zoom_level, tile_column, tile_row));
+            CREATE INDEX IF NOT EXISTS tile_access_lru ON tile_access (last_access);
+        """)
+        self.db.execute("INSERT OR IGNORE INTO metadata VALUES ('name', 'groundstation')")
+        self.db.execute("INSERT OR IGNORE INTO metadata VALUES ('format', 'png')")
+        self.db.commit()
+        self.size_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM tile_access").fetchone()[0]
+        self.format = self.db.execute("SELECT value FROM metadata WHERE name='format'").fetchone()[0]
+        self.accessed = {}
+        self.last_access_flush = time.time()
+
+    def content_type(self, data=None):
+        fmt = (tile_format(data) if data is not None else None) or self.format
+        return CONTENT_TYPES.get(fmt, "application/octet-stream")
+
+    @staticmethod
+    def _row(z, y):
+        # MBTiles stores rows bottom-up (TMS), map URLs are top-down (XYZ)
+        return (2 ** z - 1) - y
+
+    def get(self, z, x, y):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                (z, x, self._row(z, y))).fetchone()
+            if row is None:
+                return None
+            self.accessed[(z, x, self._row(z, y))] = time.time()
+            if time.time() - self.last_access_flush >= ACCESS_FLUSH_INTERVAL:
+                self._flush_access()
+            return row[0]
+
+    def _flush_access(self):
+        if self.accessed:
+            self.db.executemany(
+                "UPDATE tile_access SET last_access=? WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                [(t,) + key for key, t in self.accessed.items()])
+            self.db.commit()
+            self.accessed = {}
+        self.last_access_flush = time.time()
+
+    def put(self, z, x, y, data):
+        with self.lock:
+            self._put(z, x, y, data, time.time())
+            self.db.commit()
+            self._evict()
+
+    def _put(self, z, x, y, data, last_access):
+        key = (z, x, self._row(z, y))
+        old = self.db.execute(
+            "SELECT size FROM tile_access WHERE zoom_level=? AND tile_column=? AND tile_row=?", key).fetchone()
+        if old is not None:
+            self.size_bytes -= old[0]
+        self.accessed.pop(key, None)
+        self.db.execute("INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)", key + (data,))
+        self.db.execute("INSERT OR REPLACE INTO tile_access VALUES (?, ?, ?, ?, ?)",
+                        key + (last_access, len(data)))
+        self.size_bytes += len(data)
+
+    def _evict(self):
+        """
+        Drop least recently used tiles until the cache fits its budget.
+        """
+        if self.size_bytes > self.budget_bytes:
+            self._flush_access()
+        while self.size_bytes > self.budget_bytes:
+            victims = self.db.execute(
+                "SELECT zoom_level, tile_column, tile_row, size FROM tile_access "
+                "ORDER BY last_access LIMIT 256").fetchall()
+            if not victims:
+                break
+            for z, x, row, size in victims:
+                self.db.execute("DELETE FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                                (z, x, row))
+                self.db.execute("DELETE FROM tile_access WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                                (z, x, row))
+                self.accessed.pop((z, x, row), None)
+                self.size_bytes -= size
+                if self.size_bytes <= self.budget_bytes:
+                    break
+            self.db.commit()
+
+    def fetch(self, z, x, y, timeout=10):
+        """
+        Download a tile from the upstream server without touching the cache.
+        """
+        url = self.tile_url.format(x=x, y=y, z=z)
+        request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.read()
+
+    def get_or_fetch(self, z, x, y):
+        data = self.get(z, x, y)
+        if data is not None:
+            return data
+        try:
+            data = self.fetch(z, x, y)
+        except OSError as e:
+            print(f"[TILE] Failed to fetch {z}/{x}/{y}: {e}")
+            return None
+        self.put(z, x, y, data)
+        return data
+
+    def seed(self, lat1, lon1, lat2, lon2, min_zoom, max_zoom, force=False):
+        """
+        Prefetch every tile in the bounding box over the zoom range.
+        Returns (downloaded, skipped, failed).
+        """
+        tiles = list(tiles_in_bbox(lat1, lon1, lat2, lon2, min_zoom, max_zoom))
+        print(f"[TILE] Seeding {len(tiles)} tiles, zoom {min_zoom}-{max_zoom}")
+        downloaded = skipped = failed = 0
+        for i, (z, x, y) in enumerate(tiles):
+            if not force and self.contains(z, x, y):
+                skipped += 1
+                continue
+            try:
+                self.put(z, x, y, self.fetch(z, x, y))
+                downloaded += 1
+            except OSError as e:
+                print(f"[TILE] Failed to fetch {z}/{x}/{y}: {e}")
+                failed += 1
+            if (i + 1) % 100 == 0:
+                print(f"[TILE] {i + 1}/{len(tiles)}")
+        return downloaded, skipped, failed
+
+    def contains(self, z, x, y):
+        with self.lock:
+            return self.db.execute(
+                "SELECT 1 FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                (z, x, self._row(z, y))).fetchone() is not None
+
+    def import_mbtiles(self, path):
+        """
+        Copy every tile from an existing MBTiles archive. An empty cache
+        takes over the archive's format metadata. Returns the tile count.
+        """
+        source = sqlite3.connect(path)
+        count = 0
+        with self.lock:
+            try:
+                fmt = source.execute("SELECT value FROM metadata WHERE name='format'").fetchone()
+            except sqlite3.OperationalError:
+                fmt = None  # No metadata table
+            empty = self.db.execute("SELECT 1 FROM tiles LIMIT 1").fetchone() is None
+            if fmt is not None and fmt[0] != self.format and empty:
+                self.format = fmt[0]
+                self.db.execute("INSERT OR REPLACE INTO metadata VALUES ('format', ?)", (self.format,))
+            now = time.time()
+            for z, x, row, data in source.execute(
+                    "SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles"):
+                self._put(z, x, self._row(z, row), data, now)
+                count += 1
+                if count % 1000 == 0:
+                    self.db.commit()
+            self.db.commit()
+            self._evict()
+        source.close()
+        return count
+
+    def stats(self):
+        with self.lock:
+            tiles = self.db.execute("SELECT COUNT(*) FROM tiles").fetchone()[0]
+        return {"tiles": tiles, "size_bytes": self.size_bytes, "budget_bytes": self.budget_bytes}
+
+    def close(self):
+        with self.lock:
+            self._flush_access()
+        self.db.close()
+
+
+class TileServer():
+    """
+    Serves /{z}/{x}/{y}.png on localhost from a TileCache, falling through
+    to the upstream server on a miss. Point TkinterMapView at url().
+    """
+    def __init__(self, cache, host="127.0.0.1", port=0):
+        self.cache = cache
+        handler = self._handler()
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.thread = None
+
+    def _handler(self):
+        cache = self.cache
+
+        class TileHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                try:
+                    z, x, y = self.path.strip("/").split(".")[0].split("/")
+                    data = cache.get_or_fetch(int(z), int(x), int(y))
+                except ValueError:
+                    data = None
+                if data is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", cache.content_type(data))
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return TileHandler
+
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/{{z}}/{{x}}/{{y}}.png"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
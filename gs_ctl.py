@@ -1,41 +1,81 @@
 #!/usr/bin/env python3
 
 
+"""
+Ground station control client.
+
+Operator commands must start fast during countdown, so this module only
+imports the standard library, gs_data.link and gs_data.scheduler at load
+time. Redis, the tile cache, the live server and the daemon (with its
+hardware libraries) are imported by the commands that need them. The daemon itself runs from
+gs_daemon.py.
+"""
+
 import argparse
-import redis
 import time
 import json
-from gs_data.data import TelemetryDataProcess
+from gs_data.link import DATA_RATES, VALID_SPREADING_FACTORS, VALID_BANDWIDTHS, VALID_CODING_RATES
+from gs_data.scheduler import TASKS_KEY, TASK_STATUS_KEY, TASK_INDEX_KEY, RESPONSE_LIST_KEY
+
+DEFAULT_TILE_BUDGET_MB = 2048
+
+_redis = None
 
-r = redis.Redis(host='localhost', port=6379, decode_responses=True)
-TASKS_KEY = "gs:tasks"
+def get_redis():
+    """
+    Shared Redis client, created on first use and reused for the rest of the command.
+    """
+    global _redis
+    if _redis is None:
+        import redis
+        _redis = redis.Redis(host='localhost', port=6379, decode_responses=True)
+    return _redis
 
-def push_task_wait_response(task_name, params, timeout=5.0):
+def push_task_wait_response(task_name, params, timeout=5.0, priority=None, deadline=None):
     task_id = str(time.time())  # Epoch time as task ID
     task = {
         "task_id": task_id,
         "task": task_name,
         "params": params
     }
+    if priority is not None:
+        task["priority"] = priority
+    if deadline is not None:
+        task["deadline"] = time.time() + deadline  # Discarded by the daemon after this
 
+    r = get_redis()
     # Push task
     r.rpush(TASKS_KEY, json.dumps(task))
 
-    # Wait for response
-    response_key = f"gs:response:{task_id}"
-    start = time.time()
-    while time.time() - start < timeout:
-        response = r.get(response_key)
-        if response:
-            r.delete(response_key)
-            print(f"[RESPONSE] {response}")
-            return
-        time.sleep(0.1)
+    # Block until the daemon pushes the response instead of polling for it
+    response = r.blpop(RESPONSE_LIST_KEY.format(task_id), timeout=timeout)
+    if response:
+        r.delete(f"gs:response:{task_id}")
+        print(f"[RESPONSE] {response[1]}")
+        return
 
-    print("[ERROR] No response received (timeout)")
+    print(f"[ERROR] No response received (timeout). Task id: {task_id}")
+
+def show_task_status(task_id=None):
+    r = get_redis()
+    if task_id is None:
+        task_ids = r.zrevrange(TASK_INDEX_KEY, 0, 19)
+    else:
+        task_ids = [task_id]
+    for tid in task_ids:
+        status = r.hgetall(TASK_STATUS_KEY.format(tid))
+        if not status:
+            print(f"{tid:20} unknown")
+            continue
+        print(f"{tid:20} {status.get('task', ''):24} {status.get('priority', ''):12} "
+              f"{status.get('status', ''):10} {status.get('result', '')}")
 
 def main():
     parser = argparse.ArgumentParser(description="Ground Station Control Commands")
+    parser.add_argument("--priority", choices=["critical", "normal", "housekeeping"],
+                        help="Override the task's default priority class")
+    parser.add_argument("--deadline", type=float,
+                        help="Seconds after which the daemon discards the task instead of running it")
 
     subparsers = parser.add_subparsers(dest="command")
 
@@ -47,6 +87,23 @@ def main():
     force_cmd = subparsers.add_parser("force_ground_freq")
     force_cmd.add_argument("frequency", type=float, help="Local frequency override")
 
+    # LoRa data rate
+    rate_cmd = subparsers.add_parser("set_data_rate")
+    rate_cmd.add_argument("preset", choices=[r.name for r in DATA_RATES],
+                          help="Data rate preset, from longest range to highest throughput")
+
+    sf_cmd = subparsers.add_parser("set_spreading_factor")
+    sf_cmd.add_argument("spreading_factor", type=int, choices=VALID_SPREADING_FACTORS, help="LoRa spreading factor")
+
+    bw_cmd = subparsers.add_parser("set_bandwidth")
+    bw_cmd.add_argument("bandwidth", type=int, choices=VALID_BANDWIDTHS, help="Signal bandwidth in Hz")
+
+    cr_cmd = subparsers.add_parser("set_coding_rate")
+    cr_cmd.add_argument("coding_rate", type=int, choices=VALID_CODING_RATES, help="Coding rate denominator (4/x)")
+
+    auto_cmd = subparsers.add_parser("auto_data_rate")
+    auto_cmd.add_argument("mode", choices=["on", "off"], help="Pick the data rate from flight phase, SNR and loss")
+
     # Flight ready
     flight_cmd = subparsers.add_parser("send_flight_ready")
 
@@ -58,33 +115,199 @@ def main():
     rid_cmd = subparsers.add_parser("set_rocket_id")
     rid_cmd.add_argument("id", type=int, help="New rocket ID")
 
+    # Task scheduler
+    status_cmd = subparsers.add_parser("task_status", help="Show status of recent or given task")
+    status_cmd.add_argument("task_id", nargs="?", help="Task id (default: 20 most recent)")
+
+    cancel_cmd = subparsers.add_parser("cancel_task", help="Cancel a queued task")
+    cancel_cmd.add_argument("task_id", help="Task id to cancel")
+
+    # Offline map tiles
+    seed_cmd = subparsers.add_parser("seed_tiles", help="Prefetch map tiles for a bounding box")
+    seed_cmd.add_argument("lat1", type=float)
+    seed_cmd.add_argument("lon1", type=float)
+    seed_cmd.add_argument("lat2", type=float)
+    seed_cmd.add_argument("lon2", type=float)
+    seed_cmd.add_argument("--min-zoom", type=int, default=10)
+    seed_cmd.add_argument("--max-zoom", type=int, default=17)
+    seed_cmd.add_argument("--force", action="store_true", help="Re-download tiles already cached")
+
+    import_cmd = subparsers.add_parser("import_tiles", help="Import tiles from an MBTiles archive")
+    import_cmd.add_argument("path", help="Path to .mbtiles file")
+
+    for cmd in (seed_cmd, import_cmd):
+        cmd.add_argument("--cache", help="Tile cache file (default: /home/rpi/Data/tiles.mbtiles, "
+                         "or ~/.cache/groundstation/ off the Pi)")
+        cmd.add_argument("--budget-mb", type=int, default=DEFAULT_TILE_BUDGET_MB,
+                         help="Cache size budget in MB")
+
+    # Redis spill queue
+    subparsers.add_parser("spill_status", help="Show the daemon's Redis spill queue depth and replay rate")
+
+    # Receive diversity
+    subparsers.add_parser("receiver_stats", help="Show per-receiver frame counts from diversity combining")
+
+    # Frame validation
+    quarantine_cmd = subparsers.add_parser("quarantine", help="Show validation counters and recently rejected frames")
+    quarantine_cmd.add_argument("--flight", help="Flight name (default: current flight)")
+    quarantine_cmd.add_argument("--count", type=int, default=20, help="Rejected frames to show")
+
+    # Flight catalog
+    subparsers.add_parser("flights", help="List flights in the catalog")
+
+    info_cmd = subparsers.add_parser("flight_info", help="Show a flight's catalog entry and files")
+    info_cmd.add_argument("flight")
+
+    compare_cmd = subparsers.add_parser("compare", help="Summarize one channel across flights (single TS.MRANGE)")
+    compare_cmd.add_argument("channel", help="Channel key, e.g. bmp280.altitude")
+    compare_cmd.add_argument("flights", nargs="*", help="Flights to compare (default: all)")
+    compare_cmd.add_argument("--aggregation", choices=["avg", "min", "max", "first", "last"],
+                             help="Downsample server-side before transfer")
+    compare_cmd.add_argument("--bucket-ms", type=int, default=1000)
+
+    subparsers.add_parser("catalog_rebuild",
+                          help="Catalog and label flights recorded before the catalog existed (scans keys)")
+
+    # Bulk re-decoding of archived flights
+    re_cmd = subparsers.add_parser("reprocess", help="Re-decode archived flight logs / CSVs in parallel")
+    re_cmd.add_argument("paths", nargs="+", help="Flight log directories and/or CSV files")
+    re_cmd.add_argument("--flight", help="Write under this flight name (default: from the file names)")
+    re_cmd.add_argument("--npz", metavar="DIR", help="Write columnar .npz files to DIR instead of Redis")
+    re_cmd.add_argument("--jobs", type=int, help="Worker processes (default: CPU count)")
+    re_cmd.add_argument("--force", action="store_true",
+                        help="Import CSVs even if the flight already has data in Redis (adds shifted copies)")
+
+    # Live telemetry fan-out
+    live_cmd = subparsers.add_parser("live_server", help="Serve live telemetry over WebSocket/SSE")
+    live_cmd.add_argument("--host", default="0.0.0.0")
+    live_cmd.add_argument("--port", type=int, default=8765)
+    live_cmd.add_argument("--interval", type=float, default=0.1, help="Redis poll interval in seconds")
+
     # Run telemetry daemon command
-    telemetry_cmd = subparsers.add_parser("telemetry_daemon", help="Run telemetry daemon")
+    telemetry_cmd = subparsers.add_parser("telemetry_daemon", help="Run telemetry daemon (same as gs_daemon.py)")
 
     args = parser.parse_args()
+    push = lambda name, params, timeout=5.0: push_task_wait_response(
+        name, params, timeout=timeout, priority=args.priority, deadline=args.deadline)
 
     # Map CLI commands to task format
     if args.command == "change_freq":
-        push_task_wait_response("change_frequency", {"frequency": args.frequency})
+        push("change_frequency", {"frequency": args.frequency})
     elif args.command == "force_ground_freq":
-        push_task_wait_response("force_ground_frequency", {"frequency": args.frequency})
+        push("force_ground_frequency", {"frequency": args.frequency})
+    elif args.command == "set_data_rate":
+        push("change_data_rate", {"preset": args.preset}, timeout=15.0)
+    elif args.command == "set_spreading_factor":
+        push("change_data_rate", {"spreading_factor": args.spreading_factor}, timeout=15.0)
+    elif args.command == "set_bandwidth":
+        push("change_data_rate", {"bandwidth": args.bandwidth}, timeout=15.0)
+    elif args.command == "set_coding_rate":
+        push("change_data_rate", {"coding_rate": args.coding_rate}, timeout=15.0)
+    elif args.command == "auto_data_rate":
+        push("auto_data_rate", {"enabled": args.mode == "on"})
     elif args.command == "send_flight_ready":
-        push_task_wait_response("send_flight_ready", {})
+        push("send_flight_ready", {})
     elif args.command == "set_gs_id":
-        push_task_wait_response("set_ground_station_id", {"id": args.id})
+        push("set_ground_station_id", {"id": args.id})
     elif args.command == "set_rocket_id":
-        push_task_wait_response("set_rocket_id", {"id": args.id})
-    elif args.command == "telemetry_daemon":
-        print("Starting telemetry daemon...")
-        telemetry_process = TelemetryDataProcess()
-        telemetry_process.start()
+        push("set_rocket_id", {"id": args.id})
+    elif args.command == "task_status":
+        show_task_status(args.task_id)
+    elif args.command == "cancel_task":
+        push("cancel_task", {"task_id": args.task_id})
+    elif args.command in ("seed_tiles", "import_tiles"):
+        from common.tile_cache import TileCache
+        cache = TileCache(args.cache, budget_bytes=args.budget_mb * 1024 ** 2)
+        if args.command == "seed_tiles":
+            downloaded, skipped, failed = cache.seed(args.lat1, args.lon1, args.lat2, args.lon2,
+                                                     args.min_zoom, args.max_zoom, force=args.force)
+            print(f"Downloaded {downloaded}, already cached {skipped}, failed {failed}")
+        else:
+            print(f"Imported {cache.import_mbtiles(args.path)} tiles")
+        print(f"Cache: {cache.stats()}")
+        cache.close()
+    elif args.command == "spill_status":
+        from common.resilient_writer import SPILL_STATUS_KEY
+        status = get_redis().hgetall(SPILL_STATUS_KEY)
+        if not status:
+            print("No spill status published (daemon not running or Redis down)")
+        for name, value in status.items():
+            print(f"{name:15}: {value}")
+    elif args.command == "receiver_stats":
+        from gs_data.diversity import RECEIVER_STATS_KEY
+        stats = get_redis().hgetall(RECEIVER_STATS_KEY)
+        if not stats:
+            print("No receiver stats published (single receiver or daemon not running)")
+        print(f"{'receiver':12} {'received':>9} {'dups':>7} {'first':>7} {'chosen':>7} {'unique':>7}")
+        for receiver, value in sorted(stats.items()):
+            s = json.loads(value)
+            print(f"{receiver:12} {s['received']:9} {s['duplicates']:7} {s['first']:7} "
+                  f"{s['chosen']:7} {s['unique']:7}")
+    elif args.command == "quarantine":
+        from gs_data.validation import VALIDATION_STATS_KEY
+        r = get_redis()
+        stats = r.hgetall(VALIDATION_STATS_KEY)
+        if not stats:
+            print("No validation stats published (daemon not running)")
+        for name, value in sorted(stats.items()):
+            print(f"{name:14} {int(value):9}")
+        flight = args.flight or r.get("current_flight")
+        for entry_id, f in r.xrevrange(f"{flight}.quarantine", count=args.count) if flight else []:
+            stamp = time.strftime("%H:%M:%S", time.localtime(int(f["host_time_ms"]) / 1000))
+            print(f"{stamp} {f['reason']:14} {f['detail']:32} rssi {f['rssi']:>6} {f['raw']}")
+    elif args.command == "flights":
+        from common.flight_catalog import FlightCatalog
+        catalog = FlightCatalog(get_redis())
+        print(f"{'flight':20} {'first frame':20} {'duration':>10} {'frames':>9}")
+        for name in catalog.flights():
+            entry = catalog.get(name) or {}
+            first, last = entry.get("first_ms"), entry.get("last_ms")
+            started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(first / 1000)) if first else "-"
+            duration = f"{(last - first) / 1000:.0f} s" if first and last else "-"
+            print(f"{name:20} {started:20} {duration:>10} {entry.get('frames', 0):9}")
+    elif args.command == "flight_info":
+        from common.flight_catalog import FlightCatalog
+        entry = FlightCatalog(get_redis()).get(args.flight)
+        if entry is None:
+            print(f"Unknown flight: {args.flight}")
+        else:
+            for name, value in entry.items():
+                if name != "files":
+                    print(f"{name:12}: {value}")
+            for session in entry["files"]:
+                print(f"session {session['started_ms']}: csv={session['csv']} log={session['log']}")
+    elif args.command == "compare":
+        from common.redis_helper import RedisHelper
+        series = RedisHelper().ts_mrange(args.channel, args.flights or None, aggregation=args.aggregation,
+                                         bucket_ms=args.bucket_ms) or {}
+        if not series:
+            print(f"No data for {args.channel}")
+        print(f"{'flight':20} {'samples':>8} {'min':>12} {'max':>12} {'mean':>12}")
+        for flight, samples in series.items():
+            values = [v for _, v in samples]
+            if values:
+                print(f"{flight:20} {len(values):8} {min(values):12.3f} {max(values):12.3f} "
+                      f"{sum(values) / len(values):12.3f}")
+    elif args.command == "catalog_rebuild":
+        from common.redis_helper import RedisHelper
+        flights = RedisHelper().rebuild_catalog()
+        print(f"Catalogued {len(flights)} flights: {', '.join(flights)}")
+    elif args.command == "reprocess":
+        from gs_data.reprocess import reprocess
+        results = reprocess(args.paths, flight=args.flight, output="npz" if args.npz else "redis",
+                            output_dir=args.npz, jobs=args.jobs, force=args.force)
+        if any(r["error"] for r in results):
+            raise SystemExit(1)
+    elif args.command == "live_server":
+        from gs_data.live_server import LiveTelemetryServer
         try:
-            while telemetry_process.is_alive():
-                time.sleep(1)
+            LiveTelemetryServer(host=args.host, port=args.port, interval=args.interval).run()
         except KeyboardInterrupt:
-            print("\nStopping telemetry daemon...")
-            telemetry_process.terminate()
-            telemetry_process.join()
+            print("\nStopping live server...")
+    elif args.command == "telemetry_daemon":
+        # Kept for existing service files; gs_daemon.py is the daemon entry point
+        from gs_daemon import run_daemon
+        run_daemon()
     else:
         parser.print_help()
 
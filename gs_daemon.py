@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+"""Ground station telemetry daemon entry point (started by groundstation.service)"""
+
+import argparse
+import signal
+import time
+from gs_data.data import TelemetryDataProcess, FLIGHT, PRIMARY_CS_PIN, PRIMARY_RESET_PIN
+
+def parse_receiver(spec):
+    """
+    ID:CS_PIN:RESET_PIN, e.g. "north:D22:D23"
+    """
+    try:
+        receiver_id, cs_pin, reset_pin = spec.split(":")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected ID:CS_PIN:RESET_PIN, got {spec!r}")
+    return {"receiver_id": receiver_id, "cs_pin": cs_pin, "reset_pin": reset_pin}
+
+def check_receivers(receivers):
+    """
+    Every radio on the shared SPI bus needs its own chip select and reset pin.
+    Returns an error message, or None.
+    """
+    used = {PRIMARY_CS_PIN: "primary", PRIMARY_RESET_PIN: "primary"}
+    for receiver in receivers:
+        for pin in (receiver["cs_pin"], receiver["reset_pin"]):
+            if pin in used:
+                return f"Receiver {receiver['receiver_id']}: pin {pin} is already used by {used[pin]}"
+            used[pin] = receiver["receiver_id"]
+    return None
+
+# Seconds the daemon gets to flush the writer, catalog and logs before it is killed
+SHUTDOWN_TIMEOUT = 15
+
+def run_daemon(flight_name=FLIGHT, receivers=None, relay=False):
+    print("Starting telemetry daemon...")
+    telemetry_process = TelemetryDataProcess(flight_name=flight_name, receivers=receivers, relay=relay)
+    telemetry_process.start()
+    # systemd stops the service with SIGTERM; shut down the same way as Ctrl-C
+    signal.signal(signal.SIGTERM, lambda signum, frame: telemetry_process.stop())
+    try:
+        while telemetry_process.is_alive():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nStopping telemetry daemon...")
+        telemetry_process.stop()
+    telemetry_process.join(timeout=SHUTDOWN_TIMEOUT)
+    if telemetry_process.is_alive():
+        print("Telemetry daemon did not stop in time, terminating")
+        telemetry_process.terminate()
+        telemetry_process.join()
+
+def run_relay(receiver_id, host):
+    """
+    Remote receiver: forward every packet to the central station instead of decoding it here.
+    """
+    import board
+    import redis
+    from gs_data.radio import RFM95Radio
+    from gs_data.diversity import relay_forward
+    radio = RFM95Radio(cs_pin=board.D17, reset_pin=board.D27, frequency=915.0, baudrate=4000000, node=100)
+    try:
+        relay_forward(receiver_id, radio, redis.Redis(host=host, port=6379))
+    except KeyboardInterrupt:
+        print("\nStopping relay...")
+
+def main():
+    parser = argparse.ArgumentParser(description="Ground Station Telemetry Daemon")
+    parser.add_argument("--flight", default=FLIGHT, help="Flight name used to namespace Redis keys")
+    parser.add_argument("--receiver", action="append", type=parse_receiver, default=[],
+                        help="Extra local receiver as ID:CS_PIN:RESET_PIN (repeatable)")
+    parser.add_argument("--relay", action="store_true",
+                        help="Also combine frames forwarded by remote receivers")
+    parser.add_argument("--relay-to", metavar="HOST",
+                        help="Run as a remote receiver forwarding frames to the station at HOST")
+    parser.add_argument("--receiver-id", default="remote", help="Name of this receiver when using --relay-to")
+    args = parser.parse_args()
+    error = check_receivers(args.receiver)
+    if error:
+        parser.error(error)
+    if args.relay_to:
+        run_relay(args.receiver_id, args.relay_to)
+    else:
+        run_daemon(args.flight, receivers=args.receiver, relay=args.relay)
+
+if __name__ == "__main__":
+    main()
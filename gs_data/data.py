@@ -1,19 +1,30 @@
 import json
 import os
+import redis
 import csv
+import signal
+import socket
+import threading
 import uuid
-from multiprocessing import Process, Queue
+from multiprocessing import Process, Event, Lock
 from datetime import datetime
 from common.redis_helper import RedisHelper, TelemetryKeys
-from .radio import RFM95Radio
-import board
+from common.resilient_writer import ResilientWriter
+from .radio import RFM95Radio, SharedSPI
+from .payload import FORMAT, FIELD_SCALES
+from .validation import FrameValidator, RateLimitedLog, VALIDATION_STATS_KEY
+from .scheduler import TaskScheduler, TASKS_KEY, respond
+from .estimator import FlightStateEstimator, FlightPhase
+from .flight_log import FlightLogWriter
+from .shared_frame import SharedFrameWriter
+from .diversity import FrameDeduplicator, ReceiverPool, ReceivedFrame, PRIMARY_RECEIVER, RECEIVER_STATS_KEY
+from .link import (DataRateController, DATA_RATES, DEFAULT_DATA_RATE, data_rate_index,
+                   data_rate_by_name, VALID_SPREADING_FACTORS, VALID_BANDWIDTHS, VALID_CODING_RATES)
 import struct
 import time
 from enum import Enum
 
 
-TASKS_KEY = "gs:tasks"
-
 class PacketType(Enum):
     PING = 1
     ACK_PONG = 2
@@ -24,37 +35,69 @@ class NetworkCommands(Enum):
     ENABLE_DEBUGGING = 1
     FLIGHT_READY = 2
     SWITCH_RADIO_FREQUENCY = 3
+    SWITCH_SPREADING_FACTOR = 4
+    SWITCH_SIGNAL_BANDWIDTH = 5
+    SWITCH_CODING_RATE = 6
+    SWITCH_DATA_RATE = 7
+
+# Payload layout following [COMMAND, <command>] for each radio setting command
+RADIO_SETTING_FORMATS = {
+    NetworkCommands.SWITCH_RADIO_FREQUENCY: "<f",
+    NetworkCommands.SWITCH_SPREADING_FACTOR: "<B",
+    NetworkCommands.SWITCH_SIGNAL_BANDWIDTH: "<I",
+    NetworkCommands.SWITCH_CODING_RATE: "<B",
+    NetworkCommands.SWITCH_DATA_RATE: "<BIB",
+}
+
+# Primary radio on SPI0; extra local receivers need other pins
+PRIMARY_CS_PIN = "D17"
+PRIMARY_RESET_PIN = "D27"
+
+# Seconds to wait for traffic on new data-rate settings before falling back
+LINK_CONFIRM_TIMEOUT = 5
+
+# Auto data rate follows the flight phase: throughput up to the fast preset
+# on the pad, kept through boost, then one switch to the range preset in
+# coast (before apogee) held through descent. SNR/loss stepping only runs on
+# the ground; in flight a failed renegotiation costs data we can't get back.
+AUTO_RATE_CEILING = data_rate_by_name("fast")
+AUTO_RATE_APOGEE = data_rate_by_name("range")
+AUTO_RATE_STEPPING_PHASES = (FlightPhase.PAD, FlightPhase.LANDED)
+
+# The radio loop talks to Redis directly (task polling, relay frames,
+# stats); a slow or half-open server may block it for at most REDIS_TIMEOUT
+# seconds, after which those calls are skipped for REDIS_RETRY_INTERVAL
+REDIS_TIMEOUT = 1.0
+REDIS_RETRY_INTERVAL = 5.0
 
 
 
 FLIGHT = "TEST01"
 
-"""
-+--------------------+-----------+-------+------------+-------------------------------+
-| Field              | Type      | Bytes | Multiplier | Description                   |
-+--------------------+-----------+-------+------------+-------------------------------+
-| BMP280 Temp        | int16_t   | 2     | *100       | Temperature in °C             |
-| Pressure           | uint32_t  | 4     | *100       | Pressure in hPa               |
-| BMP280 Altitude    | int16_t   | 2     | *10        | Altitude in meters            |
-| Accel X/Y/Z        | int16_t*3 | 6     | *100       | Acceleration in m/s²          |
-| Gyro X/Y/Z         | int16_t*3 | 6     | *100       | Angular velocity in °/s       |
-| IMU Temp           | int16_t   | 2     | *100       | IMU temperature in °C         |
-| Mag X/Y/Z          | int16_t*3 | 6     | *100       | Magnetic field in µT          |
-| Extra Temp Sensor  | int16_t   | 2     | *100       | External temp in °C           |
-| GPS Latitude       | int32_t   | 4     | *1e7       | Degrees                       |
-| GPS Longitude      | int32_t   | 4     | *1e7       | Degrees                       |
-| GPS Altitude       | int16_t   | 2     | *10        | Altitude in meters            |
-| GPS Speed          | uint16_t  | 2     | *100       | Speed in knots                |
-| GPS Angle          | uint16_t  | 2     | *100       | Heading angle in degrees      |
-| timestamp          | uint32_t  | 4     | *1         | Timestamp of data             |
-+--------------------+-----------+-------+------------+-------------------------------+
-| TOTAL              |           | 54    |            |                               |
-+--------------------+-----------+-------+------------+-------------------------------+
-
-"""
-
-# Define the format string for struct.unpack
-FORMAT = "<h I h 3h 3h h 3h h i i h H H I"
+# Time series written for every decoded frame: (key, TelemetryData attribute)
+TELEMETRY_CHANNELS = [
+    (TelemetryKeys.BMP280_TEMP, "bmp280_temp"),
+    (TelemetryKeys.BMP280_PRESSURE, "bmp280_pressure"),
+    (TelemetryKeys.BMP280_ALTITUDE, "bmp280_altitude"),
+    (TelemetryKeys.ACCEL_X, "accel_x"),
+    (TelemetryKeys.ACCEL_Y, "accel_y"),
+    (TelemetryKeys.ACCEL_Z, "accel_z"),
+    (TelemetryKeys.GYRO_X, "gyro_x"),
+    (TelemetryKeys.GYRO_Y, "gyro_y"),
+    (TelemetryKeys.GYRO_Z, "gyro_z"),
+    (TelemetryKeys.ACCEL_TEMP, "imu_temp"),
+    (TelemetryKeys.MAG_X, "mag_x"),
+    (TelemetryKeys.MAG_Y, "mag_y"),
+    (TelemetryKeys.MAG_Z, "mag_z"),
+    (TelemetryKeys.TEMP_SENSOR, "extra_temp_sensor"),
+    (TelemetryKeys.GPS_LATITUDE, "gps_latitude"),
+    (TelemetryKeys.GPS_LONGITUDE, "gps_longitude"),
+    (TelemetryKeys.GPS_ALTITUDE, "gps_altitude"),
+    (TelemetryKeys.GPS_SPEED, "gps_speed"),
+    (TelemetryKeys.GPS_ANGLE, "gps_angle"),
+    (TelemetryKeys.GPS_COORDS_STR, "gps_coords_str"),
+    (TelemetryKeys.TIMESTAMP, "timestamp"),
+]
 
 class TelemetryData:
     def __init__(self):
@@ -85,51 +128,7 @@ class TelemetryData:
         Unpack the data string into the TelemetryData object.
         """
         try:
-            unpacked_data = struct.unpack(FORMAT, data)
-            (self.bmp280_temp,
-             self.bmp280_pressure,
-             self.bmp280_altitude,
-             self.accel_x,
-             self.accel_y,
-             self.accel_z,
-             self.gyro_x,
-             self.gyro_y,
-             self.gyro_z,
-             self.imu_temp,
-             self.mag_x,
-             self.mag_y,
-             self.mag_z,
-             self.extra_temp_sensor,
-             self.gps_latitude,
-             self.gps_longitude,
-             self.gps_altitude,
-             self.gps_speed,
-             self.gps_angle,
-             self.timestamp) = unpacked_data
-            
-            # Convert to appropriate units
-            self.bmp280_temp = int(self.bmp280_temp)/100
-            self.bmp280_pressure = int(self.bmp280_pressure)/100
-            self.bmp280_altitude = int(self.bmp280_altitude)/10
-            self.accel_x = int(self.accel_x)/100
-            self.accel_y = int(self.accel_y)/100
-            self.accel_z = int(self.accel_z)/100
-            self.gyro_x = int(self.gyro_x)/100
-            self.gyro_y = int(self.gyro_y)/100
-            self.gyro_z = int(self.gyro_z)/100
-            self.imu_temp = int(self.imu_temp)/100
-            self.mag_x = int(self.mag_x)/100
-            self.mag_y = int(self.mag_y)/100
-            self.mag_z = int(self.mag_z)/100
-            self.extra_temp_sensor /= 100
-            self.gps_latitude = int(self.gps_latitude)/1e7
-            self.gps_longitude = int(self.gps_longitude)/1e7
-            self.gps_altitude = int(self.gps_altitude)/10
-            self.gps_speed = (int(self.gps_speed)/100)* 0.514444  # Convert knots to m/s
-            self.gps_angle = int(self.gps_angle)/100
-            self.timestamp = int(self.timestamp)
-            self.gps_coords_str = f"{self.gps_latitude:.7f}, {self.gps_longitude:.7f}"
-            
+            self.load(struct.unpack(FORMAT, data))
             return True
         except struct.error as e:
             print(f"Error unpacking data: {e}")
@@ -140,6 +139,39 @@ class TelemetryData:
 
         return False
 
+    def load(self, values):
+        """
+        Fill the fields from raw payload integers in FORMAT order.
+        """
+        (self.bmp280_temp,
+         self.bmp280_pressure,
+         self.bmp280_altitude,
+         self.accel_x,
+         self.accel_y,
+         self.accel_z,
+         self.gyro_x,
+         self.gyro_y,
+         self.gyro_z,
+         self.imu_temp,
+         self.mag_x,
+         self.mag_y,
+         self.mag_z,
+         self.extra_temp_sensor,
+         self.gps_latitude,
+         self.gps_longitude,
+         self.gps_altitude,
+         self.gps_speed,
+         self.gps_angle,
+         self.timestamp) = values
+
+        # Convert to appropriate units
+        for name, divisor, factor in FIELD_SCALES:
+            value = int(getattr(self, name))
+            if divisor != 1:
+                value = value / divisor * factor
+            setattr(self, name, value)
+        self.gps_coords_str = f"{self.gps_latitude:.7f}, {self.gps_longitude:.7f}"
+
     
     def __str__(self):
         return (f"TelemetryData:"
@@ -167,21 +199,54 @@ class TelemetryData:
 
 
 class TelemetryDataProcess(Process):
-    def __init__(self, flight_name=FLIGHT):
+    def __init__(self, flight_name=FLIGHT, radio=None, receivers=None, relay=False, diversity_window=None):
+        """
+        receivers: extra local radios, as ReceiverProcess keyword dicts
+            ({"receiver_id", "cs_pin", "reset_pin", ...}).
+        relay: also accept frames pushed by remote receivers onto gs:relay:frames.
+        diversity_window: seconds to wait for other copies of a frame before
+            storing the best one (default 50 ms with extra receivers, else 0).
+        """
         super().__init__()
-        self.queue = Queue()
-        self.redis_helper = RedisHelper(flight_name=flight_name)
+        self.redis_helper = RedisHelper(flight_name=flight_name, socket_timeout=REDIS_TIMEOUT)
+        self.redis_retry_at = 0.0
         self.redis_helper.init_keys()
 
+        # Extra local receivers share SPI0 with the primary radio from their own processes
+        spi_lock = Lock() if receivers else None
+        if radio is None:
+            # Hardware libraries are only needed when driving the real radio
+            import board
+            # default SPI bus (SPI0) 
+            #   SCLK = GPIO11 (Pin 23)
+            #   MOSI = GPIO10 (Pin 19)
+            #   MISO = GPIO9 (Pin 21)
+            spi = board.SPI() 
+            if spi_lock is not None:
+                spi = SharedSPI(spi, spi_lock)
+
+            radio = RFM95Radio(spi=spi, cs_pin=getattr(board, PRIMARY_CS_PIN),
+                               reset_pin=getattr(board, PRIMARY_RESET_PIN),
+                               frequency=915, baudrate=4000000, node=100)
+        self.radio = radio
+        self.rate_controller = DataRateController(index=DEFAULT_DATA_RATE)
+        self.estimator = FlightStateEstimator()
+        self.apogee_rate_attempted = False
 
-        # default SPI bus (SPI0) 
-        #   SCLK = GPIO11 (Pin 23)
-        #   MOSI = GPIO10 (Pin 19)
-        #   MISO = GPIO9 (Pin 21)
-        spi = board.SPI() 
+        # Receive diversity
+        diverse = bool(receivers) or relay
+        if diversity_window is None:
+            diversity_window = 0.05 if diverse else 0.0
+        self.deduplicator = FrameDeduplicator(window=diversity_window)
+        self.receiver_pool = ReceiverPool(receivers or [], redis=self.redis_helper.redis,
+                                          relay=relay, spi_lock=spi_lock) if diverse else None
+        # Short radio polls so copies from other receivers aren't held back by the primary
+        self.receive_timeout = 0.1 if diverse else None
+        self.last_receiver_report = 0.0
 
-        self.radio = RFM95Radio(spi=spi, cs_pin=board.D17, reset_pin=board.D27, 
-                                frequency=915, baudrate=4000000, node=100)
+        # Frames are checked on their raw integers before decoding
+        self.log = RateLimitedLog()
+        self.validator = FrameValidator(log=self.log)
         
         # CSV logging setup
         self.telemetry_dir = "/home/rpi/Data"
@@ -189,7 +254,14 @@ class TelemetryDataProcess(Process):
         start_time = datetime.now().strftime("%Y%m%dT%H%M%S")
         unique_id = uuid.uuid4().hex[:8]
         self.csv_filename = f"{flight_name}_{start_time}_{unique_id}.csv"
+        # Binary flight log with a time index, next to the CSV
+        self.log_dir = os.path.join(self.telemetry_dir, f"{flight_name}_{start_time}_{unique_id}")
+        self.flight_log = FlightLogWriter(self.log_dir)
         self.csv_path = os.path.join(self.telemetry_dir, self.csv_filename)
+        # Redis writes happen on a background thread and spill to disk when Redis is down
+        self.writer = ResilientWriter(spill_path=os.path.join(self.telemetry_dir, "spill.db"),
+                                      on_reconnect=self.on_redis_reconnect,
+                                      streams=self.redis_helper.stream_keys())
         self.csv_file = open(self.csv_path, "a", newline="")
         self.csv_writer = None
         self.csv_headers = [
@@ -209,9 +281,36 @@ class TelemetryDataProcess(Process):
             self.csv_writer = csv.DictWriter(self.csv_file, fieldnames=self.csv_headers)
 
         self._db_str = ""
+        # Created in run(), owned by the daemon process
+        self.shared_frame = None
+        # Set by stop() to end run() after the current loop iteration
+        self.stop_requested = Event()
+
+        self.flight_registered = False
+        self.register_flight()
+
+    def register_flight(self):
+        """
+        Record this session's flight and file locations in the flight catalog.
+        """
+        try:
+            self.redis_helper.catalog.register(
+                self.redis_helper.flight_name, csv_path=self.csv_path, log_dir=self.log_dir,
+                host=socket.gethostname(), data_rate=DATA_RATES[self.rate_controller.index].name)
+            self.flight_registered = True
+        except redis.exceptions.RedisError as e:
+            print(f"[CATALOG] Failed to register flight: {e}")
+
+    def on_redis_reconnect(self):
+        self.redis_helper.init_keys()
+        if not self.flight_registered:
+            self.register_flight()
     
-    def receive(self):
-        data = self.radio.receive()
+    def receive(self, timeout=None):
+        if timeout is None:
+            data = self.radio.receive()
+        else:
+            data = self.radio.receive(timeout=timeout)
         if data is None:
             return None
         
@@ -220,46 +319,135 @@ class TelemetryDataProcess(Process):
         else:
             return None
     
+    def stop(self):
+        """
+        Ask run() to shut down cleanly; safe to call from another thread or process.
+        """
+        self.stop_requested.set()
+
     def handle_command(self, command):
         pass
 
-    def handle_telemetry(self, data):
-        # Decode the data, convert back to floating point and construct TelemetryData
+    def handle_telemetry(self, data, rssi=None, snr=None):
+        if rssi is None:
+            rssi = self.radio.rssi()
+        if snr is None:
+            snr = self.radio.snr()
+        # Rejected frames go to the quarantine stream only, never to storage or the estimator
+        raw, reason, detail, masked = self.validator.check(data)
+        if reason is not None:
+            self.quarantine(data, reason, detail, rssi, snr)
+            return
+        # Decode the validated integers, convert back to floating point and construct TelemetryData
         telemetry_data = TelemetryData()
-        if telemetry_data.unpack(data):
-            self._db_str = str(telemetry_data)
-            self.redis_helper.ts_append(TelemetryKeys.BMP280_TEMP, telemetry_data.bmp280_temp)
-            self.redis_helper.ts_append(TelemetryKeys.BMP280_PRESSURE, telemetry_data.bmp280_pressure)
-            self.redis_helper.ts_append(TelemetryKeys.BMP280_ALTITUDE, telemetry_data.bmp280_altitude)
-            self.redis_helper.ts_append(TelemetryKeys.ACCEL_X, telemetry_data.accel_x)
-            self.redis_helper.ts_append(TelemetryKeys.ACCEL_Y, telemetry_data.accel_y)
-            self.redis_helper.ts_append(TelemetryKeys.ACCEL_Z, telemetry_data.accel_z)
-            self.redis_helper.ts_append(TelemetryKeys.GYRO_X, telemetry_data.gyro_x)
-            self.redis_helper.ts_append(TelemetryKeys.GYRO_Y, telemetry_data.gyro_y)
-            self.redis_helper.ts_append(TelemetryKeys.GYRO_Z, telemetry_data.gyro_z)
-            self.redis_helper.ts_append(TelemetryKeys.ACCEL_TEMP, telemetry_data.imu_temp)
-            self.redis_helper.ts_append(TelemetryKeys.MAG_X, telemetry_data.mag_x)
-            self.redis_helper.ts_append(TelemetryKeys.MAG_Y, telemetry_data.mag_y)
-            self.redis_helper.ts_append(TelemetryKeys.MAG_Z, telemetry_data.mag_z)
-            self.redis_helper.ts_append(TelemetryKeys.TEMP_SENSOR, telemetry_data.extra_temp_sensor)
-            self.redis_helper.ts_append(TelemetryKeys.GPS_LATITUDE, telemetry_data.gps_latitude)
-            self.redis_helper.ts_append(TelemetryKeys.GPS_LONGITUDE, telemetry_data.gps_longitude)
-            self.redis_helper.ts_append(TelemetryKeys.GPS_ALTITUDE, telemetry_data.gps_altitude)
-            self.redis_helper.ts_append(TelemetryKeys.GPS_SPEED, telemetry_data.gps_speed)
-            self.redis_helper.ts_append(TelemetryKeys.GPS_ANGLE, telemetry_data.gps_angle)
-            self.redis_helper.ts_append(TelemetryKeys.GPS_COORDS_STR, telemetry_data.gps_coords_str)
-            self.redis_helper.ts_append(TelemetryKeys.TIMESTAMP, telemetry_data.timestamp)
-            # CSV logging
+        telemetry_data.load(raw)
+        self._db_str = str(telemetry_data)
+        self.rate_controller.update(snr, telemetry_data.timestamp)
+        # One receive timestamp for every series, so a spilled frame is
+        # backfilled exactly where it would have landed
+        host_time_ms = int(time.time() * 1000)
+        if self.shared_frame is not None:
+            self.shared_frame.publish(telemetry_data, raw=data, rssi=rssi,
+                                      snr=snr, host_time_ms=host_time_ms)
+        self.writer.write(host_time_ms, {
+            self.redis_helper._key(key): getattr(telemetry_data, attr)
+            for key, attr in TELEMETRY_CHANNELS if attr not in masked
+        })
+        # CSV logging
+        try:
+            row = {k: getattr(telemetry_data, k) for k in self.csv_headers}
+            self.csv_writer.writerow(row)
+            self.csv_file.flush()
+            os.fsync(self.csv_file.fileno())
+        except Exception as e:
+            print(f"[CSV ERROR] {e}")
+        try:
+            self.flight_log.append(telemetry_data, raw=data, rssi=rssi, snr=snr,
+                                   host_time_ms=host_time_ms)
+        except Exception as e:
+            print(f"[FLIGHT LOG ERROR] {e}")
+        # Derived state last, so raw storage never waits on it
+        self.update_estimator(telemetry_data, host_time_ms)
+        self.redis_helper.catalog.record_frame(self.redis_helper.flight_name, host_time_ms)
+
+    def quarantine(self, data, reason, detail, rssi, snr):
+        fields = {
+            "reason": reason.name, "detail": detail, "raw": bytes(data).hex(),
+            "rssi": rssi, "snr": snr, "host_time_ms": int(time.time() * 1000),
+        }
+        try:
+            # Stream fields can't be None (no link stats from a relayed copy)
+            self.redis_helper.add_quarantine({k: "" if v is None else v for k, v in fields.items()})
+        except (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError) as e:
+            self.log.log("QUARANTINE", f"Redis unavailable: {e}")
+        except redis.exceptions.ResponseError as e:
+            self.log.log("QUARANTINE", f"Failed to store rejected frame: {e}")
+
+    def update_estimator(self, telemetry_data, host_time_ms):
+        try:
+            events = self.estimator.update(telemetry_data)
+            outputs = self.estimator.outputs()
+        except Exception as e:
+            print(f"[ESTIMATOR ERROR] {e}")
+            return
+        samples = {
+            self.redis_helper._key(TelemetryKeys.EST_ALTITUDE): outputs["altitude"],
+            self.redis_helper._key(TelemetryKeys.EST_VELOCITY): outputs["velocity"],
+            self.redis_helper._key(TelemetryKeys.EST_PHASE): outputs["phase"],
+        }
+        if "landing_latitude" in outputs:
+            samples[self.redis_helper._key(TelemetryKeys.EST_LANDING_LATITUDE)] = outputs["landing_latitude"]
+            samples[self.redis_helper._key(TelemetryKeys.EST_LANDING_LONGITUDE)] = outputs["landing_longitude"]
+        self.writer.write(host_time_ms, samples)
+        for event in events:
+            print(f"[FLIGHT EVENT] {event}")
             try:
-                row = {k: getattr(telemetry_data, k) for k in self.csv_headers}
-                self.csv_writer.writerow(row)
-                self.csv_file.flush()
-                os.fsync(self.csv_file.fileno())
-            except Exception as e:
-                print(f"[CSV ERROR] {e}")
-        else:
-            print("Failed to unpack telemetry data")
-        
+                self.redis_helper.add_event(event)
+                if event["event"] == "apogee":
+                    self.redis_helper.set("apogee", json.dumps(event))
+            except redis.exceptions.RedisError as e:
+                print(f"[EVENT ERROR] {e}")
+
+    def handle_diversity(self):
+        """
+        Merge frames from the other receivers and store each frame's best copy once.
+        """
+        if self.receiver_pool is not None:
+            frames = self.receiver_pool.poll()
+            if self.receiver_pool.relay and self.redis_available():
+                try:
+                    frames += self.receiver_pool.poll_relay()
+                except redis.exceptions.RedisError as e:
+                    self.redis_unavailable("RELAY", e)
+            for frame in frames:
+                if frame.data and frame.data[0] == PacketType.SENSOR_DATA.value:
+                    self.deduplicator.offer(frame)
+        for frame in self.deduplicator.ready():
+            self.handle_telemetry(frame.data[1:], rssi=frame.rssi, snr=frame.snr)
+
+        if time.time() - self.last_receiver_report >= 5.0 and self.redis_available():
+            self.last_receiver_report = time.time()
+            report = self.deduplicator.report()
+            try:
+                if report:
+                    self.redis_helper.redis.hset(RECEIVER_STATS_KEY, mapping={
+                        receiver: json.dumps(stats) for receiver, stats in report.items()
+                    })
+                self.redis_helper.redis.hset(VALIDATION_STATS_KEY, mapping=self.validator.stats)
+            except redis.exceptions.RedisError as e:
+                self.redis_unavailable("STATS", e)
+
+    def redis_available(self):
+        """
+        False while backing off after a Redis error in the radio loop.
+        """
+        return time.time() >= self.redis_retry_at
+
+    def redis_unavailable(self, tag, error):
+        # Telemetry keeps flowing through the writer's spill queue meanwhile
+        print(f"[{tag}] Redis unavailable, retrying in {REDIS_RETRY_INTERVAL:g} s: {error}")
+        self.redis_retry_at = time.time() + REDIS_RETRY_INTERVAL
+
     def db_str(self):
         return self._db_str
     
@@ -283,39 +471,159 @@ class TelemetryDataProcess(Process):
             - Switch local frequency only after sending acknowledgment.
         """
 
-        packet = struct.pack("<BBf",
-                             PacketType.COMMAND.value,
-                             NetworkCommands.SWITCH_RADIO_FREQUENCY.value,
-                             frequency)
+        res, err = self.negotiate_radio_setting(NetworkCommands.SWITCH_RADIO_FREQUENCY, frequency)
+        if res:
+            print(f"Frequency switch confirmed to {frequency} MHz")
+            self.radio.set_frequency(frequency)
+            self.retune_receivers({"frequency": frequency})
+        return res, err
+
+    def negotiate_radio_setting(self, command, *values):
+        """
+        Echo-and-ACK handshake shared by all radio setting commands.
+
+        Sends [COMMAND, command, payload], waits up to 3 seconds for the
+        rocket to echo [ACK_PONG, command, payload] byte for byte, then sends
+        the final [ACK_PONG, command]. The caller applies the new setting
+        locally only when this returns True.
+        """
+        payload = struct.pack(RADIO_SETTING_FORMATS[command], *values)
+        packet = struct.pack("<BB", PacketType.COMMAND.value, command.value) + payload
         self.radio.send(packet)
         # Wait for ACK. 3 seconds timeout
         cur_time = time.time()
-        print(f"sent frequency change command [{packet}]. Waiting for ACK")
+        print(f"sent {command.name} command [{packet}]. Waiting for ACK")
         while time.time() - cur_time < 3:
             ack = self.receive()
             if ack is not None:
                 print("Potential ACK received. Checking...")
-            if ack is not None and len(ack) == 6:
+            if ack is not None and len(ack) == len(packet):
                 # Check if the command matches
                 if ack[0] == PacketType.ACK_PONG.value \
-                    and ack[1] == NetworkCommands.SWITCH_RADIO_FREQUENCY.value:
-                    # Extract frequency from the response
-                    received_freq = struct.unpack("<f", ack[2:])[0]
-                    if received_freq == frequency:
-                        print(f"Frequency switch confirmed to {frequency} MHz")
+                    and ack[1] == command.value:
+                    if ack[2:] == payload:
                         # send ack
                         packet = struct.pack("<BB",
                              PacketType.ACK_PONG.value,
-                             NetworkCommands.SWITCH_RADIO_FREQUENCY.value)
+                             command.value)
                         self.radio.send(packet)
-                        self.radio.set_frequency(frequency)
                         return True, ""
                     else:
-                        print(f"Frequency mismatch: expected {frequency}, got {received_freq}")
-                        return False, f"Frequency mismatch: expected {frequency}, got {received_freq}"
-        print("No acknowledgment received within timeout. Frequency switch aborted.")
+                        received = struct.unpack(RADIO_SETTING_FORMATS[command], ack[2:])
+                        print(f"{command.name} mismatch: expected {values}, got {received}")
+                        return False, f"{command.name} mismatch: expected {values}, got {received}"
+        print(f"No acknowledgment received within timeout. {command.name} aborted.")
         return False, "No acknowledgment received within timeout."
-    
+
+    def current_data_rate(self):
+        return (self.radio.spreading_factor(), self.radio.signal_bandwidth(), self.radio.coding_rate())
+
+    def apply_data_rate(self, spreading_factor, bandwidth, coding_rate):
+        self.radio.set_spreading_factor(spreading_factor)
+        self.radio.set_signal_bandwidth(bandwidth)
+        self.radio.set_coding_rate(coding_rate)
+        self.retune_receivers({"spreading_factor": spreading_factor, "bandwidth": bandwidth,
+                               "coding_rate": coding_rate})
+
+    def retune_receivers(self, settings):
+        """
+        Keep the extra and remote receivers on the primary radio's settings.
+        """
+        if self.receiver_pool is not None:
+            self.receiver_pool.retune(settings)
+
+    def wait_for_link(self, timeout=LINK_CONFIRM_TIMEOUT):
+        """
+        Listen for any packet from the rocket. Telemetry received while
+        waiting goes through the deduplicator as usual so the check doesn't
+        drop frames.
+        """
+        cur_time = time.time()
+        while time.time() - cur_time < timeout:
+            data = self.receive()
+            if data is not None:
+                if data[0] == PacketType.SENSOR_DATA.value:
+                    self.deduplicator.offer(ReceivedFrame(PRIMARY_RECEIVER, data,
+                                                          self.radio.rssi(), self.radio.snr()))
+                return True
+        return False
+
+    def perform_data_rate_change(self, spreading_factor=None, bandwidth=None, coding_rate=None):
+        """
+        Negotiate new LoRa modulation settings with the rocket.
+
+        Uses the same echo-and-ACK handshake as the frequency change. A single
+        setting is sent with its own command, anything else goes out as one
+        atomic SWITCH_DATA_RATE so the link never sits on a half-applied
+        combination. After switching, the ground station listens for up to
+        LINK_CONFIRM_TIMEOUT seconds; if nothing is heard it reverts to the
+        previous settings (the rocket is expected to do the same when it
+        stops hearing the ground station).
+        """
+        previous = self.current_data_rate()
+        target = (spreading_factor if spreading_factor is not None else previous[0],
+                  bandwidth if bandwidth is not None else previous[1],
+                  coding_rate if coding_rate is not None else previous[2])
+        if target == previous:
+            return True, ""
+
+        changed = [v is not None for v in (spreading_factor, bandwidth, coding_rate)]
+        if changed == [True, False, False]:
+            res, err = self.negotiate_radio_setting(NetworkCommands.SWITCH_SPREADING_FACTOR, spreading_factor)
+        elif changed == [False, True, False]:
+            res, err = self.negotiate_radio_setting(NetworkCommands.SWITCH_SIGNAL_BANDWIDTH, bandwidth)
+        elif changed == [False, False, True]:
+            res, err = self.negotiate_radio_setting(NetworkCommands.SWITCH_CODING_RATE, coding_rate)
+        else:
+            res, err = self.negotiate_radio_setting(NetworkCommands.SWITCH_DATA_RATE, *target)
+        if not res:
+            return res, err
+
+        self.apply_data_rate(*target)
+        if not self.wait_for_link():
+            print(f"No traffic on SF{target[0]}/{target[1]}Hz/CR4/{target[2]}. Falling back.")
+            self.apply_data_rate(*previous)
+            return False, "No traffic after data rate switch, reverted to previous settings."
+
+        print(f"Data rate switch confirmed to SF{target[0]}/{target[1]}Hz/CR4/{target[2]}")
+        index = data_rate_index(target)
+        self.rate_controller.reset(index if index is not None else self.rate_controller.index)
+        self.redis_helper.set("data_rate", json.dumps({
+            "spreading_factor": target[0],
+            "bandwidth": target[1],
+            "coding_rate": target[2],
+        }))
+        return True, ""
+
+    def auto_adjust_data_rate(self):
+        """
+        Move the data rate toward the target for the current flight phase
+        (auto mode). On the ground the controller steps on SNR and loss, up to
+        AUTO_RATE_CEILING on the pad. In coast the link makes a single
+        pre-emptive switch to AUTO_RATE_APOGEE; otherwise the rate is held.
+        """
+        if not self.rate_controller.enabled:
+            return
+        phase = self.estimator.phase
+        if phase in AUTO_RATE_STEPPING_PHASES:
+            self.apogee_rate_attempted = False
+            ceiling = AUTO_RATE_CEILING if phase == FlightPhase.PAD else None
+            index = self.rate_controller.recommend(ceiling=ceiling)
+        elif phase == FlightPhase.COAST and not self.apogee_rate_attempted:
+            # One attempt only; if it fails the fallback keeps the current rate
+            self.apogee_rate_attempted = True
+            index = AUTO_RATE_APOGEE if self.rate_controller.index != AUTO_RATE_APOGEE else None
+        else:
+            return
+        if index is None:
+            return
+        rate = DATA_RATES[index]
+        print(f"Auto data rate ({phase.name}): switching to {rate}")
+        res, err = self.perform_data_rate_change(*rate.settings())
+        if not res:
+            print(f"Auto data rate switch failed: {err}")
+            self.rate_controller.reset()
+
     def send_flight_ready(self):
         """
         Send a flight ready command to the rocket.
@@ -340,7 +648,13 @@ class TelemetryDataProcess(Process):
         return False, "No acknowledgment received within timeout."
     
     def handle_task(self, task):
-        task_id = task["task_id"]
+        result = self.execute_task(task)
+        respond(self.redis_helper.redis, task["task_id"], result)
+
+    def execute_task(self, task):
+        """
+        Run a single task and return its result string.
+        """
         task_type = task["task"]
         params = task.get("params", {})
         
@@ -363,8 +677,32 @@ class TelemetryDataProcess(Process):
                 if not (900 <= freq <= 930):
                     raise ValueError("Frequency must be between 900 MHz and 930 MHz")
                 self.radio.set_frequency(freq)
+                self.retune_receivers({"frequency": freq})
                 self.redis_helper.set("frequency", freq)
                 result = f"Local frequency set to {freq} MHz"
+            elif task_type == "change_data_rate":
+                if "preset" in params:
+                    settings = DATA_RATES[data_rate_by_name(params["preset"])].settings()
+                else:
+                    settings = (params.get("spreading_factor"), params.get("bandwidth"),
+                                params.get("coding_rate"))
+                sf, bw, cr = settings
+                # sanity check
+                if sf is not None and sf not in VALID_SPREADING_FACTORS:
+                    raise ValueError(f"Spreading factor must be one of {VALID_SPREADING_FACTORS}")
+                if bw is not None and bw not in VALID_BANDWIDTHS:
+                    raise ValueError(f"Bandwidth must be one of {VALID_BANDWIDTHS}")
+                if cr is not None and cr not in VALID_CODING_RATES:
+                    raise ValueError(f"Coding rate must be one of {VALID_CODING_RATES}")
+                res, err = self.perform_data_rate_change(sf, bw, cr)
+                if res:
+                    result = "Data rate change to SF{}/{}Hz/CR4/{} completed".format(*self.current_data_rate())
+                else:
+                    result = f"ERROR: {err}"
+            elif task_type == "auto_data_rate":
+                self.rate_controller.enabled = bool(params["enabled"])
+                self.rate_controller.reset()
+                result = f"Auto data rate {'enabled' if self.rate_controller.enabled else 'disabled'}"
             elif task_type == "send_flight_ready":
                 res, err = self.send_flight_ready()
                 if res:
@@ -380,35 +718,69 @@ class TelemetryDataProcess(Process):
         except Exception as e:
             result = f"[ERROR] {str(e)}"
 
-        self.redis_helper.redis.set(f"gs:response:{task_id}", result, ex=10)
+        return result
 
 
     def run(self):
+        # Refuses to start next to a running daemon, before anything else is set up
+        self.shared_frame = SharedFrameWriter()
+        # SIGTERM (systemd stop) and Ctrl-C end the loop so the cleanup below runs
+        handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                handlers[signum] = signal.signal(signum, lambda signum, frame: self.stop())
+        # Created here so the worker threads live in the daemon process
+        self.scheduler = TaskScheduler(self.redis_helper.redis, self.execute_task)
+        self.writer.start()
+        if self.receiver_pool is not None:
+            spreading_factor, bandwidth, coding_rate = self.current_data_rate()
+            self.receiver_pool.start(settings={"spreading_factor": spreading_factor,
+                                               "bandwidth": bandwidth, "coding_rate": coding_rate})
         try:
-            while True:
-                data = self.receive()
+            while not self.stop_requested.is_set():
+                data = self.receive(timeout=self.receive_timeout)
                 if data is not None:
                     pkt_type = data[0]
                     if pkt_type == PacketType.SENSOR_DATA.value:
-                        telemetry = data[1:]
-                        self.handle_telemetry(telemetry)
+                        self.deduplicator.offer(ReceivedFrame(PRIMARY_RECEIVER, data,
+                                                              self.radio.rssi(), self.radio.snr()))
                     elif pkt_type == PacketType.COMMAND.value:
                         command = data[1:]
                         self.handle_command(command)
                     else:
-                        print(f"Invalid packet type: {pkt_type}")
+                        self.log.log("PACKET", f"Invalid packet type: {pkt_type}")
+                self.handle_diversity()
                 # Check for tasks in the queue
-                task_json = self.redis_helper.redis.lpop(TASKS_KEY)
-                if task_json:
+                if self.redis_available():
                     try:
-                        task = json.loads(task_json)
-                        self.handle_task(task)
-                    except Exception as e:
-                        print(f"[TASK ERROR] {e}")
-                time.sleep(0.2)
+                        self.scheduler.poll()
+                    except redis.exceptions.RedisError as e:
+                        self.redis_unavailable("TASK ERROR", e)
+                try:
+                    self.scheduler.run_pending()
+                except redis.exceptions.RedisError as e:
+                    self.redis_unavailable("TASK ERROR", e)
+                self.auto_adjust_data_rate()
+                if self.redis_available() and not self.redis_helper.catalog.flush():
+                    self.redis_retry_at = time.time() + REDIS_RETRY_INTERVAL
+                if data is None:
+                    # Only idle when the radio is quiet; the FIFO holds a single packet
+                    time.sleep(0.2)
         finally:
+            if self.receiver_pool is not None:
+                self.receiver_pool.stop()
+            self.scheduler.shutdown()
+            self.redis_helper.catalog.flush(force=True)
+            self.writer.stop()
+            self.shared_frame.close()
             try:
                 self.csv_file.close()
             except Exception:
                 pass
+            try:
+                self.flight_log.close()
+            except Exception:
+                pass
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
 
@@ -0,0 +1,281 @@
+import base64
+import hashlib
+import json
+import queue
+import struct
+import time
+from collections import OrderedDict
+from multiprocessing import Process, Queue
+
+"""
+Receive diversity: frames from several receivers, one copy stored.
+
+Extra local radios run in their own ReceiverProcess and feed a shared queue;
+remote receivers (other antennas or ground sites) push frames onto the
+gs:relay:frames Redis list with relay_forward(). Every copy goes through
+FrameDeduplicator, which keys sensor frames by onboard timestamp and content
+hash, keeps the best SNR/RSSI copy seen within a short window and emits it
+once. Redis writes therefore don't grow with the number of receivers.
+
+When the primary radio is retuned, ReceiverPool.retune() passes the new
+settings to each local receiver over its control queue and stores them in
+gs:radio_settings, which remote receivers poll.
+"""
+
+RELAY_KEY = "gs:relay:frames"
+RADIO_SETTINGS_KEY = "gs:radio_settings"
+RECEIVER_STATS_KEY = "gs:receivers"
+PRIMARY_RECEIVER = "primary"
+
+class ReceivedFrame():
+    def __init__(self, receiver, data, rssi=None, snr=None, host_time=None):
+        self.receiver = receiver
+        self.data = bytes(data)
+        self.rssi = rssi
+        self.snr = snr
+        self.host_time = host_time if host_time is not None else time.time()
+
+    def quality(self):
+        # Missing link stats sort below any real measurement
+        return (self.snr if self.snr is not None else float("-inf"),
+                self.rssi if self.rssi is not None else float("-inf"))
+
+    def to_json(self):
+        return json.dumps({"receiver": self.receiver, "data": base64.b64encode(self.data).decode(),
+                           "rssi": self.rssi, "snr": self.snr, "host_time": self.host_time})
+
+    @staticmethod
+    def from_json(text):
+        d = json.loads(text)
+        return ReceivedFrame(d["receiver"], base64.b64decode(d["data"]), d.get("rssi"),
+                             d.get("snr"), d.get("host_time"))
+
+def frame_key(data):
+    """
+    (onboard timestamp, content hash). The timestamp is the trailing uint32
+    of a sensor payload; other packets are keyed by hash only.
+    """
+    timestamp = struct.unpack_from("<I", data, len(data) - 4)[0] if len(data) >= 5 else None
+    return timestamp, hashlib.blake2b(data, digest_size=8).digest()
+
+
+def apply_settings(radio, settings):
+    """
+    Retune a radio to {"frequency", "spreading_factor", "bandwidth", "coding_rate"} (any subset).
+    """
+    if "frequency" in settings:
+        radio.set_frequency(settings["frequency"])
+    if "spreading_factor" in settings:
+        radio.set_spreading_factor(settings["spreading_factor"])
+    if "bandwidth" in settings:
+        radio.set_signal_bandwidth(settings["bandwidth"])
+    if "coding_rate" in settings:
+        radio.set_coding_rate(settings["coding_rate"])
+
+
+class ReceiverStats():
+    def __init__(self):
+        self.received = 0       # copies heard
+        self.duplicates = 0     # copies another receiver already delivered
+        self.first = 0          # frames this receiver heard first
+        self.chosen = 0         # frames stored from this receiver's copy
+        self.unique = 0         # frames no other receiver heard
+
+    def as_dict(self):
+        return {"received": self.received, "duplicates": self.duplicates, "first": self.first,
+                "chosen": self.chosen, "unique": self.unique}
+
+
+class FrameDeduplicator():
+    def __init__(self, window=0.05, capacity=4096):
+        self.window = window
+        self.capacity = capacity
+        self.held = OrderedDict()       # key -> [best frame, first arrival, receivers]
+        self.recent = OrderedDict()     # keys already emitted, bounded
+        self.stats = {}
+
+    def receiver_stats(self, receiver):
+        if receiver not in self.stats:
+            self.stats[receiver] = ReceiverStats()
+        return self.stats[receiver]
+
+    def offer(self, frame):
+        stats = self.receiver_stats(frame.receiver)
+        stats.received += 1
+        key = frame_key(frame.data)
+        if key in self.recent:
+            stats.duplicates += 1
+            return
+        entry = self.held.get(key)
+        if entry is None:
+            self.held[key] = [frame, frame.host_time, {frame.receiver}]
+            stats.first += 1
+            return
+        stats.duplicates += 1
+        entry[2].add(frame.receiver)
+        if frame.quality() > entry[0].quality():
+            entry[0] = frame
+
+    def ready(self, now=None):
+        """
+        Pop frames whose window has closed, in arrival order.
+        """
+        now = time.time() if now is None else now
+        out = []
+        while self.held:
+            key, (frame, first_time, receivers) = next(iter(self.held.items()))
+            if now - first_time < self.window:
+                break
+            self.held.popitem(last=False)
+            self.recent[key] = None
+            if len(self.recent) > self.capacity:
+                self.recent.popitem(last=False)
+            self.receiver_stats(frame.receiver).chosen += 1
+            if len(receivers) == 1:
+                self.receiver_stats(frame.receiver).unique += 1
+            out.append(frame)
+        return out
+
+    def report(self):
+        return {receiver: stats.as_dict() for receiver, stats in self.stats.items()}
+
+
+class ReceiverProcess(Process):
+    """
+    Extra local receiver. Owns its own RFM95Radio (built in the child) and
+    forwards every packet to `frames` as a ReceivedFrame. Settings put on
+    `control` are applied between receives. The radio sits on the primary's
+    SPI bus with its own chip select; `spi_lock` serializes transfers with
+    the other processes on that bus.
+    """
+    def __init__(self, receiver_id, frames, cs_pin, reset_pin, frequency=915.0, node=100,
+                 spi_lock=None):
+        super().__init__(daemon=True)
+        self.receiver_id = receiver_id
+        self.frames = frames
+        self.control = Queue()
+        self.spi_lock = spi_lock
+        self.cs_pin = cs_pin
+        self.reset_pin = reset_pin
+        self.frequency = frequency
+        self.node = node
+
+    def run(self):
+        import board
+        from .radio import RFM95Radio, SharedSPI
+        spi = SharedSPI(board.SPI(), self.spi_lock) if self.spi_lock is not None else None
+        radio = RFM95Radio(spi=spi, cs_pin=getattr(board, self.cs_pin),
+                           reset_pin=getattr(board, self.reset_pin),
+                           frequency=self.frequency, baudrate=4000000, node=self.node)
+        while True:
+            while not self.control.empty():
+                apply_settings(radio, self.control.get())
+            data = radio.receive()
+            if data:
+                self.frames.put(ReceivedFrame(self.receiver_id, data, radio.rssi(), radio.snr()))
+
+
+class ReceiverPool():
+    """
+    Gathers frames from extra local receivers and the Redis relay list.
+    spi_lock is shared by every local receiver and must also guard the
+    primary radio's bus (see SharedSPI).
+    """
+    def __init__(self, receivers=(), redis=None, relay=False, spi_lock=None):
+        self.frames = Queue()
+        self.processes = [ReceiverProcess(frames=self.frames, spi_lock=spi_lock, **config)
+                          for config in receivers]
+        self.redis = redis
+        self.relay = relay
+        self.settings = {}
+
+    def start(self, settings=None):
+        """
+        settings: the primary radio's current settings, so remote receivers
+            don't stay on a previous session's.
+        """
+        for process in self.processes:
+            process.start()
+        if settings is not None:
+            self.retune(settings)
+
+    def retune(self, settings):
+        """
+        Move every receiver to the primary radio's new settings (any subset).
+        """
+        self.settings.update(settings)
+        for process in self.processes:
+            process.control.put(dict(settings))
+        if self.relay and self.redis is not None:
+            import redis
+            try:
+                self.redis.set(RADIO_SETTINGS_KEY, json.dumps(self.settings))
+            except redis.exceptions.RedisError as e:
+                print(f"[RELAY] Failed to publish radio settings: {e}")
+
+    def poll(self, max_frames=100):
+        """
+        Frames from the local receiver processes.
+        """
+        out = []
+        while len(out) < max_frames:
+            try:
+                out.append(self.frames.get_nowait())
+            except queue.Empty:
+                break
+        return out
+
+    def poll_relay(self, max_frames=100):
+        """
+        Frames pushed by remote receivers. Raises RedisError when Redis is unavailable.
+        """
+        out = []
+        if self.relay and self.redis is not None:
+            pipe = self.redis.pipeline()
+            pipe.lrange(RELAY_KEY, 0, max_frames - 1)
+            pipe.ltrim(RELAY_KEY, max_frames, -1)
+            for text in pipe.execute()[0]:
+                try:
+                    frame = ReceivedFrame.from_json(text)
+                    # Remote clocks may be skewed; the dedup window runs on local arrival time
+                    frame.host_time = time.time()
+                    out.append(frame)
+                except (ValueError, KeyError) as e:
+                    print(f"[RELAY] Bad frame: {e}")
+        return out
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+
+
+def relay_forward(receiver_id, radio, redis, max_backlog=10000, settings_interval=1.0):
+    """
+    Remote receiver loop: push every received packet to the central station's
+    relay list, following the station's radio settings.
+    """
+    print(f"[RELAY] Forwarding frames as {receiver_id}")
+    settings = None
+    last_check = 0.0
+    while True:
+        if time.time() - last_check >= settings_interval:
+            last_check = time.time()
+            try:
+                current = redis.get(RADIO_SETTINGS_KEY)
+                if current is not None and current != settings:
+                    apply_settings(radio, json.loads(current))
+                    settings = current
+                    print(f"[RELAY] Retuned to {json.loads(current)}")
+            except Exception as e:
+                print(f"[RELAY] Failed to read radio settings: {e}")
+        data = radio.receive()
+        if not data:
+            continue
+        frame = ReceivedFrame(receiver_id, data, radio.rssi(), radio.snr())
+        try:
+            pipe = redis.pipeline()
+            pipe.rpush(RELAY_KEY, frame.to_json())
+            pipe.ltrim(RELAY_KEY, -max_backlog, -1)
+            pipe.execute()
+        except Exception as e:
+            print(f"[RELAY] Failed to forward frame: {e}")
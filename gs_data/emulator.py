@@ -0,0 +1,348 @@
+import math
+import random
+import struct
+import threading
+import time
+from .data import PacketType, NetworkCommands, RADIO_SETTING_FORMATS
+from .payload import FORMAT, FORMAT_CODES, FIELD_SCALES
+from .estimator import GRAVITY
+
+"""
+Synthetic rocket for exercising the ground station without the flight computer.
+
+FlightProfile integrates a one-dimensional flight (pad, powered boost, coast,
+drogue descent from apogee, main descent, landed) and turns it into sensor
+readings in TelemetryData units. RocketEmulator encodes those readings into
+FORMAT frames at a configurable rate, passes them through LinkImpairments
+(loss, bursts, corruption, duplication) and injects them into a FakeRadio.
+It is also the FakeRadio's responder: it answers COMMAND packets the way the
+flight computer does and follows radio setting changes after the final ACK.
+"""
+
+INT_RANGES = {
+    "h": (-2 ** 15, 2 ** 15 - 1), "H": (0, 2 ** 16 - 1),
+    "i": (-2 ** 31, 2 ** 31 - 1), "I": (0, 2 ** 32 - 1),
+}
+EARTH_RADIUS = 6371000.0
+ACCEL_FULL_SCALE = 16 * GRAVITY     # m/s^2, IMU range
+
+def air_density(altitude_asl):
+    return 1.225 * math.exp(-altitude_asl / 8500.0)
+
+def pressure_hpa(altitude_asl):
+    return 1013.25 * (1 - 2.25577e-5 * altitude_asl) ** 5.25588
+
+def encode_frame(values):
+    """
+    [SENSOR_DATA] + FORMAT payload for {field: value in TelemetryData units}.
+    Values outside a field's integer range saturate, as on the flight computer.
+    """
+    raw = []
+    for (name, divisor, factor), code in zip(FIELD_SCALES, FORMAT_CODES):
+        lo, hi = INT_RANGES[code]
+        raw.append(min(max(int(round(values[name] * divisor / factor)), lo), hi))
+    return bytes([PacketType.SENSOR_DATA.value]) + struct.pack(FORMAT, *raw)
+
+
+class FlightProfile():
+    """
+    Vertical flight with a constant-thrust motor, quadratic drag and two
+    parachutes, plus wind drift for the GPS track. Time is seconds since the
+    profile started; the motor lights at `pad_time`.
+    """
+    def __init__(self, pad_time=10.0, dry_mass=20.0, propellant_mass=5.0, thrust=2000.0,
+                 burn_time=3.0, drag_coefficient=0.5, diameter=0.13, drogue_rate=25.0,
+                 main_rate=6.0, main_altitude=300.0, pad_latitude=52.1332, pad_longitude=-106.6700,
+                 pad_elevation=500.0, wind_speed=5.0, wind_bearing=90.0, gps_rate=5.0,
+                 dt=0.01, seed=None):
+        self.pad_time = pad_time
+        self.dry_mass = dry_mass
+        self.propellant_mass = propellant_mass
+        self.thrust = thrust
+        self.burn_time = burn_time
+        self.body_drag = 0.5 * drag_coefficient * math.pi * (diameter / 2) ** 2
+        self.drogue_rate = drogue_rate
+        self.main_rate = main_rate
+        self.main_altitude = main_altitude
+        self.pad_latitude = pad_latitude
+        self.pad_longitude = pad_longitude
+        self.pad_elevation = pad_elevation
+        self.wind_speed = wind_speed
+        self.wind_bearing = wind_bearing
+        self.gps_interval = 1.0 / gps_rate
+        self.dt = dt
+        self.rng = random.Random(seed)
+        # Integrator state
+        self.t = 0.0
+        self.h = 0.0
+        self.v = 0.0
+        self.a = 0.0
+        self.drift = 0.0
+        self.phase = "pad"
+        self.gps = None
+        self.gps_time = -1.0
+
+    def mass(self, t_burn):
+        burnt = min(max(t_burn / self.burn_time, 0.0), 1.0)
+        return self.dry_mass + self.propellant_mass * (1 - burnt)
+
+    def drag_factor(self, mass):
+        """
+        k in drag = k * v * |v|, with the chutes sized for their descent rate.
+        """
+        if self.phase == "drogue":
+            return mass * GRAVITY / self.drogue_rate ** 2
+        if self.phase == "main":
+            return mass * GRAVITY / self.main_rate ** 2
+        return self.body_drag * air_density(self.pad_elevation + self.h)
+
+    def step(self, dt):
+        t_burn = self.t - self.pad_time
+        mass = self.mass(t_burn)
+        if self.phase == "pad" and t_burn >= 0:
+            self.phase = "boost"
+        elif self.phase == "boost" and t_burn >= self.burn_time:
+            self.phase = "coast"
+        elif self.phase == "coast" and self.v <= 0:
+            self.phase = "drogue"
+        elif self.phase == "drogue" and self.h <= self.main_altitude:
+            self.phase = "main"
+
+        if self.phase == "pad" or self.phase == "landed":
+            self.a = 0.0
+        else:
+            thrust = self.thrust if self.phase == "boost" else 0.0
+            drag = self.drag_factor(mass) * self.v * abs(self.v)
+            self.a = (thrust - drag) / mass - GRAVITY
+            self.v += self.a * dt
+            self.h += self.v * dt
+            # Weathercocking on the way up, full wind drift under canopy
+            drift_speed = self.wind_speed if self.phase in ("drogue", "main") else 0.05 * max(self.v, 0)
+            self.drift += drift_speed * dt
+            if self.h <= 0 and self.phase in ("drogue", "main"):
+                self.h, self.v, self.a = 0.0, 0.0, 0.0
+                self.phase = "landed"
+        self.t += dt
+
+    def advance(self, t):
+        while self.t + self.dt <= t:
+            self.step(self.dt)
+
+    def position(self):
+        bearing = math.radians(self.wind_bearing)
+        north = self.drift * math.cos(bearing)
+        east = self.drift * math.sin(bearing)
+        latitude = self.pad_latitude + math.degrees(north / EARTH_RADIUS)
+        longitude = self.pad_longitude + math.degrees(
+            east / (EARTH_RADIUS * math.cos(math.radians(self.pad_latitude))))
+        return latitude, longitude
+
+    def distance(self):
+        """
+        Straight-line distance from the pad (m), for link budget estimates.
+        """
+        return math.hypot(self.h, self.drift) + 1.0
+
+    def sample(self, t):
+        """
+        Sensor readings at time t (seconds, non-decreasing) in TelemetryData units.
+        """
+        self.advance(t)
+        n = self.rng.gauss
+        altitude = self.pad_elevation + self.h
+        temperature = 15.0 - 0.0065 * altitude
+        # The accelerometer reads specific force: gravity on the pad, ~0 in free fall
+        proper = self.a + GRAVITY if self.phase not in ("pad", "landed") else GRAVITY
+        spin = 30.0 if self.phase == "boost" else 5.0 if self.phase == "coast" else 0.0
+        if self.gps is None or t - self.gps_time >= self.gps_interval:
+            # GPS updates slower than telemetry; hold the last fix in between
+            latitude, longitude = self.position()
+            horizontal = self.wind_speed if self.phase in ("drogue", "main") else 0.05 * max(self.v, 0)
+            self.gps = (latitude + n(0, 2e-6), longitude + n(0, 2e-6), altitude + n(0, 3.0),
+                        horizontal, self.wind_bearing)
+            self.gps_time = t
+        gps_latitude, gps_longitude, gps_altitude, gps_speed, gps_angle = self.gps
+        return {
+            "bmp280_temp": temperature + n(0, 0.05),
+            "bmp280_pressure": pressure_hpa(altitude) + n(0, 0.02),
+            "bmp280_altitude": altitude + n(0, 0.5),
+            "accel_x": n(0, 0.05),
+            "accel_y": n(0, 0.05),
+            # The IMU saturates at its full scale, e.g. on the main chute's opening shock
+            "accel_z": min(max(proper + n(0, 0.05), -ACCEL_FULL_SCALE), ACCEL_FULL_SCALE),
+            "gyro_x": n(0, 0.2),
+            "gyro_y": n(0, 0.2),
+            "gyro_z": spin + n(0, 0.2),
+            "imu_temp": 25.0 + n(0, 0.1),
+            "mag_x": 15.0 + n(0, 0.3),
+            "mag_y": 2.0 + n(0, 0.3),
+            "mag_z": -50.0 + n(0, 0.3),
+            "extra_temp_sensor": temperature + n(0, 0.1),
+            "gps_latitude": gps_latitude,
+            "gps_longitude": gps_longitude,
+            "gps_altitude": gps_altitude,
+            "gps_speed": gps_speed,
+            "gps_angle": gps_angle,
+            "timestamp": int(t * 1000),
+        }
+
+
+class LinkImpairments():
+    """
+    Per-packet channel model. `loss` drops packets independently; bursts
+    start with probability `burst_rate` per packet and drop on average
+    `burst_length` packets in a row. Survivors may be corrupted (1-3 flipped
+    bits) or delivered twice.
+    """
+    def __init__(self, loss=0.0, corruption=0.0, duplication=0.0, burst_rate=0.0,
+                 burst_length=5.0, seed=None):
+        self.loss = loss
+        self.corruption = corruption
+        self.duplication = duplication
+        self.burst_rate = burst_rate
+        self.burst_length = burst_length
+        self.rng = random.Random(seed)
+        self.burst_left = 0
+        self.stats = {"offered": 0, "lost": 0, "burst_lost": 0, "corrupted": 0, "duplicated": 0}
+
+    def apply(self, packet):
+        """
+        Packets actually delivered for one transmitted packet (0, 1 or 2).
+        """
+        self.stats["offered"] += 1
+        if self.burst_left == 0 and self.burst_rate and self.rng.random() < self.burst_rate:
+            self.burst_left = max(1, int(self.rng.expovariate(1.0 / self.burst_length)))
+        if self.burst_left:
+            self.burst_left -= 1
+            self.stats["burst_lost"] += 1
+            return []
+        if self.rng.random() < self.loss:
+            self.stats["lost"] += 1
+            return []
+        if self.rng.random() < self.corruption:
+            self.stats["corrupted"] += 1
+            data = bytearray(packet)
+            for _ in range(self.rng.randint(1, 3)):
+                bit = self.rng.randrange(len(data) * 8)
+                data[bit // 8] ^= 1 << (bit % 8)
+            packet = bytes(data)
+        if self.rng.random() < self.duplication:
+            self.stats["duplicated"] += 1
+            return [packet, packet]
+        return [packet]
+
+
+class RocketEmulator():
+    """
+    Transmits a FlightProfile as SENSOR_DATA frames into a FakeRadio and
+    answers the ground station's commands.
+
+        radio = FakeRadio(rx_capacity=1)
+        emulator = RocketEmulator(rate_hz=20, impairments=LinkImpairments(loss=0.05))
+        radio.responder = emulator.responder
+        emulator.start(radio)
+    """
+    def __init__(self, profile=None, rate_hz=10.0, impairments=None, settings=(915.0, 7, 125000, 5),
+                 impair_replies=False):
+        self.profile = profile or FlightProfile()
+        self.rate_hz = rate_hz
+        self.impairments = impairments or LinkImpairments()
+        self.settings = settings
+        self.impair_replies = impair_replies
+        self.pending_setting = None
+        self.flight_ready = False
+        self.radio = None
+        self.thread = None
+        self.running = False
+        self.start_time = None
+        self.sent = 0
+        self.commands = 0
+
+    def link_quality(self):
+        """
+        (rssi, snr) from free-space path loss at the current distance.
+        """
+        distance = self.profile.distance()
+        rssi = 20 - (20 * math.log10(distance) + 20 * math.log10(self.settings[0]) - 27.55)
+        return rssi, min(max(rssi + 120.0, -20.0), 12.0)
+
+    def transmit(self, packet, impair=True):
+        packets = self.impairments.apply(packet) if impair else [packet]
+        rssi, snr = self.link_quality()
+        for p in packets:
+            self.radio.inject(p, settings=self.settings, rssi=rssi, snr=snr)
+            self.sent += 1
+
+    def responder(self, data, settings):
+        """
+        FakeRadio responder: the flight computer's side of every handshake.
+        """
+        if settings != self.settings or not data:
+            return []  # Not listening on those settings
+        replies = []
+        if data[0] == PacketType.PING.value:
+            replies.append(bytes([PacketType.ACK_PONG.value]))
+        elif data[0] == PacketType.COMMAND.value and len(data) >= 2:
+            self.commands += 1
+            try:
+                command = NetworkCommands(data[1])
+            except ValueError:
+                return []
+            if command == NetworkCommands.FLIGHT_READY:
+                self.flight_ready = True
+                replies.append(bytes([PacketType.ACK_PONG.value, command.value]))
+            elif command in RADIO_SETTING_FORMATS:
+                # Echo the command, switch only once the ground station confirms
+                self.pending_setting = (command, struct.unpack(RADIO_SETTING_FORMATS[command], data[2:]))
+                replies.append(bytes([PacketType.ACK_PONG.value]) + data[1:])
+        elif data[0] == PacketType.ACK_PONG.value and len(data) >= 2 and self.pending_setting is not None \
+                and data[1] == self.pending_setting[0].value:
+            self.apply_setting(*self.pending_setting)
+            self.pending_setting = None
+        for reply in replies:
+            self.transmit(reply, impair=self.impair_replies)
+        return []  # Already injected with our settings and link quality
+
+    def apply_setting(self, command, values):
+        frequency, sf, bw, cr = self.settings
+        if command == NetworkCommands.SWITCH_RADIO_FREQUENCY:
+            frequency = values[0]
+        elif command == NetworkCommands.SWITCH_SPREADING_FACTOR:
+            sf = values[0]
+        elif command == NetworkCommands.SWITCH_SIGNAL_BANDWIDTH:
+            bw = values[0]
+        elif command == NetworkCommands.SWITCH_CODING_RATE:
+            cr = values[0]
+        elif command == NetworkCommands.SWITCH_DATA_RATE:
+            sf, bw, cr = values
+        self.settings = (frequency, sf, bw, cr)
+        print(f"[EMULATOR] Rocket switched to {self.settings}")
+
+    def start(self, radio):
+        self.radio = radio
+        self.running = True
+        self.start_time = time.time()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        interval = 1.0 / self.rate_hz
+        frame = 0
+        while self.running:
+            # Catch up on every frame due, so rates above the scheduler tick still hold
+            due = int((time.time() - self.start_time) * self.rate_hz)
+            while frame < due:
+                t = frame * interval
+                self.transmit(encode_frame(self.profile.sample(t)))
+                frame += 1
+            time.sleep(min(interval, 0.01))
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+
+    def stats(self):
+        return {"frames": self.impairments.stats["offered"], "injected": self.sent,
+                "commands": self.commands, "phase": self.profile.phase,
+                "altitude": round(self.profile.h, 1), **self.impairments.stats}
@@ -0,0 +1,226 @@
+import math
+from enum import Enum
+
+"""Streaming flight-state estimator fed one telemetry frame at a time"""
+
+GRAVITY = 9.80665
+
+class FlightPhase(Enum):
+    PAD = 0
+    BOOST = 1
+    COAST = 2
+    DESCENT = 3
+    LANDED = 4
+
+
+class AltitudeKalmanFilter():
+    """
+    Two-state (altitude, vertical velocity) Kalman filter. Vertical
+    acceleration drives the prediction and barometric altitude is the
+    measurement, so each step is a handful of float operations.
+    """
+    def __init__(self, accel_variance=4.0, baro_variance=4.0):
+        self.accel_variance = accel_variance
+        self.baro_variance = baro_variance
+        self.h = 0.0
+        self.v = 0.0
+        # Covariance [[p00, p01], [p01, p11]]
+        self.p00, self.p01, self.p11 = 100.0, 0.0, 100.0
+
+    def reset(self, altitude):
+        self.h = altitude
+        self.v = 0.0
+        self.p00, self.p01, self.p11 = self.baro_variance, 0.0, 1.0
+
+    def predict(self, accel, dt):
+        self.h += self.v * dt + 0.5 * accel * dt * dt
+        self.v += accel * dt
+        # P = F P F' + G q G' with F = [[1, dt], [0, 1]], G = [dt^2/2, dt]
+        q = self.accel_variance
+        dt2 = dt * dt
+        p00 = self.p00 + 2 * dt * self.p01 + dt2 * self.p11 + q * dt2 * dt2 / 4
+        p01 = self.p01 + dt * self.p11 + q * dt2 * dt / 2
+        p11 = self.p11 + q * dt2
+        self.p00, self.p01, self.p11 = p00, p01, p11
+
+    def update(self, altitude):
+        s = self.p00 + self.baro_variance
+        k0 = self.p00 / s
+        k1 = self.p01 / s
+        residual = altitude - self.h
+        self.h += k0 * residual
+        self.v += k1 * residual
+        p00 = (1 - k0) * self.p00
+        p01 = (1 - k0) * self.p01
+        p11 = self.p11 - k1 * self.p01
+        self.p00, self.p01, self.p11 = p00, p01, p11
+
+
+class FlightStateEstimator():
+    """
+    Incremental flight-state estimator.
+
+    update() takes one decoded TelemetryData and returns the list of phase
+    events it triggered (each a dict). Altitude and velocity come from the
+    Kalman filter, the accelerometer bias (gravity plus mounting offset) is
+    learned while on the pad, and during descent the landing point is
+    predicted by extrapolating the GPS drift over the time left to fall.
+    Everything is O(1) per frame.
+
+    Burnout and apogee need `confirm_samples` consecutive frames agreeing, so
+    one noisy baro or accel sample can't fire them. If the onboard clock goes
+    backwards for `rebaseline_after` consecutive frames (flight computer
+    reboot), the estimator continues from the new clock in the same phase.
+    """
+    def __init__(self, accel_axis="accel_z", accel_sign=1.0,
+                 launch_accel=2 * GRAVITY, launch_velocity=15.0,
+                 landed_velocity=1.0, landed_time=5.0, landed_height=30.0,
+                 confirm_samples=3, rebaseline_after=5):
+        self.accel_axis = accel_axis
+        self.accel_sign = accel_sign
+        self.launch_accel = launch_accel
+        self.launch_velocity = launch_velocity
+        self.landed_velocity = landed_velocity
+        self.landed_time = landed_time
+        self.landed_height = landed_height
+        self.confirm_samples = confirm_samples
+        self.rebaseline_after = rebaseline_after
+        self.kf = AltitudeKalmanFilter()
+        self.phase = FlightPhase.PAD
+        self.last_time = None
+        self.accel_bias = None
+        self.ground_altitude = None
+        self.accel = 0.0
+        self.apogee_altitude = None
+        self.apogee_time = None
+        self.still_since = None
+        self.confirmations = 0
+        self.candidate = None   # (time, altitude) of the first confirming frame
+        self.backwards = 0
+        self.last_fix = None
+        self.drift_lat = 0.0    # degrees per second
+        self.drift_lon = 0.0
+        self.landing_lat = None
+        self.landing_lon = None
+
+    @property
+    def altitude(self):
+        return self.kf.h
+
+    @property
+    def velocity(self):
+        return self.kf.v
+
+    def height(self):
+        """
+        Height above the pad.
+        """
+        return self.kf.h - (self.ground_altitude or 0.0)
+
+    def update(self, telemetry):
+        t = telemetry.timestamp / 1000.0
+        raw_accel = getattr(telemetry, self.accel_axis) * self.accel_sign
+        altitude = telemetry.bmp280_altitude
+
+        if self.last_time is None:
+            self.last_time = t
+            self.accel_bias = raw_accel
+            self.ground_altitude = altitude
+            self.kf.reset(altitude)
+            return []
+        dt = t - self.last_time
+        if dt <= 0:
+            # Duplicate or out-of-order frame, unless it keeps happening
+            self.backwards += 1
+            if self.backwards >= self.rebaseline_after:
+                self.backwards = 0
+                self.last_time = t
+                self.last_fix = None
+            return []
+        self.backwards = 0
+        self.last_time = t
+
+        if self.phase == FlightPhase.PAD:
+            # Learn gravity/mounting bias and pad altitude while sitting still
+            self.accel_bias += 0.05 * (raw_accel - self.accel_bias)
+            self.ground_altitude += 0.05 * (altitude - self.ground_altitude)
+        self.accel = raw_accel - self.accel_bias
+
+        self.kf.predict(self.accel, dt)
+        self.kf.update(altitude)
+        self.update_drift(telemetry, dt)
+        return self.update_phase(t)
+
+    def update_drift(self, telemetry, dt):
+        if telemetry.gps_latitude == 0 and telemetry.gps_longitude == 0:
+            return  # No GPS fix
+        fix = (telemetry.gps_latitude, telemetry.gps_longitude, self.last_time)
+        if self.last_fix is not None and fix[2] > self.last_fix[2]:
+            fix_dt = fix[2] - self.last_fix[2]
+            self.drift_lat += 0.2 * ((fix[0] - self.last_fix[0]) / fix_dt - self.drift_lat)
+            self.drift_lon += 0.2 * ((fix[1] - self.last_fix[1]) / fix_dt - self.drift_lon)
+        self.last_fix = fix
+        if self.phase == FlightPhase.DESCENT and self.kf.v < -0.5:
+            time_to_ground = max(self.height(), 0.0) / -self.kf.v
+            self.landing_lat = fix[0] + self.drift_lat * time_to_ground
+            self.landing_lon = fix[1] + self.drift_lon * time_to_ground
+        elif self.phase == FlightPhase.LANDED:
+            self.landing_lat, self.landing_lon = fix[0], fix[1]
+
+    def update_phase(self, t):
+        events = []
+        if self.phase == FlightPhase.PAD:
+            if self.accel > self.launch_accel or self.kf.v > self.launch_velocity:
+                events.append(self.transition(FlightPhase.BOOST, t))
+        elif self.phase == FlightPhase.BOOST:
+            if self.confirmed(self.accel < 0, t):
+                events.append(self.transition(FlightPhase.COAST, t))
+        elif self.phase == FlightPhase.COAST:
+            if self.confirmed(self.kf.v <= 0, t):
+                # Apogee was where the first confirming frame saw the climb stop
+                self.apogee_time, self.apogee_altitude = self.candidate
+                events.append({"event": "apogee", "time": self.apogee_time,
+                               "altitude": self.apogee_altitude,
+                               "height": self.apogee_altitude - (self.ground_altitude or 0.0)})
+                events.append(self.transition(FlightPhase.DESCENT, t))
+        elif self.phase == FlightPhase.DESCENT:
+            if abs(self.kf.v) < self.landed_velocity and self.height() < self.landed_height:
+                if self.still_since is None:
+                    self.still_since = t
+                elif t - self.still_since >= self.landed_time:
+                    events.append(self.transition(FlightPhase.LANDED, t))
+            else:
+                self.still_since = None
+        return events
+
+    def confirmed(self, condition, t):
+        """
+        True once `condition` has held for confirm_samples frames in a row.
+        """
+        if not condition:
+            self.confirmations = 0
+            return False
+        if self.confirmations == 0:
+            self.candidate = (t, self.kf.h)
+        self.confirmations += 1
+        return self.confirmations >= self.confirm_samples
+
+    def transition(self, phase, t):
+        self.phase = phase
+        self.confirmations = 0
+        return {"event": phase.name.lower(), "time": t, "altitude": self.kf.h,
+                "velocity": self.kf.v}
+
+    def outputs(self):
+        """
+        Derived series for this frame as {attribute name: value}.
+        """
+        values = {
+            "altitude": self.kf.h,
+            "velocity": self.kf.v,
+            "phase": self.phase.value,
+        }
+        if self.landing_lat is not None and not math.isnan(self.landing_lat):
+            values["landing_latitude"] = self.landing_lat
+            values["landing_longitude"] = self.landing_lon
+        return values
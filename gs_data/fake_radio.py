@@ -0,0 +1,114 @@
+import time
+from collections import deque
+
+class FakeRadio():
+    """
+    In-memory stand-in for RFM95Radio with the same interface.
+
+    Packets are queued with inject() together with the radio settings they
+    were transmitted on, and receive() only returns packets whose settings
+    match the local ones, so a mismatched frequency or data rate behaves like
+    a lost link. An optional responder callable is invoked for every sent
+    packet and may return packets (bytes or (bytes, settings) tuples) to
+    queue as the peer's reply.
+
+    rx_capacity bounds the receive queue like the radio's FIFO (the RFM95
+    holds one packet): when full, the oldest packet is overwritten and
+    counted in `overflows`. None means unbounded.
+    """
+    def __init__(self, frequency=915.0, node=100, responder=None,
+                 rssi=-60, snr=10.0, receive_timeout=0.0, rx_capacity=None):
+        self.frequency = frequency
+        self.spreading_factor_value = 7
+        self.signal_bandwidth_value = 125000
+        self.coding_rate_value = 5
+        self.node = node
+        self.destination = node + 1
+        self.tx_power = 20
+        self.responder = responder
+        self.receive_timeout = receive_timeout
+        self.last_rssi = rssi
+        self.last_snr = snr
+        self.rx_queue = deque(maxlen=rx_capacity)
+        self.overflows = 0
+        self.sent = []
+
+    def settings(self):
+        return (self.frequency, self.spreading_factor_value,
+                self.signal_bandwidth_value, self.coding_rate_value)
+
+    def inject(self, data, settings=None, rssi=None, snr=None):
+        """
+        Queue a packet for receive(). Defaults to the current local settings.
+        """
+        if settings is None:
+            settings = self.settings()
+        if self.rx_queue.maxlen is not None and len(self.rx_queue) >= self.rx_queue.maxlen:
+            self.overflows += 1
+        self.rx_queue.append((bytes(data), settings, rssi, snr))
+
+    def send(self, data):
+        self.sent.append(bytes(data))
+        if self.responder is None:
+            return
+        replies = self.responder(bytes(data), self.settings()) or []
+        for reply in replies:
+            if isinstance(reply, tuple):
+                self.inject(*reply)
+            else:
+                self.inject(reply)
+
+    def receive(self, timeout=None):
+        deadline = time.time() + (self.receive_timeout if timeout is None else timeout)
+        while True:
+            while self.rx_queue:
+                data, settings, rssi, snr = self.rx_queue.popleft()
+                if settings != self.settings():
+                    continue  # Transmitted on settings we aren't listening on
+                if rssi is not None:
+                    self.last_rssi = rssi
+                if snr is not None:
+                    self.last_snr = snr
+                return data
+            if time.time() >= deadline:
+                return None
+            time.sleep(0.01)
+
+    def rssi(self):
+        return self.last_rssi
+
+    def snr(self):
+        return self.last_snr
+
+    def set_node(self, node):
+        self.node = node
+
+    def set_destination(self, destination):
+        self.destination = destination
+
+    def set_tx_power(self, power):
+        self.tx_power = power
+
+    def set_frequency(self, frequency):
+        self.frequency = frequency
+
+    def set_spreading_factor(self, spreading_factor):
+        self.spreading_factor_value = spreading_factor
+
+    def set_signal_bandwidth(self, bandwidth):
+        self.signal_bandwidth_value = bandwidth
+
+    def set_coding_rate(self, coding_rate):
+        self.coding_rate_value = coding_rate
+
+    def spreading_factor(self):
+        return self.spreading_factor_value
+
+    def signal_bandwidth(self):
+        return self.signal_bandwidth_value
+
+    def coding_rate(self):
+        return self.coding_rate_value
+
+    def reset(self):
+        self.rx_queue.clear()
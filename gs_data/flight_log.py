@@ -0,0 +1,201 @@
+import bisect
+import os
+import struct
+import time
+
+"""
+Segmented binary flight log.
+
+Every decoded frame is appended as one fixed-width record to the current
+segment file. Every INDEX_INTERVAL records the (time, record number) pair is
+added to the segment's sparse index, so a reader can bisect straight to a
+time range and memory-map only those records instead of parsing a CSV from
+the start. Segments rotate every `records_per_segment` records.
+
+Record layout (little-endian, RECORD_SIZE bytes):
+    host_time_ms      int64     receive time, forced non-decreasing
+    timestamp         uint32    onboard timestamp (ms)
+    rssi              float32
+    snr               float32
+    <RECORD_FIELDS>   float64   decoded values, as in TelemetryData
+    raw               48 bytes  raw sensor payload, for re-decoding later
+"""
+
+RECORD_FIELDS = [
+    "bmp280_temp", "bmp280_pressure", "bmp280_altitude",
+    "accel_x", "accel_y", "accel_z",
+    "gyro_x", "gyro_y", "gyro_z",
+    "imu_temp", "mag_x", "mag_y", "mag_z",
+    "extra_temp_sensor", "gps_latitude", "gps_longitude",
+    "gps_altitude", "gps_speed", "gps_angle",
+]
+RAW_SIZE = 48
+RECORD_FORMAT = "<qIff" + "d" * len(RECORD_FIELDS) + f"{RAW_SIZE}s"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+INDEX_FORMAT = "<qQ"
+INDEX_SIZE = struct.calcsize(INDEX_FORMAT)
+INDEX_INTERVAL = 64
+SEGMENT_RECORDS = 100000
+SEGMENT_NAME = "segment_{:06d}"
+
+RECORD_NAMES = ["host_time_ms", "timestamp", "rssi", "snr"] + RECORD_FIELDS + ["raw"]
+
+def pack_record(telemetry, raw=b"", rssi=0.0, snr=0.0, host_time_ms=0):
+    return struct.pack(
+        RECORD_FORMAT, host_time_ms, telemetry.timestamp,
+        rssi if rssi is not None else 0.0, snr if snr is not None else 0.0,
+        *[float(getattr(telemetry, name)) for name in RECORD_FIELDS], bytes(raw))
+
+def unpack_record(buffer, offset=0):
+    """
+    Decode one record into {field name: value}.
+    """
+    return dict(zip(RECORD_NAMES, struct.unpack_from(RECORD_FORMAT, buffer, offset)))
+
+def record_dtype():
+    """
+    NumPy structured dtype matching RECORD_FORMAT, for zero-copy reads.
+    """
+    import numpy as np
+    return np.dtype([("host_time_ms", "<i8"), ("timestamp", "<u4"), ("rssi", "<f4"), ("snr", "<f4")]
+                    + [(name, "<f8") for name in RECORD_FIELDS]
+                    + [("raw", f"S{RAW_SIZE}")])
+
+
+class FlightLogWriter():
+    def __init__(self, directory, records_per_segment=SEGMENT_RECORDS, index_interval=INDEX_INTERVAL):
+        self.directory = directory
+        self.records_per_segment = records_per_segment
+        self.index_interval = index_interval
+        os.makedirs(directory, exist_ok=True)
+        self.segment = len([f for f in os.listdir(directory) if f.endswith(".log")])
+        self.data_file = None
+        self.index_file = None
+        self.records = 0
+        self.last_time = 0
+        self.open_segment()
+
+    def open_segment(self):
+        self.close()
+        base = os.path.join(self.directory, SEGMENT_NAME.format(self.segment))
+        self.data_file = open(base + ".log", "ab")
+        self.index_file = open(base + ".idx", "ab")
+        self.records = self.data_file.tell() // RECORD_SIZE
+        self.segment += 1
+
+    def append(self, telemetry, raw=b"", rssi=0.0, snr=0.0, host_time_ms=None):
+        """
+        Append one decoded TelemetryData. Returns the host time used for the record.
+        """
+        if host_time_ms is None:
+            host_time_ms = int(time.time() * 1000)
+        # Keep the index sortable even if the clock steps backwards (NTP sync)
+        host_time_ms = max(host_time_ms, self.last_time)
+        self.last_time = host_time_ms
+
+        if self.records >= self.records_per_segment:
+            self.open_segment()
+        if self.records % self.index_interval == 0:
+            self.index_file.write(struct.pack(INDEX_FORMAT, host_time_ms, self.records))
+            self.index_file.flush()
+            os.fsync(self.index_file.fileno())
+            os.fsync(self.data_file.fileno())
+
+        self.data_file.write(pack_record(telemetry, raw, rssi, snr, host_time_ms))
+        self.data_file.flush()
+        self.records += 1
+        return host_time_ms
+
+    def close(self):
+        for f in (self.data_file, self.index_file):
+            if f is not None:
+                f.close()
+        self.data_file = None
+        self.index_file = None
+
+
+class FlightLogSegment():
+    def __init__(self, base):
+        self.base = base
+        self.records = os.path.getsize(base + ".log") // RECORD_SIZE
+        with open(base + ".idx", "rb") as f:
+            index = f.read()
+        entries = [struct.unpack_from(INDEX_FORMAT, index, i)
+                   for i in range(0, len(index) - len(index) % INDEX_SIZE, INDEX_SIZE)]
+        # Entries past the end of the data belong to a record that never got written
+        entries = [e for e in entries if e[1] < self.records]
+        self.index_times = [e[0] for e in entries]
+        self.index_records = [e[1] for e in entries]
+
+    def start_time(self):
+        return self.index_times[0] if self.index_times else None
+
+    def end_time(self):
+        if self.records == 0:
+            return None
+        with open(self.base + ".log", "rb") as f:
+            f.seek((self.records - 1) * RECORD_SIZE)
+            return struct.unpack("<q", f.read(8))[0]
+
+    def record_bounds(self, start_ms, end_ms):
+        """
+        Record range [first, last) that can contain times in [start_ms, end_ms].
+        """
+        # Several index entries can share a time after a clock step; start
+        # before all of them, in the block that may end with matching records
+        i = bisect.bisect_left(self.index_times, start_ms) - 1
+        first = self.index_records[max(i, 0)]
+        j = bisect.bisect_right(self.index_times, end_ms)
+        last = self.index_records[j] if j < len(self.index_records) else self.records
+        return first, last
+
+    def read(self, first, last):
+        import numpy as np
+        if last <= first:
+            return np.empty(0, dtype=record_dtype())
+        return np.memmap(self.base + ".log", dtype=record_dtype(), mode="r",
+                         offset=first * RECORD_SIZE, shape=(last - first,))
+
+
+class FlightLogReader():
+    """
+    Random access to a flight log directory by host receive time (ms).
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        names = sorted(f[:-4] for f in os.listdir(directory) if f.endswith(".log"))
+        self.segments = [FlightLogSegment(os.path.join(directory, n)) for n in names]
+        self.segments = [s for s in self.segments if s.records > 0 and s.index_times]
+
+    def time_bounds(self):
+        if not self.segments:
+            return None, None
+        return self.segments[0].start_time(), self.segments[-1].end_time()
+
+    def range(self, start_ms, end_ms):
+        """
+        Records with start_ms <= host_time_ms <= end_ms. Single-segment results
+        are memory-mapped views; spanning several segments concatenates them.
+        """
+        import numpy as np
+        parts = []
+        for segment in self.segments:
+            if segment.start_time() > end_ms or segment.end_time() < start_ms:
+                continue
+            records = segment.read(*segment.record_bounds(start_ms, end_ms))
+            times = records["host_time_ms"]
+            lo = np.searchsorted(times, start_ms, side="left")
+            hi = np.searchsorted(times, end_ms, side="right")
+            parts.append(records[lo:hi])
+        if not parts:
+            return np.empty(0, dtype=record_dtype())
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts)
+
+    def all(self):
+        start, end = self.time_bounds()
+        if start is None:
+            import numpy as np
+            return np.empty(0, dtype=record_dtype())
+        return self.range(start, end)
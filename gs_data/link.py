@@ -0,0 +1,154 @@
+import time
+from collections import deque
+
+"""LoRa data-rate presets and the SNR/loss based auto data-rate controller"""
+
+class DataRate():
+    def __init__(self, name, spreading_factor, bandwidth, coding_rate):
+        self.name = name
+        self.spreading_factor = spreading_factor
+        self.bandwidth = bandwidth          # Hz
+        self.coding_rate = coding_rate      # denominator of 4/x
+
+    def __str__(self):
+        return f"{self.name} (SF{self.spreading_factor}, {self.bandwidth / 1000:g} kHz, CR 4/{self.coding_rate})"
+
+    def __eq__(self, other):
+        return isinstance(other, DataRate) and self.settings() == other.settings()
+
+    def settings(self):
+        return (self.spreading_factor, self.bandwidth, self.coding_rate)
+
+    def snr_limit(self):
+        """
+        Minimum SNR (dB) the SX127x can demodulate at this spreading factor.
+        """
+        return SNR_LIMITS[self.spreading_factor]
+
+# Demodulator SNR floor per spreading factor (SX1276 datasheet, table 13)
+SNR_LIMITS = {7: -7.5, 8: -10.0, 9: -12.5, 10: -15.0, 11: -17.5, 12: -20.0}
+
+VALID_SPREADING_FACTORS = list(SNR_LIMITS.keys())
+VALID_BANDWIDTHS = [7800, 10400, 15600, 20800, 31250, 41700, 62500, 125000, 250000, 500000]
+VALID_CODING_RATES = [5, 6, 7, 8]
+
+# Ordered from maximum range (index 0) to maximum throughput (last index)
+DATA_RATES = [
+    DataRate("range",   12, 125000, 8),
+    DataRate("sf11",    11, 125000, 8),
+    DataRate("sf10",    10, 125000, 5),
+    DataRate("sf9",      9, 125000, 5),
+    DataRate("sf8",      8, 125000, 5),
+    DataRate("default",  7, 125000, 5),  # adafruit_rfm9x power-on settings
+    DataRate("fast",     7, 250000, 5),
+    DataRate("fastest",  7, 500000, 5),
+]
+DEFAULT_DATA_RATE = 5
+
+def data_rate_index(settings):
+    """
+    Return the DATA_RATES index matching (sf, bw, cr), or None.
+    """
+    for i, rate in enumerate(DATA_RATES):
+        if rate.settings() == tuple(settings):
+            return i
+    return None
+
+def data_rate_by_name(name):
+    for i, rate in enumerate(DATA_RATES):
+        if rate.name == name:
+            return i
+    raise ValueError(f"Unknown data rate preset: {name}")
+
+
+class DataRateController():
+    """
+    Steps the link data rate up or down the DATA_RATES ladder.
+
+    Every received frame feeds its SNR and onboard timestamp. Once a window
+    has enough frames, the controller recommends a faster preset when the
+    SNR margin over the demodulator floor is comfortable and loss is low,
+    and a slower (longer range) preset when the margin shrinks or loss
+    grows. After every switch it holds for `hold_time` seconds so a single
+    fade can't make it oscillate.
+    """
+    def __init__(self, index=DEFAULT_DATA_RATE, window=20, min_frames=5,
+                 step_up_margin=10.0, step_down_margin=3.0,
+                 step_up_loss=0.05, step_down_loss=0.20, hold_time=10.0):
+        self.index = index
+        self.window = window
+        self.min_frames = min_frames
+        self.step_up_margin = step_up_margin
+        self.step_down_margin = step_down_margin
+        self.step_up_loss = step_up_loss
+        self.step_down_loss = step_down_loss
+        self.hold_time = hold_time
+        self.enabled = False
+        self.snrs = deque(maxlen=window)
+        self.timestamps = deque(maxlen=window)
+        self.frame_interval = None
+        self.last_switch = 0.0
+
+    def reset(self, index=None):
+        if index is not None:
+            self.index = index
+        self.snrs.clear()
+        self.timestamps.clear()
+        # The transmit interval changes with the data rate; learn it again
+        self.frame_interval = None
+        self.last_switch = time.time()
+
+    def update(self, snr, timestamp):
+        """
+        Record a received frame. `timestamp` is the onboard timestamp in ms.
+        """
+        if snr is not None:
+            self.snrs.append(snr)
+        if self.timestamps and timestamp > self.timestamps[-1]:
+            interval = timestamp - self.timestamps[-1]
+            # The smallest gap seen is the nominal transmit interval
+            if self.frame_interval is None or interval < self.frame_interval:
+                self.frame_interval = interval
+        if not self.timestamps or timestamp > self.timestamps[-1]:
+            self.timestamps.append(timestamp)
+
+    def snr_margin(self):
+        if not self.snrs:
+            return None
+        return sum(self.snrs) / len(self.snrs) - DATA_RATES[self.index].snr_limit()
+
+    def loss(self):
+        """
+        Fraction of frames lost in the window, from gaps in the onboard timestamps.
+        """
+        if len(self.timestamps) < 2 or not self.frame_interval:
+            return None
+        span = self.timestamps[-1] - self.timestamps[0]
+        expected = span / self.frame_interval + 1
+        return max(0.0, 1.0 - len(self.timestamps) / expected)
+
+    def recommend(self, ceiling=None):
+        """
+        Return the DATA_RATES index to switch to, or None to stay put.
+        `ceiling` caps how far up the ladder it will step.
+        """
+        if not self.enabled or time.time() - self.last_switch < self.hold_time:
+            return None
+        if len(self.snrs) < self.min_frames:
+            return None
+        margin = self.snr_margin()
+        loss = self.loss() or 0.0
+        if (margin < self.step_down_margin or loss > self.step_down_loss) and self.index > 0:
+            return self.index - 1
+        top = len(DATA_RATES) - 1 if ceiling is None else ceiling
+        if (margin > self.step_up_margin and loss < self.step_up_loss) and self.index < top:
+            return self.index + 1
+        return None
+
+    def status(self):
+        return {
+            "enabled": self.enabled,
+            "data_rate": DATA_RATES[self.index].name,
+            "snr_margin": self.snr_margin(),
+            "loss": self.loss(),
+        }
@@ -0,0 +1,232 @@
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+import redis
+import redis.asyncio as aioredis
+from common.redis_helper import TelemetryKeys
+
+"""
+Fan-out live telemetry server.
+
+One task polls Redis for the latest value of every telemetry key and pushes
+only the keys that changed to any number of clients over Server-Sent Events
+(GET /stream) or WebSocket (GET /ws). GET /snapshot returns the latest values
+as JSON, and both streams start with a snapshot. Redis load is the same no
+matter how many clients are connected.
+"""
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WRITE_TIMEOUT = 5.0     # seconds a client may take to drain before it is dropped
+MAX_CLIENT_FRAME = 4096 # bytes; clients only send pings and close frames
+# How a client going away shows up; not worth logging
+DISCONNECT_ERRORS = (ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError)
+
+class LiveClient():
+    """
+    Per-client mailbox. Deltas that arrive while the client is still
+    writing the previous frame are merged, so a slow client gets fewer,
+    fresher frames instead of a growing backlog.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.pending = {}
+        self.event = asyncio.Event()
+        self.sent = 0
+        self.coalesced = 0
+
+    def offer(self, delta):
+        if self.pending:
+            self.coalesced += 1
+        self.pending.update(delta)
+        self.event.set()
+
+    async def next_frame(self):
+        await self.event.wait()
+        self.event.clear()
+        frame, self.pending = self.pending, {}
+        return frame
+
+
+class LiveTelemetryServer():
+    def __init__(self, host="0.0.0.0", port=8765, redis_host="localhost", redis_port=6379,
+                 interval=0.1):
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.redis = aioredis.Redis(host=redis_host, port=redis_port, decode_responses=True)
+        self.flight = None
+        self.snapshot = {}
+        self.clients = set()
+
+    async def poll_redis(self):
+        """
+        The single Redis reader: one pipelined TS.GET per key per interval.
+        """
+        while True:
+            try:
+                flight = await self.redis.get("current_flight")
+                if flight != self.flight:
+                    self.flight = flight
+                    self.snapshot = {}
+                if flight is not None:
+                    keys = [k for k in TelemetryKeys.KEYS if k.profile.structure == "timeseries"]
+                    pipe = self.redis.pipeline(transaction=False)
+                    for key in keys:
+                        pipe.ts().get(f"{flight}.{key.key}")
+                    results = await pipe.execute(raise_on_error=False)
+                    delta = {}
+                    for key, result in zip(keys, results):
+                        if isinstance(result, Exception) or not result:
+                            continue
+                        sample = [result[0], result[1]]
+                        if self.snapshot.get(key.key) != sample:
+                            self.snapshot[key.key] = sample
+                            delta[key.key] = sample
+                    if delta:
+                        for client in self.clients:
+                            client.offer(delta)
+            except redis.exceptions.RedisError as e:
+                # Includes server errors (e.g. a key of the wrong type); keep polling
+                print(f"[LIVE] Redis error: {e}")
+                await asyncio.sleep(1)
+            await asyncio.sleep(self.interval)
+
+    def message(self, data):
+        return json.dumps({"flight": self.flight, "data": data})
+
+    async def handle(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            writer.close()
+            return
+        lines = request.decode("latin-1").split("\r\n")
+        request_line = lines[0].split(" ")
+        if len(request_line) < 2:
+            try:
+                await self.respond(writer, "400 Bad Request", "text/plain", b"")
+            except ConnectionError:
+                pass
+            writer.close()
+            return
+        method, path = request_line[:2]
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        try:
+            if method != "GET":
+                await self.respond(writer, "405 Method Not Allowed", "text/plain", b"")
+            elif path == "/snapshot":
+                await self.respond(writer, "200 OK", "application/json", self.message(self.snapshot).encode())
+            elif path == "/stream":
+                await self.serve_sse(writer, f"sse {peer}")
+            elif path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                await self.serve_websocket(reader, writer, headers, f"ws {peer}")
+            else:
+                await self.respond(writer, "404 Not Found", "text/plain", b"")
+        except DISCONNECT_ERRORS:
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, content_type, body):
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(body)}\r\nAccess-Control-Allow-Origin: *\r\n"
+                     f"Connection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+
+    async def stream(self, writer, client, encode):
+        """
+        Send the snapshot, then coalesced deltas until the client goes away
+        or stops draining within WRITE_TIMEOUT.
+        """
+        self.clients.add(client)
+        print(f"[LIVE] {client.name} connected ({len(self.clients)} clients)")
+        try:
+            writer.write(encode(self.message(self.snapshot)))
+            await asyncio.wait_for(writer.drain(), WRITE_TIMEOUT)
+            while True:
+                frame = await client.next_frame()
+                writer.write(encode(self.message(frame)))
+                await asyncio.wait_for(writer.drain(), WRITE_TIMEOUT)
+                client.sent += 1
+        finally:
+            self.clients.discard(client)
+            print(f"[LIVE] {client.name} disconnected: sent {client.sent}, coalesced {client.coalesced}")
+
+    async def serve_sse(self, writer, name):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nAccess-Control-Allow-Origin: *\r\n\r\n")
+        await self.stream(writer, LiveClient(name), lambda m: f"data: {m}\n\n".encode())
+
+    async def serve_websocket(self, reader, writer, headers, name):
+        key = headers.get("sec-websocket-key")
+        if not key:
+            await self.respond(writer, "400 Bad Request", "text/plain", b"Missing Sec-WebSocket-Key")
+            return
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest())
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                     b"Connection: Upgrade\r\nSec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        await writer.drain()
+        sender = asyncio.ensure_future(self.stream(writer, LiveClient(name), ws_text_frame))
+        receiver = asyncio.ensure_future(ws_wait_close(reader, writer))
+        done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        # Retrieve every outcome so failures are logged, not left for "never retrieved"
+        for task in done:
+            error = None if task.cancelled() else task.exception()
+            if error is not None and not isinstance(error, DISCONNECT_ERRORS):
+                print(f"[LIVE] {name} failed: {error!r}")
+
+    async def serve(self):
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        print(f"[LIVE] Serving telemetry on {self.host}:{self.port} (/stream, /ws, /snapshot)")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.poll_redis())
+
+    def run(self):
+        asyncio.run(self.serve())
+
+
+def ws_text_frame(text, opcode=0x1):
+    payload = text.encode() if isinstance(text, str) else text
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+async def ws_wait_close(reader, writer):
+    """
+    Read (and discard) client frames, answering pings, until the client closes.
+    """
+    while True:
+        b0, b1 = await reader.readexactly(2)
+        opcode = b0 & 0x0F
+        length = b1 & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await reader.readexactly(8))[0]
+        if length > MAX_CLIENT_FRAME:
+            # 1009: message too big
+            writer.write(ws_text_frame(struct.pack("!H", 1009), opcode=0x8))
+            return
+        mask = await reader.readexactly(4) if b1 & 0x80 else b"\x00" * 4
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(await reader.readexactly(length)))
+        if opcode == 0x8:
+            writer.write(ws_text_frame(payload, opcode=0x8))
+            return
+        if opcode == 0x9:
+            writer.write(ws_text_frame(payload, opcode=0xA))
@@ -0,0 +1,57 @@
+import re
+
+"""Sensor payload layout shared by the decoder, the validator, the emulator and reprocessing"""
+
+"""
++--------------------+-----------+-------+------------+-------------------------------+
+| Field              | Type      | Bytes | Multiplier | Description                   |
++--------------------+-----------+-------+------------+-------------------------------+
+| BMP280 Temp        | int16_t   | 2     | *100       | Temperature in °C             |
+| Pressure           | uint32_t  | 4     | *100       | Pressure in hPa               |
+| BMP280 Altitude    | int16_t   | 2     | *10        | Altitude in meters            |
+| Accel X/Y/Z        | int16_t*3 | 6     | *100       | Acceleration in m/s²          |
+| Gyro X/Y/Z         | int16_t*3 | 6     | *100       | Angular velocity in °/s       |
+| IMU Temp           | int16_t   | 2     | *100       | IMU temperature in °C         |
+| Mag X/Y/Z          | int16_t*3 | 6     | *100       | Magnetic field in µT          |
+| Extra Temp Sensor  | int16_t   | 2     | *100       | External temp in °C           |
+| GPS Latitude       | int32_t   | 4     | *1e7       | Degrees                       |
+| GPS Longitude      | int32_t   | 4     | *1e7       | Degrees                       |
+| GPS Altitude       | int16_t   | 2     | *10        | Altitude in meters            |
+| GPS Speed          | uint16_t  | 2     | *100       | Speed in knots                |
+| GPS Angle          | uint16_t  | 2     | *100       | Heading angle in degrees      |
+| timestamp          | uint32_t  | 4     | *1         | Timestamp of data             |
++--------------------+-----------+-------+------------+-------------------------------+
+| TOTAL              |           | 48    |            |                               |
++--------------------+-----------+-------+------------+-------------------------------+
+
+"""
+
+# Define the format string for struct.unpack
+FORMAT = "<h I h 3h 3h h 3h h i i h H H I"
+# struct code of each field in FORMAT, e.g. ["h", "I", "h", "h", ...]
+FORMAT_CODES = [code for count, code in re.findall(r"(\d*)([a-zA-Z])", FORMAT) for _ in range(int(count or 1))]
+
+# Unit conversion applied to each decoded field: value / divisor * factor.
+# Shared by TelemetryData.unpack and the vectorized decoder in reprocess.py.
+FIELD_SCALES = [
+    ("bmp280_temp", 100, 1),
+    ("bmp280_pressure", 100, 1),
+    ("bmp280_altitude", 10, 1),
+    ("accel_x", 100, 1),
+    ("accel_y", 100, 1),
+    ("accel_z", 100, 1),
+    ("gyro_x", 100, 1),
+    ("gyro_y", 100, 1),
+    ("gyro_z", 100, 1),
+    ("imu_temp", 100, 1),
+    ("mag_x", 100, 1),
+    ("mag_y", 100, 1),
+    ("mag_z", 100, 1),
+    ("extra_temp_sensor", 100, 1),
+    ("gps_latitude", 1e7, 1),
+    ("gps_longitude", 1e7, 1),
+    ("gps_altitude", 10, 1),
+    ("gps_speed", 100, 0.514444),  # knots to m/s
+    ("gps_angle", 100, 1),
+    ("timestamp", 1, 1),
+]
@@ -1,10 +1,13 @@
 import time
-import board
-import digitalio
-from adafruit_rfm9x import RFM9x
 
 class RFM95Radio():
-    def __init__(self, cs_pin, reset_pin, spi=board.SPI(), frequency=915.0, baudrate=4000000, node=100):
+    def __init__(self, cs_pin, reset_pin, spi=None, frequency=915.0, baudrate=4000000, node=100):
+        # Imported here so modules that only reference the radio don't need Blinka
+        import board
+        import digitalio
+        from adafruit_rfm9x import RFM9x
+        if spi is None:
+            spi = board.SPI()
         self.cs = digitalio.DigitalInOut(cs_pin)
         self.reset_pin = digitalio.DigitalInOut(reset_pin)
         self.radio = RFM9x(spi, self.cs, self.reset_pin, frequency, baudrate=baudrate)
@@ -17,8 +20,8 @@ class RFM95Radio():
     def send(self, data):
         self.radio.send(data)
     
-    def receive(self) -> str:
-        packet = self.radio.receive(timeout=1.0)  # Wait for 1 second for a packet
+    def receive(self, timeout=1.0) -> str:
+        packet = self.radio.receive(timeout=timeout)  # Wait up to timeout seconds for a packet
         if packet is not None:
             return packet
         else:
@@ -44,5 +47,50 @@ class RFM95Radio():
     def set_frequency(self, frequency):
         self.radio.frequency_mhz = frequency
 
+    def set_spreading_factor(self, spreading_factor):
+        self.radio.spreading_factor = spreading_factor
+
+    def set_signal_bandwidth(self, bandwidth):
+        self.radio.signal_bandwidth = bandwidth
+
+    def set_coding_rate(self, coding_rate):
+        self.radio.coding_rate = coding_rate
+
+    def spreading_factor(self):
+        return self.radio.spreading_factor
+
+    def signal_bandwidth(self):
+        return self.radio.signal_bandwidth
+
+    def coding_rate(self):
+        return self.radio.coding_rate
+
     def reset(self):
         self.radio.reset()
+
+
+class SharedSPI():
+    """
+    SPI bus shared with radios in other processes. busio only locks the bus
+    within one process; this also holds a multiprocessing.Lock for every
+    transfer, so two chip selects are never active at once across processes.
+    """
+    def __init__(self, spi, lock):
+        self.spi = spi
+        self.lock = lock
+
+    def try_lock(self):
+        if not self.lock.acquire(block=False):
+            return False
+        if self.spi.try_lock():
+            return True
+        self.lock.release()
+        return False
+
+    def unlock(self):
+        self.spi.unlock()
+        self.lock.release()
+
+    def __getattr__(self, name):
+        # configure(), write(), readinto(), ... go straight to the bus
+        return getattr(self.spi, name)
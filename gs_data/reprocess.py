@@ -0,0 +1,281 @@
+import csv
+import os
+import re
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from .data import TELEMETRY_CHANNELS
+from .payload import FORMAT, FORMAT_CODES, FIELD_SCALES
+from .flight_log import FlightLogSegment
+from .validation import range_violations, GPS_FIELDS
+
+"""
+Bulk re-decoding of archived flights.
+
+Inputs are flight log directories (raw payloads, re-decoded with the current
+FIELD_SCALES) or daemon CSV files (already decoded, imported as recorded).
+Every flight log segment and every CSV file is one shard; shards run on a
+ProcessPoolExecutor. A worker decodes its whole shard with NumPy and writes
+it either to Redis with batched TS.MADD or to a compressed columnar .npz.
+Logged frames outside the channel limits in validation.py are dropped, and
+GPS samples without a fix are left out of Redis, as in the live daemon.
+
+Flight logs carry the real receive time, so writing one again overwrites
+its samples in place. CSV receive times are only estimated, so a CSV for a
+flight that already has data (in Redis or from a log in the same run) would
+add a time-shifted second copy; such CSVs are skipped unless forced.
+"""
+
+MADD_BATCH = 20000
+# <flight>_<YYYYmmddTHHMMSS>_<id>, as named by TelemetryDataProcess (CSV file or log directory)
+SESSION_NAME = re.compile(r"^(?P<flight>.+)_(?P<start>\d{8}T\d{6})_[0-9a-f]{8}$")
+STRUCT_TO_NUMPY = {"h": "<i2", "H": "<u2", "i": "<i4", "I": "<u4", "b": "i1", "B": "u1", "f": "<f4"}
+
+def raw_dtype():
+    """
+    NumPy structured dtype for one raw sensor payload, built from FORMAT.
+    """
+    import numpy as np
+    codes = [STRUCT_TO_NUMPY[code] for code in FORMAT_CODES]
+    names = [name for name, _, _ in FIELD_SCALES]
+    dtype = np.dtype(list(zip(names, codes)))
+    assert dtype.itemsize == struct.calcsize(FORMAT), "FORMAT has padding NumPy doesn't model"
+    return dtype
+
+def decode_raw(raw):
+    """
+    Decode an (n,) array of raw payloads (S48) into {field: float64/int64 column},
+    applying the same unit conversions as TelemetryData.unpack.
+    """
+    import numpy as np
+    frames = np.frombuffer(raw.tobytes(), dtype=raw_dtype())
+    columns = {}
+    for name, divisor, factor in FIELD_SCALES:
+        if divisor == 1:
+            columns[name] = frames[name].astype(np.int64)
+        else:
+            columns[name] = frames[name] / divisor * factor
+    return columns
+
+def flight_log_shards(directory):
+    names = sorted(f[:-4] for f in os.listdir(directory) if f.endswith(".log"))
+    return [("log", os.path.join(directory, name)) for name in names]
+
+def expand_inputs(paths):
+    """
+    (kind, path) shards for a list of CSV files and flight log directories.
+    """
+    shards = []
+    for path in paths:
+        if os.path.isdir(path):
+            shards += flight_log_shards(path)
+        elif path.endswith(".csv"):
+            shards.append(("csv", path))
+        else:
+            raise ValueError(f"Not a CSV file or flight log directory: {path}")
+    return shards
+
+def flight_from_path(kind, path):
+    """
+    Flight name and session start (epoch ms) from the daemon's file naming.
+    """
+    if kind == "log":
+        name = os.path.basename(os.path.dirname(path))
+    else:
+        name = os.path.splitext(os.path.basename(path))[0]
+    match = SESSION_NAME.match(name)
+    if match is None:
+        return None, None
+    start = datetime.strptime(match.group("start"), "%Y%m%dT%H%M%S").timestamp()
+    return match.group("flight"), int(start * 1000)
+
+def load_log_segment(base):
+    """
+    Decoded columns of one flight log segment and the number of frames
+    dropped for failing the range checks.
+    """
+    import numpy as np
+    segment = FlightLogSegment(base)
+    records = segment.read(0, segment.records)
+    frames = np.frombuffer(records["raw"].tobytes(), dtype=raw_dtype())
+    valid = ~range_violations(np.stack([frames[name] for name in frames.dtype.names], axis=1)).any(axis=1)
+    columns = decode_raw(records["raw"][valid])
+    columns["host_time_ms"] = records["host_time_ms"][valid].astype("int64")
+    return columns, int(len(valid) - valid.sum())
+
+def load_csv(path, start_ms):
+    """
+    CSV rows as columns. CSVs hold decoded values only, so they are imported
+    as recorded. Receive time is estimated from the session start in the
+    file name plus the onboard timestamp.
+    """
+    import numpy as np
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+    columns = {}
+    for name, _, _ in FIELD_SCALES:
+        values = [row.get(name) for row in rows]
+        if any(v in (None, "") for v in values):
+            raise ValueError(f"Column {name} missing or empty")
+        dtype = np.int64 if name == "timestamp" else np.float64
+        columns[name] = np.array(values, dtype=np.float64).astype(dtype)
+    if start_ms is None:
+        raise ValueError("Can't place CSV rows in time: file name has no session start")
+    timestamps = columns["timestamp"]
+    offset = timestamps - timestamps[0] if len(timestamps) else timestamps
+    columns["host_time_ms"] = start_ms + offset
+    return columns
+
+def write_redis(columns, flight, host, port):
+    import redis
+    client = redis.Redis(host=host, port=port)
+    has_fix = (columns["gps_latitude"] != 0) | (columns["gps_longitude"] != 0)
+    rejected = 0
+    for key, attr in TELEMETRY_CHANNELS:
+        if attr not in columns:
+            continue  # Derived strings (gps_coords_str) aren't re-derived
+        full_key = f"{flight}.{key.key}"
+        keep = has_fix if attr in GPS_FIELDS else slice(None)
+        times = columns["host_time_ms"][keep].tolist()
+        values = columns[attr][keep].tolist()
+        for i in range(0, len(times), MADD_BATCH):
+            ktv = [(full_key, t, v) for t, v in zip(times[i:i + MADD_BATCH], values[i:i + MADD_BATCH])]
+            results = client.ts().madd(ktv)
+            rejected += sum(1 for r in results if isinstance(r, Exception))
+    return rejected
+
+def stored_series(client, flight):
+    """
+    The flight's telemetry series that already hold samples (per TS.INFO).
+    """
+    import redis
+    keys = []
+    for key, _ in TELEMETRY_CHANNELS:
+        try:
+            if client.ts().info(f"{flight}.{key.key}").total_samples:
+                keys.append(f"{flight}.{key.key}")
+        except redis.exceptions.ResponseError:
+            pass  # No such series, or a stream-profiled key
+    return keys
+
+def write_npz(columns, output_dir, shard_name):
+    import numpy as np
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, shard_name + ".npz")
+    np.savez_compressed(path, **columns)
+    return path
+
+def process_shard(kind, path, flight=None, output="redis", output_dir=None,
+                  redis_host="localhost", redis_port=6379):
+    """
+    Decode one shard and write it out. Runs in a worker process; returns a
+    result dict instead of raising so one bad file doesn't stop the batch.
+    """
+    start = time.time()
+    result = {"path": path, "frames": 0, "invalid": 0, "rejected": 0, "error": None, "output": None}
+    try:
+        file_flight, start_ms = flight_from_path(kind, path)
+        flight = flight or file_flight
+        if flight is None:
+            raise ValueError("Can't tell the flight from the file name; pass --flight")
+        if kind == "log":
+            columns, result["invalid"] = load_log_segment(path)
+        else:
+            columns = load_csv(path, start_ms)
+        result["frames"] = len(columns["host_time_ms"])
+        result["flight"] = flight
+        if output == "npz":
+            parent = os.path.basename(os.path.dirname(path)) if kind == "log" else ""
+            shard_name = "_".join(filter(None, [parent, os.path.splitext(os.path.basename(path))[0]]))
+            result["output"] = write_npz(columns, output_dir, shard_name)
+        else:
+            result["rejected"] = write_redis(columns, flight, redis_host, redis_port)
+            result["output"] = f"redis {flight}"
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.time() - start
+    return result
+
+def skip_duplicate_csvs(shards, flight, redis_host, redis_port):
+    """
+    Drop CSV shards whose flight already has samples in Redis or is also
+    being loaded from a flight log in this run.
+    """
+    import redis
+    flight_of = {(kind, path): flight or flight_from_path(kind, path)[0] for kind, path in shards}
+    csv_flights = {flight_of[s] for s in shards if s[0] == "csv"} - {None}
+    log_flights = {flight_of[s] for s in shards if s[0] == "log"}
+    if not csv_flights:
+        return shards
+    client = redis.Redis(host=redis_host, port=redis_port)
+    skipped = set()
+    for name in sorted(csv_flights):
+        if name in log_flights:
+            print(f"[REPROCESS] {name}: also loaded from a flight log, skipping its CSV files (--force to import)")
+            skipped.add(name)
+            continue
+        series = stored_series(client, name)
+        if series:
+            print(f"[REPROCESS] {name}: {len(series)} series already hold data, skipping its CSV files "
+                  f"(--force to import)")
+            skipped.add(name)
+    return [s for s in shards if not (s[0] == "csv" and flight_of[s] in skipped)]
+
+def reprocess(paths, flight=None, output="redis", output_dir=None, jobs=None,
+              redis_host="localhost", redis_port=6379, force=False):
+    """
+    Shard the inputs over a process pool, printing one line per finished
+    shard and a throughput summary. Returns the list of shard results.
+    force: import CSVs into Redis even when their flight already has data.
+    """
+    shards = expand_inputs(paths)
+    if output == "redis" and not force:
+        shards = skip_duplicate_csvs(shards, flight, redis_host, redis_port)
+    if not shards:
+        print("[REPROCESS] Nothing to do")
+        return []
+    if output == "redis":
+        # Create/label the series once, before workers race to write them
+        from common.redis_helper import RedisHelper
+        flights = {flight or flight_from_path(kind, path)[0] for kind, path in shards} - {None}
+        for name in sorted(flights):
+            RedisHelper(host=redis_host, port=redis_port, flight_name=name).init_keys(set_current=False)
+
+    jobs = jobs or os.cpu_count()
+    print(f"[REPROCESS] {len(shards)} shards on {jobs} workers")
+    start = time.time()
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(process_shard, kind, path, flight, output, output_dir, redis_host, redis_port)
+                   for kind, path in shards]
+        for future in as_completed(futures):
+            r = future.result()
+            results.append(r)
+            prefix = f"[{len(results)}/{len(shards)}] {r['path']}"
+            if r["error"]:
+                print(f"{prefix}: FAILED {r['error']}")
+            else:
+                rate = r["frames"] / max(r["seconds"], 1e-6)
+                invalid = f", {r['invalid']} invalid frames dropped" if r["invalid"] else ""
+                rejected = f", {r['rejected']} samples rejected" if r["rejected"] else ""
+                print(f"{prefix}: {r['frames']} frames in {r['seconds']:.2f} s "
+                      f"({rate:.0f} frames/s) -> {r['output']}{invalid}{rejected}")
+
+    if output == "redis":
+        # Catalog bounds and counts now come from the rewritten series
+        helper = RedisHelper(host=redis_host, port=redis_port)
+        for name in sorted({r["flight"] for r in results if not r["error"]}):
+            try:
+                info = helper.redis_ts.info(f"{name}.timestamp")
+                helper.catalog.set_bounds(name, info.total_samples, info.first_timestamp, info.last_timestamp)
+            except Exception as e:
+                print(f"[REPROCESS] Failed to update catalog for {name}: {e}")
+
+    elapsed = time.time() - start
+    frames = sum(r["frames"] for r in results if not r["error"])
+    failed = [r for r in results if r["error"]]
+    print(f"[REPROCESS] {frames} frames from {len(results) - len(failed)} shards in {elapsed:.1f} s "
+          f"({frames / max(elapsed, 1e-6):.0f} frames/s), {len(failed)} failed")
+    return results
@@ -0,0 +1,230 @@
+import heapq
+import itertools
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+
+"""Priority scheduler for ground station tasks pushed onto gs:tasks"""
+
+TASKS_KEY = "gs:tasks"
+TASK_STATUS_KEY = "gs:task:{}"
+TASK_INDEX_KEY = "gs:task_index"
+TASK_STATUS_TTL = 3600      # seconds a finished task's status stays readable
+TASK_INDEX_LENGTH = 100     # most recent task ids kept for `gs_ctl task_status`
+RESPONSE_KEY = "gs:response:{}"
+RESPONSE_LIST_KEY = "gs:response_list:{}"  # gs_ctl blocks on this with BLPOP
+RESPONSE_TTL = 10
+
+class TaskPriority(Enum):
+    CRITICAL = 0
+    NORMAL = 1
+    HOUSEKEEPING = 2
+
+class TaskStatus(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    EXPIRED = "expired"
+    CANCELLED = "cancelled"
+
+# Priority used when the client doesn't ask for one
+DEFAULT_PRIORITIES = {
+    "send_flight_ready": TaskPriority.CRITICAL,
+    "force_ground_frequency": TaskPriority.CRITICAL,
+    "change_frequency": TaskPriority.NORMAL,
+    "change_data_rate": TaskPriority.NORMAL,
+    "auto_data_rate": TaskPriority.NORMAL,
+    "set_ground_station_id": TaskPriority.HOUSEKEEPING,
+    "set_rocket_id": TaskPriority.HOUSEKEEPING,
+}
+
+# Tasks that transmit or retune, so they must run one at a time on the daemon loop
+RADIO_TASKS = {
+    "change_frequency",
+    "force_ground_frequency",
+    "change_data_rate",
+    "send_flight_ready",
+    "auto_data_rate",       # Changes the rate controller the daemon loop updates
+}
+
+def respond(redis, task_id, result):
+    """
+    Publish a task result both as a plain key and on a list a client can BLPOP.
+    """
+    list_key = RESPONSE_LIST_KEY.format(task_id)
+    pipe = redis.pipeline(transaction=False)
+    pipe.set(RESPONSE_KEY.format(task_id), result, ex=RESPONSE_TTL)
+    pipe.rpush(list_key, result)
+    pipe.expire(list_key, RESPONSE_TTL)
+    pipe.execute()
+
+def result_status(result):
+    """
+    Task handlers report failure through an ERROR prefixed result string.
+    """
+    if str(result).startswith(("ERROR", "[ERROR]", "Unknown task")):
+        return TaskStatus.FAILED
+    return TaskStatus.DONE
+
+class ScheduledTask():
+    def __init__(self, task, priority, seq):
+        self.task = task
+        self.task_id = task["task_id"]
+        self.name = task["task"]
+        self.priority = priority
+        self.seq = seq
+        self.deadline = task.get("deadline")  # epoch seconds, None for no deadline
+        self.cancelled = False
+
+    def expired(self, now):
+        return self.deadline is not None and now > self.deadline
+
+    def __lt__(self, other):
+        # Lower priority value first, FIFO within a priority class
+        return (self.priority.value, self.seq) < (other.priority.value, other.seq)
+
+
+class TaskScheduler():
+    """
+    Drains gs:tasks into a priority queue and dispatches it.
+
+    Radio tasks run synchronously, one per call to run_pending(), always
+    highest priority first. Everything else runs on a small thread pool so
+    housekeeping never holds up the radio. Tasks past their deadline are
+    discarded instead of executed late, and `cancel_task` tasks remove a
+    queued task by id. Every state change is mirrored into a gs:task:<id>
+    hash so gs_ctl can read it.
+    """
+    def __init__(self, redis, runner, max_workers=4):
+        self.redis = redis
+        self.runner = runner
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.radio_queue = []
+        self.worker_queue = []
+        self.in_flight = {}
+        self.queued = {}
+        self.seq = itertools.count()
+
+    def poll(self):
+        """
+        Move every task waiting in Redis into the local queues.
+        """
+        while True:
+            task_json = self.redis.lpop(TASKS_KEY)
+            if not task_json:
+                return
+            try:
+                self.submit(json.loads(task_json))
+            except Exception as e:
+                print(f"[TASK ERROR] {e}")
+
+    def submit(self, task):
+        if task["task"] == "cancel_task":
+            self.cancel(task)
+            return
+        priority = task.get("priority")
+        if priority is None:
+            priority = DEFAULT_PRIORITIES.get(task["task"], TaskPriority.NORMAL)
+        elif str(priority).upper() in TaskPriority.__members__:
+            priority = TaskPriority[str(priority).upper()]
+        else:
+            # Fail it visibly so the client isn't left waiting on its response list
+            scheduled = ScheduledTask(task, TaskPriority.NORMAL, next(self.seq))
+            names = ", ".join(p.name.lower() for p in TaskPriority)
+            self.finish(scheduled, TaskStatus.FAILED, f"ERROR: Unknown priority {priority!r} (expected {names})")
+            return
+        scheduled = ScheduledTask(task, priority, next(self.seq))
+        self.queued[scheduled.task_id] = scheduled
+        queue = self.radio_queue if scheduled.name in RADIO_TASKS else self.worker_queue
+        heapq.heappush(queue, scheduled)
+        self.set_status(scheduled, TaskStatus.QUEUED)
+        self.redis.zadd(TASK_INDEX_KEY, {scheduled.task_id: time.time()})
+        self.redis.zremrangebyrank(TASK_INDEX_KEY, 0, -TASK_INDEX_LENGTH - 1)
+
+    def cancel(self, task):
+        target = task.get("params", {}).get("task_id")
+        scheduled = self.queued.get(target)
+        if scheduled is None:
+            result = f"ERROR: Task {target} is not queued"
+        else:
+            scheduled.cancelled = True
+            self.finish(scheduled, TaskStatus.CANCELLED, "ERROR: Task cancelled")
+            result = f"Task {target} cancelled"
+        self.respond(task["task_id"], result)
+
+    def run_pending(self):
+        """
+        Dispatch queued work. Call once per daemon loop iteration.
+        """
+        self.reap()
+        while self.worker_queue and len(self.in_flight) < self.max_workers:
+            scheduled = self.next_task(self.worker_queue)
+            if scheduled is None:
+                break
+            self.start(scheduled)
+            self.in_flight[self.executor.submit(self.runner, scheduled.task)] = scheduled
+        scheduled = self.next_task(self.radio_queue)
+        if scheduled is not None:
+            self.start(scheduled)
+            try:
+                result = self.runner(scheduled.task)
+                self.finish(scheduled, result_status(result), result)
+            except Exception as e:
+                self.finish(scheduled, TaskStatus.FAILED, f"[ERROR] {str(e)}")
+
+    def next_task(self, queue):
+        """
+        Pop the highest priority live task, discarding expired and cancelled ones.
+        """
+        now = time.time()
+        while queue:
+            scheduled = heapq.heappop(queue)
+            if scheduled.cancelled:
+                continue
+            if scheduled.expired(now):
+                print(f"Discarding expired task: {scheduled.task}")
+                self.finish(scheduled, TaskStatus.EXPIRED, "ERROR: Task deadline expired")
+                continue
+            return scheduled
+        return None
+
+    def start(self, scheduled):
+        # Running tasks can no longer be cancelled
+        self.queued.pop(scheduled.task_id, None)
+        self.set_status(scheduled, TaskStatus.RUNNING)
+
+    def reap(self):
+        for future in [f for f in self.in_flight if f.done()]:
+            scheduled = self.in_flight.pop(future)
+            try:
+                result = future.result()
+                self.finish(scheduled, result_status(result), result)
+            except Exception as e:
+                self.finish(scheduled, TaskStatus.FAILED, f"[ERROR] {str(e)}")
+
+    def finish(self, scheduled, status, result):
+        self.queued.pop(scheduled.task_id, None)
+        self.set_status(scheduled, status, result)
+        self.respond(scheduled.task_id, result)
+
+    def respond(self, task_id, result):
+        respond(self.redis, task_id, result)
+
+    def set_status(self, scheduled, status, result=None):
+        key = TASK_STATUS_KEY.format(scheduled.task_id)
+        fields = {
+            "task": scheduled.name,
+            "priority": scheduled.priority.name.lower(),
+            "status": status.value,
+            f"{status.value}_at": time.time(),
+        }
+        if result is not None:
+            fields["result"] = result
+        self.redis.hset(key, mapping=fields)
+        self.redis.expire(key, TASK_STATUS_TTL)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,157 @@
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+from .flight_log import RECORD_SIZE, pack_record, unpack_record, record_dtype
+
+"""
+Latest-frame buffer in shared memory for readers on the same host.
+
+The segment holds a small header and a ring of the most recent records in
+the flight log record layout. A seqlock guards it: the writer makes the
+sequence odd, writes the record, bumps the frame count, then makes it even
+again. A reader retries whenever the sequence was odd or changed while it
+was reading. Readers never take a lock, so the daemon is never blocked.
+
+Header (HEADER_SIZE bytes, little-endian):
+    magic        uint32
+    record_size  uint32
+    capacity     uint32
+    writer_pid   uint32   daemon that owns the segment
+    seq          uint64   seqlock sequence, odd while a write is in progress
+    count        uint64   total frames written; latest is at (count - 1) % capacity
+"""
+
+SHM_NAME = "gs_telemetry"
+MAGIC = 0x47535446  # "GSTF"
+HEADER_FORMAT = "<IIIIQQ"
+HEADER_SIZE = 64
+SEQ_OFFSET = 16
+COUNT_OFFSET = 24
+DEFAULT_CAPACITY = 256
+
+def attach(name):
+    """
+    Open an existing segment without handing it to this process's resource
+    tracker, which would unlink it when this process exits.
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+class SharedFrameWriter():
+    def __init__(self, name=SHM_NAME, capacity=DEFAULT_CAPACITY):
+        size = HEADER_SIZE + capacity * RECORD_SIZE
+        try:
+            existing = attach(name)
+        except FileNotFoundError:
+            existing = None
+        if existing is not None:
+            pid = self._owner(existing)
+            existing.close()
+            if pid is not None:
+                raise FileExistsError(f"Shared memory {name} is in use by a running daemon (pid {pid})")
+            # Left behind by a daemon that didn't shut down cleanly
+            shared_memory.SharedMemory(name=name).unlink()
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.capacity = capacity
+        self.seq = 0
+        self.count = 0
+        struct.pack_into(HEADER_FORMAT, self.shm.buf, 0, MAGIC, RECORD_SIZE, capacity, os.getpid(), 0, 0)
+
+    @staticmethod
+    def _owner(shm):
+        """
+        PID of the live process writing to `shm`, or None if it is stale.
+        """
+        if shm.size < HEADER_SIZE:
+            return None
+        magic, _, _, pid, _, _ = struct.unpack_from(HEADER_FORMAT, shm.buf, 0)
+        if magic != MAGIC or pid == 0 or pid == os.getpid():
+            return None
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return None
+        except PermissionError:
+            pass  # Alive, owned by another user
+        return pid
+
+    def publish(self, telemetry, raw=b"", rssi=0.0, snr=0.0, host_time_ms=None):
+        if host_time_ms is None:
+            host_time_ms = int(time.time() * 1000)
+        record = pack_record(telemetry, raw, rssi, snr, host_time_ms)
+        offset = HEADER_SIZE + (self.count % self.capacity) * RECORD_SIZE
+        buf = self.shm.buf
+        self.seq += 1
+        struct.pack_into("<Q", buf, SEQ_OFFSET, self.seq)
+        buf[offset:offset + RECORD_SIZE] = record
+        self.count += 1
+        struct.pack_into("<Q", buf, COUNT_OFFSET, self.count)
+        self.seq += 1
+        struct.pack_into("<Q", buf, SEQ_OFFSET, self.seq)
+
+    def close(self):
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedFrameReader():
+    def __init__(self, name=SHM_NAME):
+        # Readers must not unlink the daemon's segment when they exit
+        self.shm = attach(name)
+        magic, record_size, capacity, _, _, _ = struct.unpack_from(HEADER_FORMAT, self.shm.buf, 0)
+        if magic != MAGIC or record_size != RECORD_SIZE:
+            self.shm.close()
+            raise ValueError(f"Shared memory {name} has an incompatible layout")
+        self.capacity = capacity
+
+    def _read(self, fn, retries=1000):
+        buf = self.shm.buf
+        for _ in range(retries):
+            seq1 = struct.unpack_from("<Q", buf, SEQ_OFFSET)[0]
+            if seq1 & 1:
+                continue
+            count = struct.unpack_from("<Q", buf, COUNT_OFFSET)[0]
+            result = fn(buf, count)
+            if struct.unpack_from("<Q", buf, SEQ_OFFSET)[0] == seq1:
+                return result
+        raise TimeoutError("Shared frame buffer kept changing while reading")
+
+    def count(self):
+        return struct.unpack_from("<Q", self.shm.buf, COUNT_OFFSET)[0]
+
+    def latest(self):
+        """
+        Most recent frame as {field name: value}, or None before the first frame.
+        """
+        def read(buf, count):
+            if count == 0:
+                return None
+            return unpack_record(buf, HEADER_SIZE + ((count - 1) % self.capacity) * RECORD_SIZE)
+        return self._read(read)
+
+    def history(self, n=None):
+        """
+        Up to n most recent frames, oldest first, as a NumPy structured array.
+        """
+        import numpy as np
+        dtype = record_dtype()
+
+        def read(buf, count):
+            available = min(count, self.capacity, n if n is not None else self.capacity)
+            ring = np.frombuffer(buf, dtype=dtype, count=self.capacity, offset=HEADER_SIZE)
+            slots = (np.arange(count - available, count) % self.capacity)
+            return ring[slots]  # fancy indexing copies, so the result stays valid
+        return self._read(read)
+
+    def close(self):
+        self.shm.close()
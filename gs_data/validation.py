@@ -0,0 +1,181 @@
+import struct
+import time
+from collections import deque
+from enum import Enum
+from .payload import FORMAT, FORMAT_CODES, FIELD_SCALES
+
+"""
+Validation of sensor payloads before they are decoded and stored.
+
+Checks run on the raw integers from struct.unpack, against per-channel
+limits pre-scaled to raw units, so a frame costs one unpack and one
+vectorized comparison. Rejected frames are never decoded into Redis, CSV,
+the flight log or the estimator; the daemon puts them on the
+<flight>.quarantine stream with a reason code. A GPS reading of exactly
+(0, 0) means no fix: the frame is kept but the GPS channels are masked.
+"""
+
+# Hash of frame validation counters (accepted, rejects per reason, ...)
+VALIDATION_STATS_KEY = "gs:validation"
+
+# Known payload layouts by length. The protocol has no version byte, so the
+# length is what tells layouts apart; a new layout must differ in size.
+PAYLOAD_FORMATS = {struct.calcsize(FORMAT): FORMAT}
+
+# Physically plausible range per channel, in TelemetryData units
+CHANNEL_LIMITS = {
+    "bmp280_temp": (-40.0, 85.0),           # BMP280 operating range, C
+    "bmp280_pressure": (300.0, 1100.0),     # BMP280 measuring range, hPa
+    "bmp280_altitude": (-500.0, 10000.0),   # m
+    "accel_x": (-160.0, 160.0),             # +-16 g, m/s^2
+    "accel_y": (-160.0, 160.0),
+    "accel_z": (-160.0, 160.0),
+    "gyro_x": (-2000.0, 2000.0),            # deg/s
+    "gyro_y": (-2000.0, 2000.0),
+    "gyro_z": (-2000.0, 2000.0),
+    "imu_temp": (-40.0, 85.0),
+    "mag_x": (-4900.0, 4900.0),             # uT
+    "mag_y": (-4900.0, 4900.0),
+    "mag_z": (-4900.0, 4900.0),
+    "extra_temp_sensor": (-55.0, 125.0),
+    "gps_latitude": (-90.0, 90.0),
+    "gps_longitude": (-180.0, 180.0),
+    "gps_altitude": (-500.0, 10000.0),
+    "gps_speed": (0.0, 700.0),              # m/s
+    "gps_angle": (0.0, 360.0),
+}
+GPS_FIELDS = ["gps_latitude", "gps_longitude", "gps_altitude", "gps_speed", "gps_angle", "gps_coords_str"]
+
+# Frame-to-frame plausibility
+MAX_PRESSURE_RATE = 150.0       # hPa/s; Mach 1 near sea level is ~40 hPa/s
+CLOCK_TOLERANCE = 5000          # ms the onboard clock may run ahead of the host's between frames
+REORDER_WINDOW = 2000           # ms older than the newest frame a late relay/receiver copy may be
+REBASELINE_AFTER = 5            # consecutive plausibility rejects before trusting the new values (e.g. FC reboot)
+
+class RejectReason(Enum):
+    LENGTH = 1          # No known payload layout has this length
+    RANGE = 2           # A channel is outside its physical limits
+    PRESSURE_JUMP = 3   # Pressure changed faster than any flight can
+    TIMESTAMP = 4       # Onboard clock went backwards or jumped, or a repeated frame
+
+
+def raw_limits():
+    """
+    (lo, hi) NumPy int64 arrays of CHANNEL_LIMITS in raw payload units, in
+    FORMAT field order. Unlimited fields get their integer type's range.
+    """
+    import numpy as np
+    type_ranges = {"h": (-2 ** 15, 2 ** 15 - 1), "H": (0, 2 ** 16 - 1),
+                   "i": (-2 ** 31, 2 ** 31 - 1), "I": (0, 2 ** 32 - 1)}
+    lo, hi = [], []
+    for (name, divisor, factor), code in zip(FIELD_SCALES, FORMAT_CODES):
+        low, high = type_ranges[code]
+        if name in CHANNEL_LIMITS:
+            limit_lo, limit_hi = CHANNEL_LIMITS[name]
+            low = max(low, int(limit_lo * divisor / factor))
+            high = min(high, int(limit_hi * divisor / factor))
+        lo.append(low)
+        hi.append(high)
+    return np.array(lo, dtype=np.int64), np.array(hi, dtype=np.int64)
+
+def range_violations(raw):
+    """
+    Boolean mask of out-of-range values for an (n, fields) array of raw
+    payload integers (or one row). Used per frame by FrameValidator and on
+    whole batches by reprocess.
+    """
+    import numpy as np
+    lo, hi = raw_limits()
+    raw = np.asarray(raw, dtype=np.int64)
+    return (raw < lo) | (raw > hi)
+
+
+class RateLimitedLog():
+    """
+    Prints the first message per tag, then at most one summary per
+    `interval` seconds with the number of messages suppressed.
+    """
+    def __init__(self, interval=5.0):
+        self.interval = interval
+        self.last = {}
+        self.suppressed = {}
+
+    def log(self, tag, message):
+        now = time.time()
+        if now - self.last.get(tag, 0.0) < self.interval:
+            self.suppressed[tag] = self.suppressed.get(tag, 0) + 1
+            return
+        suppressed = self.suppressed.pop(tag, 0)
+        note = f" ({suppressed} similar suppressed)" if suppressed else ""
+        print(f"[{tag}] {message}{note}")
+        self.last[tag] = now
+
+
+class FrameValidator():
+    """
+    check(payload) -> (raw values or None, RejectReason or None, detail, masked fields).
+    """
+    def __init__(self, log=None):
+        self.lo, self.hi = raw_limits()
+        self.names = [name for name, _, _ in FIELD_SCALES]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.lat = self.index["gps_latitude"]
+        self.lon = self.index["gps_longitude"]
+        self.pressure = self.index["bmp280_pressure"]
+        self.pressure_scale = FIELD_SCALES[self.pressure][1]
+        self.timestamp = self.index["timestamp"]
+        self.log = log or RateLimitedLog()
+        self.last_accepted = None
+        self.last_accepted_at = 0.0
+        # Onboard timestamps accepted recently, so late copies can fill gaps but not repeat
+        self.recent = deque(maxlen=256)
+        self.consecutive = 0
+        self.stats = {"accepted": 0, "gps_no_fix": 0, **{r.name.lower(): 0 for r in RejectReason}}
+
+    def check(self, payload):
+        fmt = PAYLOAD_FORMATS.get(len(payload))
+        if fmt is None:
+            return self.reject(RejectReason.LENGTH, f"{len(payload)} bytes")
+        import numpy as np
+        raw = struct.unpack(fmt, payload)
+        bad = (np.asarray(raw) < self.lo) | (np.asarray(raw) > self.hi)
+        if bad.any():
+            names = [self.names[i] for i in np.flatnonzero(bad)]
+            return self.reject(RejectReason.RANGE, ",".join(names), raw)
+
+        now = time.monotonic()
+        if self.last_accepted is not None and self.consecutive < REBASELINE_AFTER:
+            last = self.last_accepted
+            dt_ms = raw[self.timestamp] - last[self.timestamp]
+            # Late copies from other receivers may be a little older than the newest
+            # frame, but no frame can be newer than the time since that one arrived
+            if (dt_ms < -REORDER_WINDOW or raw[self.timestamp] in self.recent
+                    or dt_ms > (now - self.last_accepted_at) * 1000 + CLOCK_TOLERANCE):
+                return self.reject(RejectReason.TIMESTAMP, f"dt {dt_ms} ms", raw)
+            rate = abs(raw[self.pressure] - last[self.pressure]) / self.pressure_scale / (abs(dt_ms) / 1000)
+            if rate > MAX_PRESSURE_RATE:
+                return self.reject(RejectReason.PRESSURE_JUMP, f"{rate:.0f} hPa/s", raw)
+
+        if self.last_accepted is None or self.consecutive >= REBASELINE_AFTER:
+            self.recent.clear()
+            self.last_accepted = raw
+            self.last_accepted_at = now
+        elif dt_ms > 0:
+            self.last_accepted = raw
+            self.last_accepted_at = now
+        self.recent.append(raw[self.timestamp])
+        self.consecutive = 0
+        self.stats["accepted"] += 1
+        masked = ()
+        if raw[self.lat] == 0 and raw[self.lon] == 0:
+            self.stats["gps_no_fix"] += 1
+            masked = GPS_FIELDS
+        return raw, None, "", masked
+
+    def reject(self, reason, detail, raw=None):
+        # Garbage doesn't count towards re-baselining, or a noise burst would let the next bad frame in
+        if reason in (RejectReason.TIMESTAMP, RejectReason.PRESSURE_JUMP):
+            self.consecutive += 1
+        self.stats[reason.name.lower()] += 1
+        self.log.log("VALIDATION", f"Rejected frame: {reason.name} {detail}")
+        return raw, reason, detail, ()
@@ -1,8 +1,15 @@
+import os
+import sys
 import redis
 import tkinter as tk
 from tkinter import ttk
 from tkintermapview import TkinterMapView
 
+# Allow running as a script from anywhere in the checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gs_gui.track import TrackSimplifier
+from common.tile_cache import TileCache, TileServer
+
 # Initialize Redis connection
 try:
     redis_client = redis.StrictRedis(host='localhost', port=6379, decode_responses=True)
@@ -10,20 +17,55 @@ except redis.ConnectionError as e:
     print("Failed to connect to Redis:", e)
     exit(1)
 
-# Function to fetch GPS coordinates from Redis
+# Incremental GPS track state. Latitude and longitude are separate series
+# written with the same receive timestamp, so samples are joined on it.
+track = TrackSimplifier(threshold_m=2.0, max_points=500)
+track_state = {
+    "flight": None,
+    "last_ts": {"latitude": 0, "longitude": 0},
+    "pending": {"latitude": {}, "longitude": {}},
+    "last_fix": None,   # Latest raw fix; the simplified track can trail it
+}
+
+def reset_track(flight):
+    track.reset()
+    track_state["flight"] = flight
+    track_state["last_ts"] = {"latitude": 0, "longitude": 0}
+    track_state["pending"] = {"latitude": {}, "longitude": {}}
+    track_state["last_fix"] = None
+
+# Function to fetch new GPS coordinates from Redis
 def fetch_gps_coordinates():
+    """
+    Return the (lat, lon) pairs received since the last call for the current flight.
+    """
     try:
-        latitude_list = redis_client.lrange("latitude", 0, -1)
-        longitude_list = redis_client.lrange("longitude", 0, -1)
-
-        # Get the most recent value from each list
-        latitude = latitude_list[-1] if latitude_list else None
-        longitude = longitude_list[-1] if longitude_list else None
-
-        return latitude, longitude
-    except (redis.ResponseError, IndexError) as e:
+        flight = redis_client.get("current_flight")
+        if flight is None:
+            return []
+        if flight != track_state["flight"]:
+            reset_track(flight)
+
+        for axis in ("latitude", "longitude"):
+            samples = redis_client.ts().range(f"{flight}.gps.{axis}",
+                                              track_state["last_ts"][axis] + 1, "+")
+            if samples:
+                track_state["last_ts"][axis] = samples[-1][0]
+                track_state["pending"][axis].update((t, float(v)) for t, v in samples)
+
+        lats = track_state["pending"]["latitude"]
+        lons = track_state["pending"]["longitude"]
+        matched = sorted(lats.keys() & lons.keys())
+        coords = [(lats.pop(t), lons.pop(t)) for t in matched]
+        if matched:
+            # A sample whose partner never arrived would otherwise wait forever
+            for pending in (lats, lons):
+                for t in [t for t in pending if t < matched[-1]]:
+                    del pending[t]
+        return coords
+    except (redis.RedisError, ValueError) as e:
         print(f"Error fetching GPS data: {e}")
-        return None, None
+        return []
 
 # Function to update telemetry data
 def update_telemetry_data():
@@ -32,18 +74,43 @@ def update_telemetry_data():
     # Schedule the next update
     telemetry_tab.after(1000, update_telemetry_data)
 
+# Map objects, created on the first fix
+map_state = {"marker": None, "path": None}
+
+def redraw_path():
+    if map_state["path"] is not None:
+        map_state["path"].delete()
+        map_state["path"] = None
+    if len(track.points) >= 2:
+        map_state["path"] = gps_map.set_path(track.points, width=3)
+
 # Function to update the map with GPS coordinates
 def update_map():
-    latitude, longitude = fetch_gps_coordinates()
-    if latitude and longitude:
-        try:
-            lat = float(latitude)
-            lon = float(longitude)
+    coords = fetch_gps_coordinates()
+    rebuild = False
+    for lat, lon in coords:
+        if lat == 0 and lon == 0:
+            continue  # No GPS fix
+        track_state["last_fix"] = (lat, lon)
+        appended, rebuilt = track.add(lat, lon)
+        if rebuilt or (appended and map_state["path"] is None):
+            rebuild = True
+        elif appended and not rebuild:
+            # Only the new segment is drawn
+            map_state["path"].add_position(lat, lon)
+
+    if rebuild:
+        redraw_path()
+
+    if track_state["last_fix"] is not None:
+        lat, lon = track_state["last_fix"]
+        if map_state["marker"] is None:
             gps_map.set_position(lat, lon)
             gps_map.set_zoom(15)
-            gps_map.set_marker(lat, lon, text="Current Location")
-        except ValueError as e:
-            print(f"Invalid GPS data: {e}")
+            map_state["marker"] = gps_map.set_marker(lat, lon, text="Current Location")
+        elif coords:
+            gps_map.set_position(lat, lon)
+            map_state["marker"].set_position(lat, lon)
     else:
         print("No GPS data available.")
     # Schedule the next update
@@ -76,11 +143,11 @@ notebook.add(gps_tab, text="GPS Map")
 # Map display using tkintermapview with Google Maps tiles
 gps_map = TkinterMapView(gps_tab, width=800, height=600, corner_radius=0)
 
-# Use this for a google map tile
-gps_map.set_tile_server(
-    "https://mt1.google.com/vt/lyrs=r&x={x}&y={y}&z={z}",  # Google Maps Roadmap tiles
-    max_zoom=22
-)
+# Google Maps Roadmap tiles, served through the local cache so the map keeps
+# working offline at the launch site (seed it with `gs_ctl seed_tiles`)
+tile_cache = TileCache(os.environ.get("GS_TILE_CACHE"))
+tile_server = TileServer(tile_cache).start()
+gps_map.set_tile_server(tile_server.url(), max_zoom=22)
 gps_map.pack(fill="both", expand=True, padx=10, pady=10)
 
 # Start periodic updates for telemetry and GPS data
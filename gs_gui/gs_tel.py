@@ -1,85 +1,97 @@
+import os
+import sys
 import redis
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 import time
-import threading
+
+# Allow running as a script from anywhere in the checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.redis_helper import RedisHelper, TelemetryKeys
 
 # Initialize Redis connection with error handling
 try:
-    redis_client = redis.StrictRedis(host='localhost', port=6379, decode_responses=True)
+    helper = RedisHelper()
+    helper.redis.ping()
 except redis.ConnectionError as e:
     print("Failed to connect to Redis:", e)
     exit(1)
 
-# Function to fetch sensor data from Redis
-def fetch_sensor_data(sensor_keys):
+# Plotted channels and colors
+sensor_keys = [TelemetryKeys.ACCEL_X, TelemetryKeys.ACCEL_Y, TelemetryKeys.ACCEL_Z, TelemetryKeys.BMP280_ALTITUDE]
+colors = ["#ff5555", "#55ff55", "#5555ff", "#ffaa00"]
+
+# Visible time window in seconds, zoomed with +/- (None = whole flight)
+WINDOWS = [10, 30, 60, 300, 1800, None]
+view = {"window": 0}
+
+# Fetch downsampled sensor data from Redis
+def fetch_sensor_data(ax_widths):
+    """
+    Downsampled (seconds before latest sample, value) series per key for the
+    current window. Each series has at most as many points as its axes is
+    pixels wide, however long the window is.
+    """
+    try:
+        flight = helper.redis.get("current_flight")
+    except redis.RedisError as e:
+        print(f"Error fetching current flight: {e}")
+        return {}
+    if flight is None:
+        return {}
+    helper.flight_name = flight.decode()
+    window = WINDOWS[view["window"]]
     sensor_data = {}
-    for key in sensor_keys:
+    for key, width in zip(sensor_keys, ax_widths):
         try:
-            values = redis_client.lrange(key, 0, -1)
-            sensor_data[key] = [float(v) for v in values]
-        except (redis.ResponseError, ValueError) as e:
+            last = helper.ts_get_last(key)
+            if not last:
+                sensor_data[key] = ([], [])
+                continue
+            start = "-" if window is None else max(last[0] - window * 1000, 0)
+            points = helper.ts_get_range_downsampled(key, start, last[0], max_points=max(int(width), 10)) or []
+            sensor_data[key] = ([(t - last[0]) / 1000 for t, _ in points], [v for _, v in points])
+        except (redis.RedisError, ValueError) as e:
             print(f"Error fetching or parsing data for {key}: {e}")
-            sensor_data[key] = []
+            sensor_data[key] = ([], [])
     return sensor_data
 
 # Real-time plotting with Matplotlib
-fig, axs = plt.subplots(3, 3, figsize=(14, 8))
+fig, axs = plt.subplots(2, 2, figsize=(14, 8))
 axs = axs.flatten()
+lines = []
 
-# Dynamic sensor list and colors
-sensor_keys = ["Accelerometer_X", "Accelerometer_Y", "Accelerometer_Z", "Barometer"]
-colors = ["#ff5555", "#55ff55", "#5555ff", "#ffaa00"]
-
-# Initialize plot data containers
-plot_data = {key: [] for key in sensor_keys}
-last_data_length = {key: 0 for key in sensor_keys}
-
-# Initialize empty plots
-for ax, sensor, color in zip(axs, sensor_keys, colors):
-    ax.set_title(sensor, fontsize=10, fontweight="bold")
-    ax.set_xlim(0, 100)
-    ax.set_ylim(-1000, 1000)
+for ax, key, color in zip(axs, sensor_keys, colors):
+    label = f"{key.labels['sensor']} {key.labels['name']} ({key.labels['unit']})"
+    ax.set_title(label, fontsize=10, fontweight="bold")
     ax.grid(True, linestyle='--', alpha=0.7)
-    ax.plot([], [], color=color, label=sensor)
+    line, = ax.plot([], [], color=color, label=label)
     ax.legend(loc="upper right")
+    lines.append(line)
 
-def update(frame):
-    sensor_data = fetch_sensor_data(sensor_keys)
-    for i, (ax, sensor, color) in enumerate(zip(axs, sensor_keys, colors)):
-        if sensor in sensor_data:
-            new_data = sensor_data[sensor][last_data_length[sensor]:]
-            plot_data[sensor].extend(new_data)
-            last_data_length[sensor] += len(new_data)
-
-            ax.cla()
-            ax.set_title(sensor, fontsize=10, fontweight="bold")
-            ax.set_xlim(max(0, len(plot_data[sensor]) - 100), len(plot_data[sensor]))
-            ax.set_ylim(-1000, 1000)  # Adjust dynamically if needed
-            ax.grid(True, linestyle='--', alpha=0.7)
-            ax.plot(plot_data[sensor], color=color, label=sensor)
-            ax.legend(loc="upper right")
+def on_key(event):
+    if event.key in ("+", "="):
+        view["window"] = max(view["window"] - 1, 0)
+    elif event.key in ("-", "_"):
+        view["window"] = min(view["window"] + 1, len(WINDOWS) - 1)
 
-# Dynamic grid adjustment
-def adjust_grid():
-    num_sensors = len(sensor_keys)
-    rows = (num_sensors + 2) // 3
-    cols = min(num_sensors, 3)
-    global fig, axs
-    fig.clear()
-    axs = fig.subplots(rows, cols).flatten()
-    spacing = max(0.2, 0.8 / rows)  # Adjust spacing dynamically based on rows
-    plt.subplots_adjust(hspace=spacing, wspace=spacing)
-
-# Real-time clock display
-def update_clock():
-    while True:
-        plt.suptitle(time.strftime("%H:%M:%S"), fontsize=16, fontweight="bold")
-        time.sleep(1)
-
-clock_thread = threading.Thread(target=update_clock, daemon=True)
-clock_thread.start()
+def update(frame):
+    sensor_data = fetch_sensor_data([ax.bbox.width for ax in axs])
+    for ax, line, key in zip(axs, lines, sensor_keys):
+        x, y = sensor_data.get(key, ([], []))
+        line.set_data(x, y)
+        if x:
+            ax.set_xlim(min(x), 0 if min(x) < 0 else 1)
+            low, high = min(y), max(y)
+            pad = max((high - low) * 0.05, 0.5)
+            ax.set_ylim(low - pad, high + pad)
+    window = WINDOWS[view["window"]]
+    span = "whole flight" if window is None else f"last {window} s"
+    # The clock lives in the title; drawing from another thread isn't safe in matplotlib
+    fig.suptitle(f"{time.strftime('%H:%M:%S')}  -  {span}  (+/- to zoom)", fontsize=16, fontweight="bold")
+    return lines
 
+fig.canvas.mpl_connect("key_press_event", on_key)
 ani = FuncAnimation(fig, update, interval=100, cache_frame_data=False)
 
 plt.show()
@@ -0,0 +1,64 @@
+import math
+
+"""Bounded flight-path simplification for the map view"""
+
+EARTH_RADIUS_M = 6371000.0
+
+def distance_m(a, b):
+    """
+    Equirectangular distance in meters between two (lat, lon) points.
+    Plenty accurate over the few km a flight covers.
+    """
+    lat1, lon1 = math.radians(a[0]), math.radians(a[1])
+    lat2, lon2 = math.radians(b[0]), math.radians(b[1])
+    x = (lon2 - lon1) * math.cos((lat1 + lat2) / 2)
+    y = lat2 - lat1
+    return math.hypot(x, y) * EARTH_RADIUS_M
+
+
+class TrackSimplifier():
+    """
+    Online distance-threshold simplification with a point budget.
+
+    A point is kept only when it is at least `threshold_m` from the last kept
+    point. When the kept track exceeds `max_points`, the threshold doubles
+    and the track is thinned again, so the polyline stays bounded no matter
+    how long recovery tracking runs. add() reports whether the caller can
+    just append the new point or has to redraw the whole path.
+    """
+    def __init__(self, threshold_m=2.0, max_points=500):
+        self.initial_threshold_m = threshold_m
+        self.threshold_m = threshold_m
+        self.max_points = max_points
+        self.points = []
+
+    def reset(self):
+        self.threshold_m = self.initial_threshold_m
+        self.points = []
+
+    def add(self, lat, lon):
+        """
+        Returns (appended, rebuilt). `appended` is True when the point was kept,
+        `rebuilt` is True when earlier points were dropped to stay in budget.
+        """
+        point = (lat, lon)
+        if self.points and distance_m(self.points[-1], point) < self.threshold_m:
+            return False, False
+        self.points.append(point)
+        if len(self.points) <= self.max_points:
+            return True, False
+        while len(self.points) > self.max_points // 2:
+            self.threshold_m *= 2
+            self.points = self.thin(self.points, self.threshold_m)
+        return True, True
+
+    @staticmethod
+    def thin(points, threshold_m):
+        # Always keep both end points so the track still starts at the pad
+        kept = [points[0]]
+        for point in points[1:-1]:
+            if distance_m(kept[-1], point) >= threshold_m:
+                kept.append(point)
+        if len(points) > 1:
+            kept.append(points[-1])
+        return kept
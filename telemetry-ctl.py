@@ -2,27 +2,56 @@
 
 import argparse
 import time
-from multiprocessing import Process
-from gs_data.data import TelemetryDataProcess
-from common.redis_helper import TelemetryKeys
+
+def attach_shared_frame(timeout=10.0):
+    from gs_data.shared_frame import SharedFrameReader
+    start = time.time()
+    while True:
+        try:
+            return SharedFrameReader()
+        except FileNotFoundError:
+            if time.time() - start > timeout:
+                raise
+            time.sleep(0.1)
+
+
+def stop_daemon(telemetry_process, timeout=15):
+    # Let run() flush the writer and close its logs and shared memory before killing it
+    telemetry_process.stop()
+    telemetry_process.join(timeout=timeout)
+    if telemetry_process.is_alive():
+        telemetry_process.terminate()
+        telemetry_process.join()
+
 
 def run_data_test():
+    from gs_data.data import TelemetryDataProcess
     print("[telemetry-ctl] Starting telemetry data test...")
     telemetry_process = TelemetryDataProcess()
     telemetry_process.start()
 
     try:
+        # The decoded frames live in the daemon process; read them from its shared memory buffer
+        frames = attach_shared_frame()
         while True:
             print("\033[2J\033[H", end="")  # clear terminal
-            print(telemetry_process.db_str())
+            frame = frames.latest()
+            if frame is None:
+                print("No telemetry received yet")
+            else:
+                print(f"---- Frame {frames.count()} (age {time.time() * 1000 - frame['host_time_ms']:.0f} ms) ----")
+                for name, value in frame.items():
+                    if name != "raw":
+                        print(f"{name:20}: {value}")
             time.sleep(0.5)
     except KeyboardInterrupt:
         print("\n[telemetry-ctl] Stopping telemetry test.")
-        telemetry_process.terminate()
-        telemetry_process.join()
+        stop_daemon(telemetry_process)
 
 
 def run_redis_test():
+    from gs_data.data import TelemetryDataProcess
+    from common.redis_helper import TelemetryKeys
     print("[telemetry-ctl] Starting Redis telemetry test...")
     telemetry_process = TelemetryDataProcess()
     telemetry_process.start()
@@ -50,12 +79,120 @@ def run_redis_test():
 
     except KeyboardInterrupt:
         print("\n[telemetry-ctl] Stopping Redis test.")
-        telemetry_process.terminate()
-        telemetry_process.join()
+        stop_daemon(telemetry_process)
     except Exception as e:
         print(f"[telemetry-ctl] Redis error: {e}")
 
 
+def run_log_dump(directory, start=None, end=None):
+    from gs_data.flight_log import FlightLogReader, RECORD_FIELDS
+    reader = FlightLogReader(directory)
+    first, last = reader.time_bounds()
+    if first is None:
+        print(f"[telemetry-ctl] No records in {directory}")
+        return
+    start = first if start is None else start
+    end = last if end is None else end
+    records = reader.range(start, end)
+    print(",".join(["host_time_ms", "timestamp", "rssi", "snr"] + RECORD_FIELDS))
+    for record in records:
+        print(",".join(str(record[name]) for name in ["host_time_ms", "timestamp", "rssi", "snr"] + RECORD_FIELDS))
+
+
+def run_emulation(rate, duration=None, flight="EMU01", loss=0.0, corruption=0.0, duplication=0.0,
+                  burst_rate=0.0, burst_length=5.0, rx_buffer=1, pad_time=10.0, seed=None):
+    import threading
+    from gs_data.data import TelemetryDataProcess
+    from gs_data.fake_radio import FakeRadio
+    from gs_data.emulator import RocketEmulator, FlightProfile, LinkImpairments
+    emulator = RocketEmulator(FlightProfile(pad_time=pad_time, seed=seed), rate_hz=rate,
+                              impairments=LinkImpairments(loss, corruption, duplication, burst_rate,
+                                                          burst_length, seed=seed))
+    radio = FakeRadio(responder=emulator.responder, receive_timeout=0.05, rx_capacity=rx_buffer)
+    # The daemon runs in this process so the fake radio and emulator are shared with it
+    daemon = TelemetryDataProcess(flight_name=flight, radio=radio)
+    print(f"[telemetry-ctl] Emulating {rate:g} Hz into flight {flight} (Ctrl-C to stop)")
+    emulator.start(radio)
+    if duration:
+        threading.Timer(duration, daemon.stop).start()
+    start = time.time()
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.stop()
+    elapsed = time.time() - start
+
+    stats = emulator.stats()
+    validation = daemon.validator.stats
+    stored = validation["accepted"]
+    rejected = sum(n for name, n in validation.items() if name not in ("accepted", "gps_no_fix"))
+    print(f"\n---- Emulation report ({elapsed:.1f} s) ----")
+    print(f"rocket phase / altitude : {stats['phase']} / {stats['altitude']} m")
+    print(f"frames transmitted      : {stats['frames']} ({stats['frames'] / elapsed:.1f}/s)")
+    print(f"lost (random / burst)   : {stats['lost']} / {stats['burst_lost']}")
+    print(f"corrupted / duplicated  : {stats['corrupted']} / {stats['duplicated']}")
+    print(f"overwritten in radio rx : {radio.overflows}")
+    print(f"frames stored           : {stored} ({stored / elapsed:.1f}/s, "
+          f"{100.0 * stored / max(stats['frames'], 1):.1f}% of transmitted)")
+    print(f"rejected by validation  : {rejected} (" + ", ".join(
+        f"{name} {n}" for name, n in validation.items() if name not in ("accepted", "gps_no_fix")) + ")")
+    print(f"commands answered       : {stats['commands']}")
+    print(f"writer                  : {daemon.writer.stats()}")
+
+
+def format_bytes(n):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(n) < 1024 or unit == "GiB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def run_memory_report(flights=None, rate=None, days=1.0):
+    from common.redis_helper import RedisHelper
+    helper = RedisHelper()
+    flights = flights or helper.flights()
+    if not flights:
+        print("[telemetry-ctl] No flights found in Redis")
+        return
+    grand_total = 0
+    for flight in flights:
+        report = helper.memory_report(flight)
+        total = sum(entry["bytes"] for entry in report)
+        grand_total += total
+        print(f"==== {flight}: {format_bytes(total)} ====")
+        print(f"{'key':24} {'type':10} {'bytes':>11} {'samples':>9} {'B/sample':>9} {'span':>8}")
+        per_frame = 0.0
+        frame_rate = None
+        for entry in sorted(report, key=lambda e: -e["bytes"]):
+            per_sample = entry["bytes"] / entry["samples"] if entry["samples"] else 0.0
+            span = ""
+            if entry["first"] is not None and entry["last"] is not None and entry["last"] > entry["first"]:
+                seconds = (entry["last"] - entry["first"]) / 1000
+                span = f"{seconds / 3600:.1f} h"
+                if entry["key"] == "timestamp":
+                    frame_rate = entry["samples"] / seconds
+            if entry["key"] != "events":
+                per_frame += per_sample
+            print(f"{entry['key']:24} {entry['type']:10} {format_bytes(entry['bytes']):>11} "
+                  f"{entry['samples']:9} {per_sample:9.1f} {span:>8}")
+        # Size a campaign from the measured bytes per frame (ignores fixed per-key overhead)
+        frame_rate = rate or frame_rate
+        if frame_rate and per_frame:
+            projected = per_frame * frame_rate * 86400 * days
+            print(f"~{per_frame:.0f} B/frame at {frame_rate:.1f} Hz -> {format_bytes(projected)} "
+                  f"per {days:g} day(s) of continuous telemetry (before retention)")
+        print()
+    if len(flights) > 1:
+        print(f"Total: {format_bytes(grand_total)}")
+    try:
+        used = helper.redis.info("memory").get("used_memory")
+        print(f"Redis used_memory: {format_bytes(used)}")
+    except Exception as e:
+        print(f"[telemetry-ctl] Could not read Redis memory info: {e}")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Telemetry control CLI",
@@ -67,12 +204,43 @@ def main():
     subparsers.add_parser("run-test", help="Run telemetry data process and print output")
     subparsers.add_parser("redis-test", help="Run telemetry and show latest Redis values")
 
+    dump_cmd = subparsers.add_parser("log-dump", help="Print a time range of a binary flight log as CSV")
+    dump_cmd.add_argument("directory", help="Flight log directory")
+    dump_cmd.add_argument("--start", type=int, help="Start time (epoch ms, default: first record)")
+    dump_cmd.add_argument("--end", type=int, help="End time (epoch ms, default: last record)")
+
+    mem_cmd = subparsers.add_parser("memory-report", help="Show Redis memory used per channel and per flight")
+    mem_cmd.add_argument("--flight", action="append", help="Flight to report (repeatable, default: all)")
+    mem_cmd.add_argument("--rate", type=float, help="Frame rate in Hz for the projection (default: measured)")
+    mem_cmd.add_argument("--days", type=float, default=1.0, help="Campaign length for the projection")
+
+    emu_cmd = subparsers.add_parser("emulate", help="Run the daemon against a synthetic rocket on a fake radio")
+    emu_cmd.add_argument("--rate", type=float, default=10.0, help="Telemetry frames per second")
+    emu_cmd.add_argument("--duration", type=float, help="Stop after this many seconds (default: Ctrl-C)")
+    emu_cmd.add_argument("--flight", default="EMU01", help="Flight name to record under")
+    emu_cmd.add_argument("--loss", type=float, default=0.0, help="Independent packet loss probability")
+    emu_cmd.add_argument("--corrupt", type=float, default=0.0, help="Probability a packet has flipped bits")
+    emu_cmd.add_argument("--duplicate", type=float, default=0.0, help="Probability a packet arrives twice")
+    emu_cmd.add_argument("--burst-rate", type=float, default=0.0, help="Probability per packet of a loss burst")
+    emu_cmd.add_argument("--burst-length", type=float, default=5.0, help="Mean packets lost per burst")
+    emu_cmd.add_argument("--rx-buffer", type=int, default=1,
+                         help="Packets the fake radio holds before overwriting (RFM95: 1)")
+    emu_cmd.add_argument("--pad-time", type=float, default=10.0, help="Seconds on the pad before ignition")
+    emu_cmd.add_argument("--seed", type=int, help="Random seed for a repeatable run")
+
     args = parser.parse_args()
 
     if args.command == "run-test":
         run_data_test()
     elif args.command == "redis-test":
         run_redis_test()
+    elif args.command == "log-dump":
+        run_log_dump(args.directory, args.start, args.end)
+    elif args.command == "emulate":
+        run_emulation(args.rate, args.duration, args.flight, args.loss, args.corrupt, args.duplicate,
+                      args.burst_rate, args.burst_length, args.rx_buffer, args.pad_time, args.seed)
+    elif args.command == "memory-report":
+        run_memory_report(args.flight, args.rate, args.days)
     else:
         parser.print_help()
 